@@ -0,0 +1,81 @@
+"""
+This module installs the admission control of the prediction endpoints.
+
+The prediction requests of the blueprint go through the
+`admission_controller` before reaching the model. Shed requests are
+answered at once with 503 Service Unavailable, or 429 Too Many Requests
+when their client has too many requests pending, and a `Retry-After`
+header. The counter endpoints are never shed.
+
+Clients are identified by the configured header, e.g. `X-Client-Id`, and
+by their remote address otherwise. The header is not authenticated, so
+the per-client limit is not a quota. Admission control is disabled by
+default, see `admission_enabled`.
+"""
+
+import time
+
+from flask import Blueprint, g, request
+from services import admission_controller
+from services.admission import SHED_CLIENT
+from services.config import server_settings
+from werkzeug.exceptions import ServiceUnavailable, TooManyRequests
+
+ADMITTED_ENDPOINTS = frozenset((
+    'prediction.get_prediction',
+    'prediction.get_prediction_post',
+    'prediction.get_batch_prediction',
+))
+
+
+def init_admission(blueprint: Blueprint) -> None:
+    """
+    Install the admission control hooks when it is enabled.
+
+    Args:
+        blueprint (Blueprint): The blueprint whose prediction requests
+            are admitted.
+    """
+    if not server_settings.admission_enabled:
+        return
+    blueprint.before_request(_admit)
+    blueprint.teardown_request(_release)
+
+
+def _admit() -> None:
+    """Admit the prediction request, or shed it with a Retry-After."""
+    if request.endpoint not in ADMITTED_ENDPOINTS:
+        return
+    client = _client_id()
+    reason = admission_controller.acquire(client)
+    if reason is None:
+        g.admission = (client, time.perf_counter())
+        return
+    retry_after = admission_controller.retry_after()
+    if reason == SHED_CLIENT:
+        raise TooManyRequests(
+            description='Too many pending requests: ',
+            retry_after=retry_after,
+        )
+    raise ServiceUnavailable(
+        description=f'Overloaded ({reason}): ',
+        retry_after=retry_after,
+    )
+
+
+def _release(exception=None) -> None:
+    """Free the slot of an admitted request and record its latency."""
+    admission = g.pop('admission', None)
+    if admission is None:
+        return
+    client, start = admission
+    admission_controller.release(client, time.perf_counter() - start)
+
+
+def _client_id() -> str:
+    """Return the identifier of the calling client."""
+    return (
+        request.headers.get(server_settings.admission_client_header)
+        or request.remote_addr
+        or 'unknown'
+    )
@@ -0,0 +1,141 @@
+"""
+This module encodes and decodes the bodies of the prediction endpoints.
+
+It provides a fast JSON provider for Flask, backed by orjson when it is
+installed, and content negotiation for compact binary formats:
+- application/json: the default, row or column objects.
+- application/msgpack: MessagePack maps of column arrays.
+- application/vnd.apache.arrow.stream: Arrow IPC streams of columns.
+orjson, msgpack and pyarrow are optional, installed by the `codecs` extra.
+A format whose package is not installed is answered with 406 (response) or
+415 (request).
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+from flask import Response, abort, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+ARROW = 'application/vnd.apache.arrow.stream'
+MEDIA_TYPES = (JSON, MSGPACK, ARROW)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider serializing with orjson when it is installed."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        """Serialize an object, numpy arrays included, to a JSON string."""
+        return encode_json(obj).decode()
+
+    def response(self, *args, **kwargs) -> Response:
+        """Return a JSON response without the pretty printing overhead."""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(encode_json(obj), mimetype=JSON)
+
+
+def encode_json(obj) -> bytes:
+    """Serialize an object, numpy arrays included, to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_to_builtin, separators=(',', ':')).encode()
+
+
+def respond(body: dict) -> Response:
+    """
+    Encode a response body in the format negotiated with `Accept`.
+
+    Args:
+        body (dict): Column arrays or scalars, e.g. the predictions.
+
+    Returns:
+        Response: The encoded response.
+    """
+    media_type = request.accept_mimetypes.best_match(MEDIA_TYPES, JSON)
+    if media_type == MSGPACK:
+        _require(msgpack, 406)
+        payload = msgpack.packb(body, default=_to_builtin)
+    elif media_type == ARROW:
+        _require(pa, 406)
+        payload = _encode_arrow(body)
+    else:
+        payload = encode_json(body)
+    return Response(payload, mimetype=media_type)
+
+
+def decode_columns() -> pd.DataFrame:
+    """
+    Decode a body of feature columns in the format given by `Content-Type`.
+
+    JSON and MessagePack bodies are maps of column arrays, Arrow bodies are
+    IPC streams whose columns are the features.
+
+    Returns:
+        pd.DataFrame: The decoded columns.
+    """
+    media_type = request.mimetype or JSON
+    if media_type == ARROW:
+        _require(pa, 415)
+        with pa.ipc.open_stream(request.get_data()) as reader:
+            return reader.read_all().to_pandas()
+    if media_type == MSGPACK:
+        _require(msgpack, 415)
+        columns = msgpack.unpackb(request.get_data())
+    elif media_type == JSON:
+        columns = request.get_json()
+    else:
+        return abort(code=415, description=f'Unsupported {media_type}: ')
+    if not isinstance(columns, dict):
+        return abort(code=400, description='Expected a map of columns: ')
+    return pd.DataFrame(columns)
+
+
+def _encode_arrow(body: dict) -> bytes:
+    """Encode the column arrays of a body as an Arrow IPC stream."""
+    columns = {}
+    for name, values in body.items():
+        if isinstance(values, dict):
+            # Nested columns, e.g. quantiles, are flattened
+            columns.update({
+                f'{name}_{key}': value for key, value in values.items()
+            })
+        else:
+            columns[name] = values
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _to_builtin(obj):
+    """Convert numpy values the standard encoders do not know."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f'{type(obj).__name__} is not serializable')
+
+
+def _require(module, code: int) -> None:
+    """Abort when the optional package of a format is not installed."""
+    if module is None:
+        abort(code=code, description='Format not available: ')
@@ -5,21 +5,65 @@ It uses Flask for handling HTTP requests and Pydantic for data validation.
 Endpoints:
 - GET /pred/: Fetches prediction based on query parameters.
 - POST /pred/: Fetches prediction based on JSON payload.
+- POST /pred/batch: Fetches predictions of columns of features.
+- GET /pred/stats: Fetches the precomputed predictions lookup counters.
+- GET /pred/models: Fetches the model registry counters.
+- GET /pred/shadow: Fetches the shadow scoring deltas.
+- GET /pred/admission: Fetches the admitted and shed request counters.
+- GET /pred/features: Fetches the served feature statistics and drift.
+- GET /pred/parallelism: Fetches the prediction parallelism policy.
 
 Functions:
 - get_prediction(): Handles GET requests to fetch predictions.
 - get_prediction_post(): Handles POST requests to fetch predictions.
-Both functions validate the input data using the Appartment schema
-and then use the model_inference_service to make predictions based
-on the validated data.
+- get_batch_prediction(): Handles POST requests of feature columns.
+- get_lookup_stats(): Handles GET requests to fetch lookup counters.
+- get_models_stats(): Handles GET requests to fetch registry counters.
+- get_shadow_stats(): Handles GET requests to fetch shadow deltas.
+- get_admission_stats(): Handles GET requests to fetch admission counters.
+- get_feature_stats(): Handles GET requests to fetch feature statistics.
+- get_parallelism_stats(): Handles GET requests to fetch the parallelism.
+Both prediction functions validate the input data using the Appartment
+schema. When an `address` is given, the precomputed predictions table is
+looked up first, the model_inference_service is only used on a miss.
+The optional `model_name` and `model_version` parameters choose the model
+serving the request, the default model is used otherwise, and are
+rejected with 400 unless they are plain names (letters, digits, `_`, `.`
+and `-`). Requests served by the default model are sampled for shadow
+scoring of the candidate model.
+The optional `quantiles` (e.g. `0.05,0.95`) and `std` parameters add an
+uncertainty band across the trees of the forest to the response.
+Responses are encoded in the format negotiated with the `Accept` header,
+JSON, MessagePack or Arrow IPC, see `api.codecs`. The batch endpoint also
+decodes its body according to `Content-Type`, so bulk callers send and
+receive column arrays instead of one JSON object per row.
+The prediction endpoints go through admission control, see
+`api.admission`: under overload requests are shed with 503 or 429 and a
+`Retry-After` header instead of queueing without bound.
+The features of every served request are folded into streaming
+statistics, compared with the training profile of the served model.
 """
 
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from api.admission import init_admission
+from api.codecs import decode_columns, respond
 from flask import Blueprint, abort, request
 from pydantic import ValidationError
 from schema.appartment import Appartment
-from services import model_inference_service
+from services import (
+    admission_controller,
+    feature_stats,
+    model_inference_service,
+    prediction_store,
+    shadow_scorer,
+)
+from services.artifact import valid_name
 
 bp = Blueprint('prediction', __name__, url_prefix='/pred')
+init_admission(bp)
 
 
 @bp.get('/')
@@ -36,10 +80,7 @@ def get_prediction():
         return abort(code=400, description='Bad Input parameters: ')
 
     # Make prediction
-    prediction = model_inference_service.predict(
-        list(appartment_features.model_dump().values()),
-        )
-    return {'prediction': prediction}
+    return respond(_predict(appartment_features, request.args))
 
 
 @bp.post('/')
@@ -57,7 +98,240 @@ def get_prediction_post():
     appartment_features = Appartment(**request.json)
 
     # Make prediction
-    prediction = model_inference_service.predict(
-        list(appartment_features.model_dump().values()),
+    return respond(_predict(appartment_features, request.json))
+
+
+@bp.post('/batch')
+def get_batch_prediction():
+    """Handle POST requests to fetch predictions of feature columns.
+
+    The body holds one array per feature, in the format given by the
+    `Content-Type` header. The options are read from the query string.
+
+    Returns:
+        Response: The prediction columns, encoded as negotiated.
+    """
+    try:
+        columns = decode_columns()
+    except ValueError:
+        return abort(code=400, description='Bad Input columns: ')
+    features = _validate_columns(columns)
+    feature_stats.update(features)
+
+    model_name, version = _model_options(request.args)
+    quantiles, return_std = _uncertainty_options(request.args)
+    try:
+        response = _to_response(model_inference_service.predict(
+            features,
+            model_name=model_name,
+            version=version,
+            quantiles=quantiles,
+            return_std=return_std,
+            ))
+    except FileNotFoundError:
+        return abort(code=404, description='Model not found: ')
+
+    if _is_default_model(model_name, version):
+        shadow_scorer.submit(features, response['prediction'])
+    return respond(response)
+
+
+@bp.get('/stats')
+def get_lookup_stats():
+    """Handle GET requests to fetch the lookup counters.
+
+    Returns:
+        dict: Hits, misses, hit ratio and rows per second of the lookups.
+    """
+    return prediction_store.stats()
+
+
+@bp.get('/models')
+def get_models_stats():
+    """Handle GET requests to fetch the model registry counters.
+
+    Returns:
+        dict: Resident memory and per-model request and load counters.
+    """
+    return model_inference_service.registry.stats()
+
+
+@bp.get('/shadow')
+def get_shadow_stats():
+    """Handle GET requests to fetch the shadow scoring deltas.
+
+    Returns:
+        dict: The aggregated deltas between candidate and served model.
+    """
+    return shadow_scorer.stats()
+
+
+@bp.get('/admission')
+def get_admission_stats():
+    """Handle GET requests to fetch the admission counters.
+
+    Returns:
+        dict: Admitted and shed counts, in flight and waiting requests.
+    """
+    return admission_controller.stats()
+
+
+@bp.get('/features')
+def get_feature_stats():
+    """Handle GET requests to fetch the served feature statistics.
+
+    Returns:
+        dict: The served statistics, the training profile and the drift
+            between them.
+    """
+    return {
+        'served': feature_stats.stats(),
+        'training': feature_stats.profile,
+        'drift': feature_stats.drift(),
+    }
+
+
+@bp.get('/parallelism')
+def get_parallelism_stats():
+    """Handle GET requests to fetch the prediction parallelism policy.
+
+    Returns:
+        dict: The rows per job, the calibration crossover points and
+            throughputs, and the calls per number of jobs.
+    """
+    return model_inference_service.parallel_predictor.stats()
+
+
+def _predict(appartment_features: Appartment, params: dict) -> dict:
+    """Look up the precomputed prediction, fall back to the live model.
+
+    The precomputed predictions are only looked up for the default model
+    and when no uncertainty band is requested.
+
+    Args:
+        appartment_features (Appartment): The validated apartment features.
+        params (dict): The request parameters, holding the optional
+            `address`, `model_name`, `model_version`, `quantiles` and `std`.
+
+    Returns:
+        dict: The prediction result, with its `std` and `quantiles`
+            when requested.
+    """
+    input_parameters = list(appartment_features.model_dump().values())
+    feature_stats.update(input_parameters)
+    model_name, version = _model_options(params)
+    is_default_model = _is_default_model(model_name, version)
+    quantiles, return_std = _uncertainty_options(params)
+
+    response = None
+    stored_prediction = None
+    if is_default_model and not (quantiles or return_std):
+        stored_prediction = prediction_store.lookup(
+            params.get('address'),
+            input_parameters,
         )
+        if stored_prediction is not None:
+            response = {'prediction': [stored_prediction]}
+    if response is None:
+        try:
+            response = _to_response(model_inference_service.predict(
+                input_parameters,
+                model_name=model_name,
+                version=version,
+                quantiles=quantiles,
+                return_std=return_std,
+                ))
+        except FileNotFoundError:
+            return abort(code=404, description='Model not found: ')
+
+    if is_default_model:
+        # A stored prediction is compared with the live default model
+        shadow_scorer.submit(
+            input_parameters,
+            None if stored_prediction is not None else response['prediction'],
+        )
+    return response
+
+
+def _validate_columns(columns: pd.DataFrame) -> pd.DataFrame:
+    """Check that the columns hold every integer Appartment feature.
+
+    The Appartment features are integers, as validated for a single row,
+    so NaN, infinite and fractional values are rejected, and so is a body
+    without rows.
+
+    Args:
+        columns (pd.DataFrame): The decoded feature columns.
+
+    Returns:
+        pd.DataFrame: The features, in the Appartment schema order.
+    """
+    feature_names = list(Appartment.model_fields)
+    missing = set(feature_names) - set(columns.columns)
+    if missing:
+        return abort(code=400, description=f'Missing columns {missing}: ')
+    try:
+        features = columns[feature_names].apply(pd.to_numeric)
+    except (TypeError, ValueError):
+        return abort(code=400, description='Bad Input columns: ')
+    if features.empty:
+        return abort(code=400, description='Empty Input columns: ')
+    values = features.to_numpy(dtype=np.float64)
+    if not np.isfinite(values).all() or (values != np.trunc(values)).any():
+        return abort(code=400, description='Non-integer Input columns: ')
+    return features
+
+
+def _uncertainty_options(params: dict) -> tuple:
+    """Parse the `quantiles` and `std` request parameters.
+
+    Args:
+        params (dict): The request parameters.
+
+    Returns:
+        tuple: The requested quantiles and whether the std is requested.
+    """
+    quantiles = params.get('quantiles') or []
+    if isinstance(quantiles, str):
+        quantiles = quantiles.split(',')
+    try:
+        quantiles = [float(quantile) for quantile in quantiles]
+    except (TypeError, ValueError):
+        return abort(code=400, description='Bad quantiles parameter: ')
+    if any(not 0 <= quantile <= 1 for quantile in quantiles):
+        return abort(code=400, description='Quantiles must be in [0, 1]: ')
+    return_std = str(params.get('std', '')).lower() in {'1', 'true'}
+    return quantiles, return_std
+
+
+def _to_response(prediction) -> dict:
+    """Wrap a point prediction, distributions are already dictionaries."""
+    if isinstance(prediction, dict):
+        return prediction
     return {'prediction': prediction}
+
+
+def _model_options(params: dict) -> Tuple[Optional[str], Optional[str]]:
+    """Read the requested model name and version, checking their names.
+
+    Args:
+        params (dict): The request parameters.
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: The model name and version,
+            None when not requested.
+    """
+    model_name = params.get('model_name')
+    version = params.get('model_version')
+    for name in (model_name, version):
+        if name is not None and not valid_name(name):
+            return abort(code=400, description='Bad model parameters: ')
+    return model_name, version
+
+
+def _is_default_model(model_name: str = None, version: str = None) -> bool:
+    """Check whether the requested model is the default model."""
+    return (
+        model_name in {None, model_inference_service.model_name}
+        and version in {None, model_inference_service.model_version}
+    )
@@ -0,0 +1,109 @@
+"""
+This module provides opt-in profiling of the requests.
+
+When `profiling_enabled` is set, a fraction of the requests, and every
+request whose profiling header holds the configured profile token, runs
+under a statistical profiler. pyinstrument is used when it is installed,
+the `profiling` extra of the service, and its HTML report is written to
+the profile directory, cProfile stats are written otherwise. Only the
+newest `profile_max_files` profiles are kept. The hooks are not
+installed at all when profiling is disabled, so it costs nothing on the
+request path.
+"""
+
+import cProfile
+import hmac
+import os
+import random
+import time
+from uuid import uuid4
+
+from flask import Flask, g, request
+from loguru import logger
+from services.config import profiling_settings
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pragma: no cover
+    Profiler = None
+
+
+def init_profiling(app: Flask) -> None:
+    """
+    Install the request profiling hooks when profiling is enabled.
+
+    Args:
+        app (Flask): The application whose requests are profiled.
+    """
+    if not profiling_settings.profiling_enabled:
+        return
+    os.makedirs(profiling_settings.profile_dir, exist_ok=True)
+    app.before_request(_start_profiler)
+    app.teardown_request(_stop_profiler)
+    header = profiling_settings.profile_header
+    if profiling_settings.profile_token is None:
+        header += ' ignored, no profile token set'
+    logger.info(
+        f'Profiling {profiling_settings.profile_sample_rate:.1%} of requests '
+        f'and requests with {header}, '
+        f'with {"pyinstrument" if Profiler else "cProfile"}',
+    )
+
+
+def _start_profiler() -> None:
+    """Start a profiler if the request is sampled or asks for it."""
+    sample_rate = profiling_settings.profile_sample_rate
+    sampled = random.random() < sample_rate  # noqa: S311
+    if not (sampled or _profile_requested()):
+        return
+    profiler = Profiler() if Profiler else cProfile.Profile()
+    if Profiler:
+        profiler.start()
+    else:
+        profiler.enable()
+    g.profiler = profiler
+
+
+def _stop_profiler(exception=None) -> None:
+    """Stop the profiler of the request and write its profile to disk."""
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return
+    endpoint = (request.endpoint or 'unknown').replace('.', '_')
+    base_name = f'{time.strftime("%Y%m%dT%H%M%S")}_{endpoint}_{uuid4().hex}'
+    profile_path = os.path.join(profiling_settings.profile_dir, base_name)
+    if Profiler:
+        profiler.stop()
+        profile_path += '.html'
+        with open(profile_path, 'w', encoding='utf-8') as fichier:
+            fichier.write(profiler.output_html())
+    else:
+        profiler.disable()
+        profile_path += '.prof'
+        profiler.dump_stats(profile_path)
+    logger.debug(f'Request profile written to {profile_path}')
+    _prune_profiles()
+
+
+def _profile_requested() -> bool:
+    """Check whether the profile header holds the profile token."""
+    token = profiling_settings.profile_token
+    if token is None:
+        return False
+    given = request.headers.get(profiling_settings.profile_header, '')
+    return hmac.compare_digest(given.encode(), token.encode())
+
+
+def _prune_profiles() -> None:
+    """Delete the oldest profiles beyond `profile_max_files`."""
+    profile_dir = profiling_settings.profile_dir
+    profiles = sorted(
+        (entry for entry in os.scandir(profile_dir) if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in profiles[:-profiling_settings.profile_max_files or None]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            # Already pruned by another request thread
+            continue
@@ -0,0 +1,83 @@
+"""
+This module defines the admin endpoints of the background training jobs.
+
+Endpoints:
+- POST /admin/training/: Starts the training of a model version.
+- GET /admin/training/: Fetches the state and progress of every job.
+- GET /admin/training/<job_id>: Fetches the state and progress of a job.
+
+Functions:
+- start_training(): Handles POST requests to start a training job.
+- get_training_jobs(): Handles GET requests to fetch every job.
+- get_training_job(): Handles GET requests to fetch a job.
+The training runs in a separate process with limited CPU time and memory,
+see `services.training_jobs`, and the request returns at once with the
+job. Submitting a version whose job is queued or running returns that
+job with 200 instead of 202 Accepted. When the job succeeds, the version
+becomes the default model of the service. The endpoints require the
+admin token in the configured header, the settings refuse to enable them
+without one.
+"""
+
+import hmac
+
+from flask import Blueprint, abort, request
+from services import training_jobs
+from services.config import training_settings
+from services.training_jobs import TrainingJobError
+
+bp = Blueprint('training', __name__, url_prefix='/admin/training')
+
+
+@bp.before_request
+def _check_admin_token() -> None:
+    """Reject the requests without the admin token."""
+    token = training_settings.training_admin_token
+    given = request.headers.get(training_settings.training_admin_header, '')
+    if not token or not hmac.compare_digest(given.encode(), token.encode()):
+        abort(code=403, description='Bad admin token: ')
+
+
+@bp.post('/')
+def start_training():
+    """Handle POST requests to start the training of a model version.
+
+    The JSON body holds the `version` of the model to build.
+
+    Returns:
+        Tuple[dict, int]: The job, with 202 when it was created and 200
+            when a job of the version was already queued or running.
+    """
+    payload = request.get_json(silent=True) or {}
+    version = payload.get('version')
+    if not isinstance(version, str):
+        return abort(code=400, description='Missing version: ')
+    try:
+        job, created = training_jobs.submit(version)
+    except TrainingJobError as error:
+        return abort(code=409, description=f'{error}: ')
+    return job, 202 if created else 200
+
+
+@bp.get('/')
+def get_training_jobs():
+    """Handle GET requests to fetch the state and progress of every job.
+
+    Returns:
+        dict: The default model version and the jobs, newest first.
+    """
+    return training_jobs.stats()
+
+
+@bp.get('/<job_id>')
+def get_training_job(job_id: str):
+    """Handle GET requests to fetch the state and progress of a job.
+
+    Returns:
+        dict: The job, its planned and completed stages with their
+            durations, its running stage and its progress.
+    """
+    job = training_jobs.status(job_id)
+    if job is None:
+        return abort(code=404, description='Training job not found: ')
+    return job
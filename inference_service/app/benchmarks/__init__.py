@@ -0,0 +1 @@
+"""Benchmarks of the inference service, run from the `app` directory."""
@@ -0,0 +1,90 @@
+"""
+Benchmark of the adaptive parallelism of the forest predictions.
+
+The rows per job are calibrated on the default model, which logs the
+crossover point and the throughput of every number of jobs. Then, for
+several batch sizes, the throughput of the adaptive policy is compared
+with the `predict` of scikit-learn using the `n_jobs` the model was
+trained with, and with one job and all workers of the pool. Finally,
+CONCURRENT_BATCHES large batches are predicted at once, to check that
+they share the bounded pool.
+
+Usage:
+    cd app; python3 -m benchmarks.adaptive_parallelism
+"""
+
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from services import model_inference_service
+from services.model_inference import FEATURE_COLUMNS
+from services.parallelism import _synthetic_rows
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+CONCURRENT_BATCHES = 4
+REPEATS = 5
+
+
+def main():
+    """Run the adaptive parallelism benchmark on the default model."""
+    model = model_inference_service.model
+    predictor = model_inference_service.parallel_predictor
+    predictor.calibrate(model)
+    rng = np.random.default_rng(42)
+
+    for batch_size in BATCH_SIZES:
+        features = pd.DataFrame(
+            _synthetic_rows(model, batch_size, rng),
+            columns=FEATURE_COLUMNS,
+        )
+        runs = {
+            f'sklearn n_jobs={model.n_jobs}': lambda: model.predict(features),
+            '1 job': lambda: predictor.predict(model, features, 1),
+            f'{predictor.max_workers} jobs': lambda: predictor.predict(
+                model,
+                features,
+                predictor.max_workers,
+            ),
+            f'adaptive {predictor.n_jobs(batch_size)} jobs': (
+                lambda: predictor.predict(model, features)
+            ),
+        }
+        logger.info(f'batch {batch_size}: ' + ', '.join(
+            f'{name} {batch_size / _median_seconds(run):,.0f} rows/s'
+            for name, run in runs.items()
+        ))
+
+    features = pd.DataFrame(
+        _synthetic_rows(model, BATCH_SIZES[-1], rng),
+        columns=FEATURE_COLUMNS,
+    )
+    with ThreadPoolExecutor(CONCURRENT_BATCHES) as callers:
+        start = time.perf_counter()
+        list(callers.map(
+            lambda _: predictor.predict(model, features),
+            range(CONCURRENT_BATCHES),
+        ))
+        seconds = time.perf_counter() - start
+    logger.info(
+        f'{CONCURRENT_BATCHES} concurrent batches of {BATCH_SIZES[-1]}: '
+        f'{CONCURRENT_BATCHES * BATCH_SIZES[-1] / seconds:,.0f} rows/s '
+        f'on {predictor.max_workers} pool threads',
+    )
+
+
+def _median_seconds(function) -> float:
+    """Return the median run time of a function over REPEATS runs."""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+if __name__ == '__main__':
+    main()
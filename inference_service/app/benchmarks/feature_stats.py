@@ -0,0 +1,78 @@
+"""
+Benchmark of the overhead of the streaming feature statistics.
+
+For several batch sizes, batches of synthetic features are folded into a
+FeatureStats collector, after a warm-up of WARMUP_ROWS rows: once the
+stream is long, the reservoir sketch rarely replaces a value, which is
+the steady state of a serving process. The median cost per request and
+per row is logged, with the error of the streamed mean, standard
+deviation and median of the area against a fresh sample of its
+distribution.
+
+Usage:
+    cd app; python3 -m benchmarks.feature_stats
+"""
+
+import statistics
+import time
+
+import numpy as np
+from loguru import logger
+from services.feature_stats import FeatureStats
+from services.model_inference import FEATURE_COLUMNS
+
+BATCH_SIZES = [1, 100, 10000]
+REQUESTS = 1000
+WARMUP_ROWS = 1000000
+WARMUP_BATCH = 10000
+
+
+def main():
+    """Run the feature statistics benchmark for every batch size."""
+    rng = np.random.default_rng(42)
+    for batch_size in BATCH_SIZES:
+        collector = FeatureStats()
+        for _ in range(WARMUP_ROWS // WARMUP_BATCH):
+            collector.update(_features(rng, WARMUP_BATCH))
+        batches = [
+            _features(rng, batch_size)
+            for _ in range(max(REQUESTS // batch_size, 10))
+        ]
+        durations = []
+        for batch in batches:
+            start = time.perf_counter()
+            collector.update(batch)
+            durations.append(time.perf_counter() - start)
+        seconds = statistics.median(durations)
+        logger.info(
+            f'batch {batch_size}: {seconds * 1e6:.1f} us/request, '
+            f'{seconds / batch_size * 1e6:.3f} us/row, '
+            f'errors {_errors(collector, rng)}',
+        )
+
+
+def _features(rng: np.random.Generator, batch_size: int) -> np.ndarray:
+    """Return a batch of synthetic features."""
+    numeric = np.column_stack([
+        rng.normal(90, 30, batch_size),
+        rng.integers(1950, 2024, batch_size),
+        rng.integers(1, 6, batch_size),
+        rng.exponential(20, batch_size),
+    ])
+    flags = rng.integers(0, 2, (batch_size, len(FEATURE_COLUMNS) - 4))
+    return np.hstack([numeric, flags])
+
+
+def _errors(collector: FeatureStats, rng: np.random.Generator) -> str:
+    """Return the error of the streamed statistics of the area."""
+    area = collector.stats()['features']['area']
+    expected = _features(rng, WARMUP_ROWS)[:, 0]
+    return (
+        f"mean {abs(area['mean'] - expected.mean()):.3f}, "
+        f"std {abs(area['std'] - expected.std()):.3f}, "
+        f"median {abs(area['quantiles']['0.5'] - np.median(expected)):.3f}"
+    )
+
+
+if __name__ == '__main__':
+    main()
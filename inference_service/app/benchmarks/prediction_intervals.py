@@ -0,0 +1,77 @@
+"""
+Benchmark of the uncertainty band overhead over point-only predictions.
+
+For several batch sizes, the default model predicts the same batch with
+the point-only `predict` of scikit-learn and with the mean, standard
+deviation and 5%/95% quantiles across the trees, computed from one
+vectorized evaluation of all the trees. The median time per row of both
+and the overhead ratio are logged.
+
+Usage:
+    cd app; python3 -m benchmarks.prediction_intervals
+"""
+
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from services import model_inference_service
+from services.forest_evaluator import evaluator_for
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+REPEATS = 7
+QUANTILES = (0.05, 0.95)
+
+
+def main():
+    """Run the uncertainty band benchmark on the default model."""
+    model = model_inference_service.model
+    evaluator = evaluator_for(model)
+    rng = np.random.default_rng(42)
+    for batch_size in BATCH_SIZES:
+        batch = _random_batch(rng, batch_size, model.feature_names_in_)
+        point = _median_seconds(model.predict, batch)
+        band = _median_seconds(
+            evaluator.predict_distribution,
+            batch,
+            QUANTILES,
+        )
+        logger.info(
+            f'batch {batch_size}: point {point / batch_size * 1e6:.1f} us/row, '
+            f'band {band / batch_size * 1e6:.1f} us/row, '
+            f'overhead x{band / point:.2f}',
+        )
+
+
+def _random_batch(rng, batch_size: int, columns) -> pd.DataFrame:
+    """Return a batch of plausible apartment features."""
+    return pd.DataFrame(
+        {
+            'area': rng.integers(20, 250, batch_size),
+            'constraction_year': rng.integers(1850, 2024, batch_size),
+            'bedrooms': rng.integers(0, 6, batch_size),
+            'garden': rng.integers(0, 100, batch_size),
+            'balcony_yes': rng.integers(0, 2, batch_size),
+            'parking_yes': rng.integers(0, 2, batch_size),
+            'furnished_yes': rng.integers(0, 2, batch_size),
+            'garage_yes': rng.integers(0, 2, batch_size),
+            'storage_yes': rng.integers(0, 2, batch_size),
+        },
+    )[list(columns)]
+
+
+def _median_seconds(function, *args) -> float:
+    """Return the median run time of a function over REPEATS runs."""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+if __name__ == '__main__':
+    main()
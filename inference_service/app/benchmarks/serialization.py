@@ -0,0 +1,95 @@
+"""
+Benchmark of the serialization cost per row of each response format.
+
+For several batch sizes, a prediction response of the size of the batch,
+with its standard deviation and two quantiles, is encoded and decoded in
+every available format: the standard library JSON encoder, the fast JSON
+encoder, MessagePack and Arrow IPC. The median cost per row and the size
+of the payload are logged.
+
+Usage:
+    cd app; python3 -m benchmarks.serialization
+"""
+
+import json
+import statistics
+import time
+
+import numpy as np
+from api import codecs
+from loguru import logger
+
+BATCH_SIZES = [1, 100, 10000, 100000]
+REPEATS = 7
+
+
+def main():
+    """Run the serialization benchmark for every available format."""
+    rng = np.random.default_rng(42)
+    for batch_size in BATCH_SIZES:
+        body = _response_body(rng, batch_size)
+        for name, encode, decode in _formats():
+            payload = encode(body)
+            encode_seconds = _median_seconds(encode, body)
+            decode_seconds = _median_seconds(decode, payload)
+            logger.info(
+                f'batch {batch_size} {name}: '
+                f'encode {encode_seconds / batch_size * 1e6:.2f} us/row, '
+                f'decode {decode_seconds / batch_size * 1e6:.2f} us/row, '
+                f'{len(payload) / batch_size:.1f} bytes/row',
+            )
+
+
+def _formats() -> list:
+    """Return the name, encoder and decoder of every available format."""
+    formats = [
+        ('json', _encode_std_json, json.loads),
+        ('fast json', codecs.encode_json, json.loads),
+    ]
+    if codecs.msgpack is not None:
+        formats.append((
+            'msgpack',
+            lambda body: codecs.msgpack.packb(body, default=codecs._to_builtin),
+            codecs.msgpack.unpackb,
+        ))
+    if codecs.pa is not None:
+        formats.append(('arrow', codecs._encode_arrow, _decode_arrow))
+    return formats
+
+
+def _encode_std_json(body: dict) -> bytes:
+    """Encode a body with the standard library, like Flask's default."""
+    return json.dumps(body, default=codecs._to_builtin).encode()
+
+
+def _decode_arrow(payload: bytes):
+    """Decode an Arrow IPC stream into a table."""
+    with codecs.pa.ipc.open_stream(payload) as reader:
+        return reader.read_all()
+
+
+def _response_body(rng, batch_size: int) -> dict:
+    """Return a prediction response body of `batch_size` rows."""
+    prediction = rng.uniform(500, 5000, batch_size)
+    return {
+        'prediction': prediction.tolist(),
+        'std': (prediction * 0.1).tolist(),
+        'quantiles': {
+            '0.05': (prediction * 0.85).tolist(),
+            '0.95': (prediction * 1.15).tolist(),
+        },
+    }
+
+
+def _median_seconds(function, *args) -> float:
+    """Return the median run time of a function over REPEATS runs."""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+if __name__ == '__main__':
+    main()
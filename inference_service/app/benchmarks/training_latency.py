@@ -0,0 +1,70 @@
+"""
+Benchmark of the serving latency while a model version is trained.
+
+Single row predictions of the default model are timed while the service
+is idle, then while a background training job builds a new version, see
+`services.training_jobs`, until the job finishes and the new version is
+served. The median and tail latencies of both phases are logged with the
+per-stage timings of the job. The version to build is given on the
+command line and must not exist yet.
+
+Usage:
+    cd app; python3 -m benchmarks.training_latency 0.2.0
+"""
+
+import statistics
+import sys
+import time
+
+import numpy as np
+from loguru import logger
+from services import model_inference_service, training_jobs
+
+IDLE_REQUESTS = 500
+POLL_REQUESTS = 50
+# Features in the FEATURE_COLUMNS order
+ROW = [85, 2015, 2, 20, 1, 1, 0, 0, 1]
+
+
+def main():
+    """Run the serving latency benchmark around a training job."""
+    version = sys.argv[1]
+    idle = _timings(IDLE_REQUESTS)
+    job, _ = training_jobs.submit(version)
+    busy = []
+    while True:
+        busy.extend(_timings(POLL_REQUESTS))
+        job = training_jobs.status(job['job_id'])
+        if job['state'] in {'succeeded', 'failed'}:
+            break
+
+    logger.info(
+        f"Training job {job['job_id']} {job['state']}: "
+        f"{job['completed_stages']} {job['error'] or ''}",
+    )
+    logger.info(f'idle: {_percentiles(idle)}')
+    logger.info(f'training: {_percentiles(busy)}')
+    logger.info(f'served version: {model_inference_service.model_version}')
+
+
+def _timings(n_requests: int) -> list:
+    """Return the durations of single row predictions, in seconds."""
+    durations = []
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        model_inference_service.predict(ROW)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _percentiles(durations: list) -> str:
+    """Return the median, p99 and count of durations, in milliseconds."""
+    p99 = np.percentile(durations, 99)
+    return (
+        f'p50 {statistics.median(durations) * 1e3:.2f} ms, '
+        f'p99 {p99 * 1e3:.2f} ms over {len(durations)} requests'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark of the latency of the binary server against the HTTP API.
+
+The Flask application and the Unix domain socket server are started in
+background threads of this process, on a local TCP port and a temporary
+socket, and both serve the default model. The latency of single-row
+requests is measured sequentially on a keep-alive connection of each
+front-end, then the throughput of pipelined single-row requests, which
+the binary server merges into batched model calls.
+
+Usage:
+    cd app; python3 -m benchmarks.uds_latency
+"""
+
+import http.client
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import numpy as np
+from loguru import logger
+from run import app
+from uds.client import PredictionClient
+from uds.server import PredictionServer
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+REQUESTS = 500
+PIPELINE_DEPTHS = [1, 16, 128]
+FEATURES = [85, 2015, 2, 20, 1, 1, 0, 1, 0]
+FIELDS = [
+    'area',
+    'constraction_year',
+    'bedrooms',
+    'garden',
+    'balcony_yes',
+    'parking_yes',
+    'furnished_yes',
+    'garage_yes',
+    'storage_yes',
+]
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler without the access log of every request."""
+
+    def log_request(self, *args, **kwargs) -> None:
+        """Skip the access log, which would dominate the latency."""
+
+
+def main():
+    """Run the latency benchmark of both front-ends."""
+    http_server = make_server(
+        '127.0.0.1',
+        0,
+        app,
+        threaded=True,
+        request_handler=QuietRequestHandler,
+    )
+    socket_path = os.path.join(tempfile.mkdtemp(), 'bench.sock')
+    uds_server = PredictionServer(socket_path)
+    for server in (http_server, uds_server):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        http_latencies = _http_latencies(http_server.server_port)
+        with PredictionClient(socket_path) as client:
+            uds_latencies = _uds_latencies(client)
+            _log_latencies('http', http_latencies)
+            _log_latencies('uds', uds_latencies)
+            for depth in PIPELINE_DEPTHS:
+                _log_pipelined(client, depth)
+    finally:
+        http_server.shutdown()
+        uds_server.shutdown()
+        uds_server.server_close()
+
+
+def _http_latencies(port: int) -> list:
+    """Return the latency of sequential single-row HTTP requests."""
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    body = json.dumps(dict(zip(FIELDS, FEATURES)))
+    headers = {'Content-Type': 'application/json'}
+    latencies = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        connection.request('POST', '/pred/', body, headers)
+        connection.getresponse().read()
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+    return latencies
+
+
+def _uds_latencies(client: PredictionClient) -> list:
+    """Return the latency of sequential single-row binary requests."""
+    rows = np.array([FEATURES])
+    latencies = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        client.predict(rows)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _log_latencies(name: str, latencies: list) -> None:
+    """Log the median and tail latencies of a front-end."""
+    quantiles = statistics.quantiles(latencies, n=100)
+    logger.info(
+        f'{name} single row: '
+        f'p50 {quantiles[49] * 1e6:.0f} us, '
+        f'p99 {quantiles[98] * 1e6:.0f} us',
+    )
+
+
+def _log_pipelined(client: PredictionClient, depth: int) -> None:
+    """Log the throughput of pipelined single-row binary requests."""
+    batches = [np.array([FEATURES])] * depth
+    start = time.perf_counter()
+    for _ in range(max(REQUESTS // depth, 1)):
+        client.predict_many(batches)
+    seconds = time.perf_counter() - start
+    requests = max(REQUESTS // depth, 1) * depth
+    logger.info(
+        f'uds pipeline depth {depth}: {requests / seconds:.0f} requests/s',
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -7,13 +7,25 @@ This module serves as the entry point for the Flask application.
 Usage:
     The flask app is created and started here.
     The prediction blueprint(`api.bp.prediction`) is registered here.
+    JSON responses are serialized by `api.codecs.FastJSONProvider`.
+    Request profiling hooks are installed when enabled in the settings.
+    The training admin blueprint(`api.training`) is registered when the
+    training jobs are enabled in the settings, with an admin token.
 """
 
+from api.codecs import FastJSONProvider
 from api.prediction import bp as prediction_bp
+from api.profiling import init_profiling
+from api.training import bp as training_bp
 from flask import Flask
+from services.config import training_settings
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.register_blueprint(prediction_bp)
+if training_settings.training_enabled:
+    app.register_blueprint(training_bp)
+init_profiling(app)
 
 if __name__ == '__main__':
     app.run(debug=True)
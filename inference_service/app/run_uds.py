@@ -0,0 +1,18 @@
+"""
+Binary prediction server Entry Point.
+
+This module serves the predictions of the default model on the Unix
+domain socket configured by `uds_path`, next to the Flask application.
+
+Usage:
+    cd app; python3 run_uds.py
+    Clients use `uds.client.PredictionClient`.
+"""
+
+from loguru import logger
+from uds.server import PredictionServer
+
+if __name__ == '__main__':
+    with PredictionServer() as server:
+        logger.info(f'Serving predictions on {server.socket_path}')
+        server.serve_forever()
@@ -1,4 +1,49 @@
+from .admission import AdmissionController
+from .artifact import read_manifest
+from .config import model_settings
+from .feature_stats import FeatureStats
 from .model_inference import ModelInferenceService
+from .prediction_store import PredictionStore
+from .shadow import ShadowScorer
+from .training_jobs import TrainingJobManager
 
 model_inference_service = ModelInferenceService()
 model_inference_service.load_model()
+if model_settings.predict_rows_per_job is None:
+    model_inference_service.parallel_predictor.calibrate(
+        model_inference_service.model,
+    )
+
+prediction_store = PredictionStore(
+    model_inference_service.model_name,
+    model_inference_service.model_version,
+)
+
+shadow_scorer = ShadowScorer(model_inference_service)
+
+feature_stats = FeatureStats(
+    (read_manifest(
+        model_inference_service.model_path,
+        model_inference_service.model_name,
+        model_inference_service.model_version,
+    ) or {}).get('feature_profile'),
+)
+
+admission_controller = AdmissionController()
+
+
+def _on_model_swap(version: str) -> None:
+    """Point the services following the default model to a new version.
+
+    Called before the version becomes the default model, so the stored
+    predictions of the previous version are never served for it.
+    """
+    prediction_store.model_version = version
+    feature_stats.profile = (read_manifest(
+        model_inference_service.model_path,
+        model_inference_service.model_name,
+        version,
+    ) or {}).get('feature_profile')
+
+
+training_jobs = TrainingJobManager(model_inference_service, _on_model_swap)
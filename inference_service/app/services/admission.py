@@ -0,0 +1,187 @@
+"""
+This module provides admission control of the prediction requests.
+
+It contains the AdmissionController class, which caps the predictions in
+flight, keeps a bounded queue of waiting requests and limits the requests
+of each client. A request is shed, instead of queued, when the queue is
+full, when the wait estimated from the observed latency would exceed the
+latency SLO, or when its client already has too many requests pending.
+Shedding early keeps the latency of the admitted requests stable under
+overload, and tells callers when to retry.
+
+The limits apply per process: every worker of a multi-process server
+keeps its own controller. The client of a request is whatever its client
+header claims, so the per-client limit spreads the slots among
+well-behaved callers but is not a quota: a caller sending a new
+identifier with every request is only bounded by the queue and the
+latency SLO.
+"""
+
+import math
+import threading
+from typing import Optional
+
+from .config import server_settings
+
+SHED_CLIENT = 'client'
+SHED_QUEUE = 'queue'
+SHED_LATENCY = 'latency'
+SHED_TIMEOUT = 'timeout'
+LATENCY_SMOOTHING = 0.1
+
+
+class AdmissionController:
+    """
+    A service class for admitting or shedding the prediction requests.
+
+    Attributes:
+        max_in_flight (int): Maximum number of predictions in flight.
+        max_queue (int): Maximum number of requests waiting for a slot.
+        max_per_client (int): Maximum number of requests of one client,
+            in flight or waiting.
+        latency_slo (float): Latency objective of a request, in seconds.
+
+    Methods:
+        __init__: Constructor that initializes the AdmissionController.
+        acquire: Admits a request or returns why it is shed.
+        release: Frees the slot of an admitted request.
+        retry_after: Returns the seconds after which a shed request may retry.
+        stats: Returns the admission counters.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = server_settings.admission_max_in_flight,
+        max_queue: int = server_settings.admission_max_queue,
+        max_per_client: int = server_settings.admission_max_per_client,
+        latency_slo_ms: float = server_settings.admission_latency_slo_ms,
+    ) -> None:
+        """Initialize the AdmissionController with default values.
+
+        Args:
+            max_in_flight (int, optional): Maximum number of predictions
+                in flight. Defaults to the configured limit.
+            max_queue (int, optional): Maximum number of waiting requests.
+                Defaults to the configured limit.
+            max_per_client (int, optional): Maximum number of requests of
+                one client. Defaults to the configured limit.
+            latency_slo_ms (float, optional): Latency objective of a
+                request, in milliseconds. Defaults to the configured SLO.
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_per_client = max_per_client
+        self.latency_slo = latency_slo_ms / 1000
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._clients = {}
+        self._latency = 0.0
+        self._admitted = 0
+        self._shed = dict.fromkeys(
+            (SHED_CLIENT, SHED_QUEUE, SHED_LATENCY, SHED_TIMEOUT),
+            0,
+        )
+
+    def acquire(self, client: str) -> Optional[str]:
+        """
+        Admit a request, waiting in the queue for a slot if needed.
+
+        A request waits at most the latency SLO for its slot.
+
+        Args:
+            client (str): The identifier of the calling client.
+
+        Returns:
+            str, optional: None when the request is admitted, otherwise
+                the reason it is shed: `client`, `queue`, `latency` or
+                `timeout`.
+        """
+        with self._condition:
+            if self._clients.get(client, 0) >= self.max_per_client:
+                return self._record_shed(SHED_CLIENT)
+            if self._in_flight < self.max_in_flight and not self._waiting:
+                self._admit(client)
+                return None
+            if self._waiting >= self.max_queue:
+                return self._record_shed(SHED_QUEUE)
+            if self._expected_wait() + self._latency > self.latency_slo:
+                return self._record_shed(SHED_LATENCY)
+
+            self._waiting += 1
+            self._clients[client] = self._clients.get(client, 0) + 1
+            has_slot = self._condition.wait_for(
+                lambda: self._in_flight < self.max_in_flight,
+                timeout=self.latency_slo,
+            )
+            self._waiting -= 1
+            self._release_client(client)
+            if not has_slot:
+                return self._record_shed(SHED_TIMEOUT)
+            self._admit(client)
+            return None
+
+    def release(self, client: str, elapsed: float) -> None:
+        """
+        Free the slot of an admitted request.
+
+        Args:
+            client (str): The identifier of the calling client.
+            elapsed (float): Seconds the request spent in flight, folded
+                into the observed latency.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            self._release_client(client)
+            if self._latency:
+                self._latency += LATENCY_SMOOTHING * (elapsed - self._latency)
+            else:
+                self._latency = elapsed
+            self._condition.notify()
+
+    def retry_after(self) -> int:
+        """Return the seconds after which a shed request may retry."""
+        with self._condition:
+            return max(1, math.ceil(self._expected_wait() + self._latency))
+
+    def stats(self) -> dict:
+        """
+        Return the admission counters.
+
+        Returns:
+            dict: Admitted and shed counts, the shed counts per reason,
+                the predictions in flight, the waiting requests and the
+                observed latency.
+        """
+        with self._condition:
+            return {
+                'admitted': self._admitted,
+                'shed': sum(self._shed.values()),
+                'shed_by_reason': dict(self._shed),
+                'in_flight': self._in_flight,
+                'waiting': self._waiting,
+                'clients': len(self._clients),
+                'latency_ms': self._latency * 1000,
+                'latency_slo_ms': self.latency_slo * 1000,
+            }
+
+    def _admit(self, client: str) -> None:
+        self._in_flight += 1
+        self._admitted += 1
+        self._clients[client] = self._clients.get(client, 0) + 1
+
+    def _release_client(self, client: str) -> None:
+        # Idle clients are forgotten, so the table stays bounded
+        pending = self._clients[client] - 1
+        if pending:
+            self._clients[client] = pending
+        else:
+            del self._clients[client]
+
+    def _expected_wait(self) -> float:
+        """Estimate the wait of a new request from the observed latency."""
+        return (self._waiting + 1) * self._latency / self.max_in_flight
+
+    def _record_shed(self, reason: str) -> str:
+        self._shed[reason] += 1
+        return reason
@@ -0,0 +1,173 @@
+"""
+This module loads the versioned ML model artifacts.
+
+A model is saved by the training pipeline as a directory
+`{models_path}/{models_name}/{version}` holding the serialized model and
+a `manifest.json` describing it. The manifest is validated before the
+model is read, so a truncated or mismatched artifact is rejected without
+unpickling it. Models saved as a single `{models_name}_version_{version}`
+joblib file are still loaded. Model names and versions are checked before
+they are joined to the models directory, so a request can never load a
+file from outside of it.
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Optional, Tuple
+
+import joblib
+from loguru import logger
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+MODEL_FILE = 'model.joblib'
+CHECKSUM_BLOCK = 1024 * 1024
+NAME_PATTERN = re.compile(r'[\w.-]+')
+
+
+class ArtifactError(ValueError):
+    """Raised when a model artifact does not match its manifest."""
+
+
+def valid_name(name: str) -> bool:
+    """Check whether a model name or version can name an artifact."""
+    return (
+        isinstance(name, str)
+        and NAME_PATTERN.fullmatch(name) is not None
+        and name.strip('.') != ''
+    )
+
+
+def model_file(models_path: str, model_name: str, version: str) -> Path:
+    """Return the path of the serialized model, in either format.
+
+    Args:
+        models_path (str): The path to the models directory.
+        model_name (str): The name of the model.
+        version (str): The version of the model.
+
+    Returns:
+        Path: The path of the model file.
+
+    Raises:
+        FileNotFoundError: If the name or version is not a valid name, or
+            the path is outside of the models directory.
+    """
+    directory = _artifact_dir(models_path, model_name, version)
+    if (directory / MANIFEST_FILE).exists():
+        return directory / MODEL_FILE
+    return _inside(
+        models_path,
+        Path(models_path) / f'{model_name}_version_{version}.joblib',
+    )
+
+
+def read_manifest(
+    models_path: str,
+    model_name: str,
+    version: str,
+) -> Optional[dict]:
+    """Read the manifest of a model, None for a legacy or missing model."""
+    manifest_path = _artifact_dir(
+        models_path,
+        model_name,
+        version,
+    ) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, encoding='utf-8') as fichier:
+        return json.load(fichier)
+
+
+def load_artifact(
+    models_path: str,
+    model_name: str,
+    version: str,
+    verify_checksum: bool = False,
+) -> Tuple[object, dict]:
+    """Validate the manifest of a model, then load the model.
+
+    Args:
+        models_path (str): The path to the models directory.
+        model_name (str): The name of the model.
+        version (str): The version of the model.
+        verify_checksum (bool, optional): Also check the checksum of the
+            model file, which reads it twice. Defaults to False.
+
+    Returns:
+        Tuple[object, dict]: The model and its manifest, empty for models
+            saved in the legacy format.
+
+    Raises:
+        FileNotFoundError: If the model file is not found.
+        ArtifactError: If the model file does not match its manifest.
+    """
+    model_path = model_file(models_path, model_name, version)
+    if not model_path.exists():
+        raise FileNotFoundError(f'Model not found at {model_path} -> ')
+
+    manifest = read_manifest(models_path, model_name, version) or {}
+    if manifest:
+        validate_manifest(manifest, model_path.parent, verify_checksum)
+    else:
+        logger.warning(f'Model at {model_path} has no manifest')
+    with open(model_path, 'rb') as fichier:
+        return joblib.load(fichier), manifest
+
+
+def validate_manifest(
+    manifest: dict,
+    directory: Path,
+    verify_checksum: bool = False,
+) -> None:
+    """Check a manifest against the files of its artifact directory.
+
+    The format version and file sizes are always checked, which only
+    needs a `stat` call per file. Checksums are optional.
+
+    Args:
+        manifest (dict): The manifest to validate.
+        directory (Path): The artifact directory.
+        verify_checksum (bool, optional): Also compare the checksums.
+
+    Raises:
+        ArtifactError: If the artifact does not match its manifest.
+    """
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ArtifactError(
+            f"Unsupported artifact format {manifest.get('format_version')}",
+        )
+    for file_name, entry in manifest['files'].items():
+        file_path = directory / file_name
+        if not file_path.exists():
+            raise ArtifactError(f'Missing artifact file {file_path}')
+        if file_path.stat().st_size != entry['size']:
+            raise ArtifactError(f'Size mismatch for artifact file {file_path}')
+        if verify_checksum and _sha256(file_path) != entry['sha256']:
+            raise ArtifactError(f'Checksum mismatch for {file_path}')
+
+
+def _artifact_dir(models_path: str, model_name: str, version: str) -> Path:
+    """Return the artifact directory of a model, checking its names."""
+    for name in (model_name, version):
+        if not valid_name(name):
+            raise FileNotFoundError(f'Invalid model name {name!r} -> ')
+    return _inside(models_path, Path(models_path) / model_name / version)
+
+
+def _inside(models_path: str, path: Path) -> Path:
+    """Return a path, checking that it resolves into the models path."""
+    if not path.resolve().is_relative_to(Path(models_path).resolve()):
+        raise FileNotFoundError(f'Model path {path} is outside -> ')
+    return path
+
+
+def _sha256(file_path: Path) -> str:
+    """Return the sha256 checksum of a file."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as fichier:
+        for block in iter(lambda: fichier.read(CHECKSUM_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
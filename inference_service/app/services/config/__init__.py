@@ -1,6 +1,10 @@
 """Configuration module for the application."""
 
+from .database import db_settings, engine
 from .logger import configure_logging
 from .model import model_settings
 from .paths import env_file
+from .profiling import profiling_settings
+from .server import server_settings
+from .training import training_settings
 
@@ -0,0 +1,80 @@
+"""
+This module sets up the database configuration.
+
+It utilizes Pydantic's BaseSettings for configuration management,
+allowing settings to be read from environment variables and a .env file.
+The engine is read-only and pooled, it is only used to look up
+the precomputed predictions written by the batch scoring job.
+"""
+
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+from .paths import env_file
+
+
+class DbSettings(BaseSettings):
+    """
+    Database configuration settings for the application.
+
+    Attributes:
+        model_config (SettingsConfigDict): Model config, loaded from .env file.
+        db_connection (str, optional): Database connection string. The
+            precomputed predictions lookup is disabled when not set.
+        predictions_table_name (str): Name of the precomputed predictions
+            table in DB.
+        db_pool_size (int): Number of pooled read-only connections.
+        db_max_overflow (int): Connections allowed beyond the pool size.
+    """
+
+    model_config = SettingsConfigDict(
+        env_file=env_file,
+        env_file_encoding='utf-8',
+        extra='ignore',
+    )
+
+    db_connection: Optional[str] = None
+    predictions_table_name: str = 'rent_predictions'
+    db_pool_size: int = 5
+    db_max_overflow: int = 0
+
+
+def create_read_only_engine(db_connection: str) -> Engine:
+    """
+    Create a pooled engine whose connections cannot write.
+
+    SQLite connections are switched to `query_only`, other databases
+    are expected to be reached with a read-only user.
+
+    Args:
+        db_connection (str): Database connection string.
+
+    Returns:
+        Engine: The pooled read-only engine.
+    """
+    read_only_engine = create_engine(
+        db_connection,
+        pool_size=db_settings.db_pool_size,
+        max_overflow=db_settings.db_max_overflow,
+        pool_pre_ping=True,
+    )
+
+    if read_only_engine.dialect.name == 'sqlite':
+        @event.listens_for(read_only_engine, 'connect')
+        def _set_query_only(dbapi_connection, _):  # noqa: WPS430
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA query_only = ON')
+            cursor.close()
+    return read_only_engine
+
+
+db_settings = DbSettings()
+
+engine = (
+    create_read_only_engine(db_settings.db_connection)
+    if db_settings.db_connection
+    else None
+)
@@ -5,6 +5,8 @@ It utilizes Pydantic's BaseSettings for configuration management,
 allowing settings to be read from environment variables and a .env file.
 """
 
+from typing import Optional
+
 from pydantic import DirectoryPath
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -20,6 +22,28 @@ class ModelSettings(BaseSettings):
         models_path (DirectoryPath): Filesystem path to the model.
         models_name (str): Name of the ML model.
         version (str): Version of the ML model.
+        models_memory_budget_mb (float): Memory budget of the models
+            resident in the registry, in megabytes.
+        models_verify_checksum (bool): Verify the checksum of the model
+            artifacts on load, the manifest is always validated.
+        shadow_version (str, optional): Version of the candidate model
+            scored in shadow mode. Shadow mode is disabled when not set.
+        shadow_model_name (str, optional): Name of the candidate model.
+            Defaults to the name of the served model.
+        shadow_sample_rate (float): Fraction of requests sent to the
+            candidate model.
+        shadow_max_workers (int): Threads scoring the candidate model.
+        shadow_max_pending (int): Shadow requests allowed in flight before
+            new ones are dropped.
+        feature_stats_enabled (bool): Keep streaming statistics of the
+            served features.
+        feature_stats_sketch_size (int): Values kept per feature for the
+            approximate quantiles of the served features.
+        predict_max_workers (int, optional): Threads shared by the
+            predictions of large batches. Defaults to the number of CPUs.
+        predict_rows_per_job (int, optional): Rows of a batch per
+            prediction thread. Calibrated on the served model at startup
+            when not set.
 
     """
 
@@ -32,6 +56,17 @@ class ModelSettings(BaseSettings):
     models_path: DirectoryPath
     models_name: str
     version: str
+    models_memory_budget_mb: float = 512
+    models_verify_checksum: bool = False
+    shadow_version: Optional[str] = None
+    shadow_model_name: Optional[str] = None
+    shadow_sample_rate: float = 0.1
+    shadow_max_workers: int = 2
+    shadow_max_pending: int = 16
+    feature_stats_enabled: bool = True
+    feature_stats_sketch_size: int = 1024
+    predict_max_workers: Optional[int] = None
+    predict_rows_per_job: Optional[int] = None
 
 
 model_settings = ModelSettings()
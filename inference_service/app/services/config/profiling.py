@@ -0,0 +1,47 @@
+"""
+This module sets up the request profiling configuration.
+
+It utilizes Pydantic's BaseSettings for configuration management,
+allowing settings to be read from environment variables and a .env file.
+"""
+
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from .paths import env_file
+
+
+class ProfilingSettings(BaseSettings):
+    """
+    Request profiling configuration settings for the application.
+
+    Attributes:
+        model_config (SettingsConfigDict): Model config, loaded from .env file.
+        profiling_enabled (bool): Install the profiling hooks. Nothing runs
+            on the request path when disabled.
+        profile_sample_rate (float): Fraction of requests profiled.
+        profile_header (str): Header asking for a request to be profiled.
+        profile_token (str, optional): Token the profile header must hold
+            for the request to be profiled. The header is ignored when
+            not set, only sampled requests are profiled.
+        profile_dir (str): Directory of the request profiles.
+        profile_max_files (int): Profiles kept in the directory, the
+            oldest ones are deleted beyond it.
+    """
+
+    model_config = SettingsConfigDict(
+        env_file=env_file,
+        env_file_encoding='utf-8',
+        extra='ignore',
+    )
+
+    profiling_enabled: bool = False
+    profile_sample_rate: float = 0.01
+    profile_header: str = 'X-Profile'
+    profile_token: Optional[str] = None
+    profile_dir: str = 'logs/profiles'
+    profile_max_files: int = 100
+
+
+profiling_settings = ProfilingSettings()
@@ -0,0 +1,52 @@
+"""
+This module sets up the serving front-ends configuration.
+
+It utilizes Pydantic's BaseSettings for configuration management,
+allowing settings to be read from environment variables and a .env file.
+"""
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from .paths import env_file
+
+
+class ServerSettings(BaseSettings):
+    """
+    Serving front-ends configuration settings for the application.
+
+    Attributes:
+        model_config (SettingsConfigDict): Model config, loaded from .env file.
+        uds_path (str): Path of the Unix domain socket of the binary server.
+        uds_max_batch_rows (int): Rows of pipelined requests merged into
+            one model call by the binary server.
+        admission_enabled (bool): Whether the prediction requests go
+            through admission control. Disabled by default, the limits
+            depend on the capacity of the deployment.
+        admission_max_in_flight (int): Maximum predictions in flight.
+        admission_max_queue (int): Maximum requests waiting for a slot.
+        admission_max_per_client (int): Maximum requests of one client,
+            in flight or waiting.
+        admission_latency_slo_ms (float): Latency objective of a request,
+            the longest a request waits for a slot.
+        admission_client_header (str): Header identifying the clients,
+            their remote address is used without it. Set by the callers,
+            it is not authenticated: the per-client limit is not a quota.
+    """
+
+    model_config = SettingsConfigDict(
+        env_file=env_file,
+        env_file_encoding='utf-8',
+        extra='ignore',
+    )
+
+    uds_path: str = '/tmp/inference_service.sock'
+    uds_max_batch_rows: int = 4096
+    admission_enabled: bool = False
+    admission_max_in_flight: int = 8
+    admission_max_queue: int = 32
+    admission_max_per_client: int = 8
+    admission_latency_slo_ms: float = 1000
+    admission_client_header: str = 'X-Client-Id'
+
+
+server_settings = ServerSettings()
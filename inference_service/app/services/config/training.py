@@ -0,0 +1,76 @@
+"""
+This module sets up the background training jobs configuration.
+
+It utilizes Pydantic's BaseSettings for configuration management,
+allowing settings to be read from environment variables and a .env file.
+"""
+
+from typing import Optional
+
+from pydantic import model_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from .paths import env_file
+
+
+class TrainingSettings(BaseSettings):
+    """
+    Background training jobs configuration settings for the application.
+
+    Attributes:
+        model_config (SettingsConfigDict): Model config, loaded from .env file.
+        training_enabled (bool): Register the training admin endpoints.
+            Disabled by default, enabling them requires an admin token.
+        training_project_dir (str): Directory of the training project,
+            where `runner_training_job.py` runs. Its models path must be
+            the models path of the service.
+        training_python (str, optional): Python interpreter of the training
+            jobs. Defaults to the interpreter of the service.
+        training_status_dir (str): Directory of the job status and logs.
+        training_max_jobs (int): Training jobs run at the same time, the
+            others wait in a queue.
+        training_cpu_seconds (int, optional): CPU time of a job process,
+            and of each of its workers, before it is killed.
+        training_memory_mb (int, optional): Address space of a job process,
+            and of each of its workers.
+        training_nice (int): Niceness increment of the job processes, so
+            the serving threads keep the CPUs when they need them.
+        training_admin_token (str, optional): Token required in the admin
+            header by every training admin endpoint. Required when the
+            endpoints are enabled.
+        training_admin_header (str): Header holding the admin token.
+    """
+
+    model_config = SettingsConfigDict(
+        env_file=env_file,
+        env_file_encoding='utf-8',
+        extra='ignore',
+    )
+
+    training_enabled: bool = False
+    training_project_dir: str = '../../src'
+    training_python: Optional[str] = None
+    training_status_dir: str = 'logs/training'
+    training_max_jobs: int = 1
+    training_cpu_seconds: Optional[int] = 3600
+    training_memory_mb: Optional[int] = 4096
+    training_nice: int = 19
+    training_admin_token: Optional[str] = None
+    training_admin_header: str = 'X-Admin-Token'
+
+    @model_validator(mode='after')
+    def check_admin_token(self) -> 'TrainingSettings':
+        """Refuse to enable the admin endpoints without an admin token.
+
+        Returns:
+            TrainingSettings: The settings.
+
+        Raises:
+            ValueError: If the endpoints are enabled without a token.
+        """
+        if self.training_enabled and not self.training_admin_token:
+            raise ValueError('training_enabled requires training_admin_token')
+        return self
+
+
+training_settings = TrainingSettings()
@@ -0,0 +1,231 @@
+"""
+This module keeps streaming statistics of the served features.
+
+It contains the FeatureStats class, which updates, for every request,
+the count, mean and variance of each feature (merged per batch with the
+parallel form of Welford's algorithm), its bounds, a fixed-size
+reservoir sketch of its values for approximate quantiles and, for the
+binary `*_yes` flags, their frequency. Memory is constant per feature,
+whatever the traffic: no request is stored.
+
+The statistics are compared with the feature profile saved in the
+manifest of the served model at training time, to detect drift between
+the served traffic and the training data.
+"""
+
+import threading
+import time
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .config import model_settings
+from .model_inference import FEATURE_COLUMNS
+
+PROFILE_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+FLAG_SUFFIX = '_yes'
+
+
+class FeatureStats:
+    """
+    A service class for streaming statistics of the served features.
+
+    Attributes:
+        features (list): The names of the features, in request order.
+        profile (dict, optional): The training feature profile.
+        sketch_size (int): Values kept per feature for the quantiles.
+        enabled (bool): Whether the statistics are updated.
+
+    Methods:
+        __init__: Constructor that initializes the FeatureStats.
+        update: Folds a batch of served features into the statistics.
+        stats: Returns the statistics of the served features.
+        drift: Compares the served statistics with the training profile.
+    """
+
+    def __init__(
+        self,
+        profile: Optional[dict] = None,
+        features: Sequence[str] = tuple(FEATURE_COLUMNS),
+        sketch_size: int = model_settings.feature_stats_sketch_size,
+    ) -> None:
+        """Initialize the FeatureStats with empty statistics.
+
+        Args:
+            profile (dict, optional): The training feature profile, from
+                the manifest of the served model. Defaults to None.
+            features (Sequence[str], optional): The names of the features,
+                in request order. Defaults to the Appartment features.
+            sketch_size (int, optional): Values kept per feature for the
+                quantiles. Defaults to the configured size.
+        """
+        self.features = list(features)
+        self.profile = profile
+        self.sketch_size = sketch_size
+        self.enabled = model_settings.feature_stats_enabled
+        n_features = len(self.features)
+        self._rng = np.random.default_rng()
+        self._lock = threading.Lock()
+        self._count = 0
+        self._mean = np.zeros(n_features)
+        self._m2 = np.zeros(n_features)
+        self._min = np.full(n_features, np.inf)
+        self._max = np.full(n_features, -np.inf)
+        self._sketch = np.zeros((sketch_size, n_features))
+        self._weight = np.ones(n_features)
+        self._next = np.full(n_features, np.iinfo(np.int64).max)
+        self._updates = 0
+        self._update_seconds = 0.0
+
+    def update(self, rows) -> None:
+        """
+        Fold a batch of served features into the statistics.
+
+        Args:
+            rows: A (n_rows, n_features) array-like of features, e.g. a
+                DataFrame or a list of rows, in request order.
+        """
+        if not self.enabled:
+            return
+        start = time.perf_counter()
+        batch = np.asarray(rows, dtype=np.float64).reshape(
+            -1,
+            len(self.features),
+        )
+        if len(batch) == 1:
+            # Single rows are the common case, skip the reductions
+            batch_mean = batch_min = batch_max = batch[0]
+            batch_m2 = 0.0
+        elif len(batch):
+            batch_mean = batch.mean(axis=0)
+            batch_m2 = ((batch - batch_mean) ** 2).sum(axis=0)
+            batch_min = batch.min(axis=0)
+            batch_max = batch.max(axis=0)
+        else:
+            return
+
+        with self._lock:
+            seen = self._count
+            self._count += len(batch)
+            delta = batch_mean - self._mean
+            self._mean += delta * len(batch) / self._count
+            self._m2 += batch_m2 + delta ** 2 * seen * len(batch) / self._count
+            np.minimum(self._min, batch_min, out=self._min)
+            np.maximum(self._max, batch_max, out=self._max)
+            self._sample(batch, seen)
+            self._updates += 1
+            self._update_seconds += time.perf_counter() - start
+
+    def stats(self) -> dict:
+        """
+        Return the statistics of the served features.
+
+        Returns:
+            dict: The number of served rows, the mean time spent updating
+                the statistics per request and, per feature, the mean,
+                standard deviation, bounds and approximate quantiles, or
+                the frequency of the binary flags.
+        """
+        with self._lock:
+            count = self._count
+            mean = self._mean.copy()
+            m2 = self._m2.copy()
+            bounds = (self._min.copy(), self._max.copy())
+            sketch = self._sketch[:min(count, self.sketch_size)].copy()
+            overhead = (
+                self._update_seconds / self._updates * 1e6
+                if self._updates
+                else 0.0
+            )
+
+        features = {}
+        if count:
+            std = np.sqrt(m2 / count)
+            quantiles = np.quantile(sketch, PROFILE_QUANTILES, axis=0)
+            for index, feature in enumerate(self.features):
+                features[feature] = {
+                    'mean': float(mean[index]),
+                    'std': float(std[index]),
+                    'min': float(bounds[0][index]),
+                    'max': float(bounds[1][index]),
+                }
+                if feature.endswith(FLAG_SUFFIX):
+                    features[feature]['frequency'] = float(mean[index])
+                else:
+                    features[feature]['quantiles'] = {
+                        str(quantile): float(value)
+                        for quantile, value in zip(
+                            PROFILE_QUANTILES,
+                            quantiles[:, index],
+                        )
+                    }
+        return {
+            'enabled': self.enabled,
+            'count': count,
+            'overhead_us': overhead,
+            'features': features,
+        }
+
+    def drift(self) -> dict:
+        """
+        Compare the served statistics with the training profile.
+
+        Returns:
+            dict: Per feature, the shift of the mean in training standard
+                deviations and the differences of the quantiles, or of the
+                frequency of the binary flags, with the training data.
+                Empty when there is no profile or no served request.
+        """
+        served = self.stats()['features']
+        if not self.profile or not served:
+            return {}
+        drift = {}
+        for feature, stats in served.items():
+            trained = self.profile.get(feature)
+            if trained is None:
+                continue
+            scale = trained['std'] or 1.0
+            feature_drift = {
+                'mean_shift': (stats['mean'] - trained['mean']) / scale,
+            }
+            if 'frequency' in stats:
+                feature_drift['frequency_delta'] = (
+                    stats['frequency'] - trained.get('frequency', 0.0)
+                )
+            else:
+                feature_drift['quantile_deltas'] = {
+                    quantile: value - trained['quantiles'][quantile]
+                    for quantile, value in stats['quantiles'].items()
+                    if quantile in trained.get('quantiles', {})
+                }
+            drift[feature] = feature_drift
+        return drift
+
+    def _sample(self, batch: np.ndarray, seen: int) -> None:
+        """Update the reservoir sketch of every feature with a batch."""
+        end = seen + len(batch)
+        if seen < self.sketch_size:
+            filled = min(end, self.sketch_size)
+            self._sketch[seen:filled] = batch[:filled - seen]
+            if filled == self.sketch_size:
+                self._weight = np.ones(len(self.features))
+                self._next = np.full(len(self.features), self.sketch_size - 1)
+                self._skip(np.arange(len(self.features)))
+
+        # Algorithm L: the position of the next replacement of a feature is
+        # drawn ahead, so most rows only cost this comparison
+        due = np.flatnonzero(self._next < end)
+        while due.size:
+            slots = self._rng.integers(0, self.sketch_size, size=due.size)
+            self._sketch[slots, due] = batch[self._next[due] - seen, due]
+            self._skip(due)
+            due = due[self._next[due] < end]
+
+    def _skip(self, features: np.ndarray) -> None:
+        """Draw the next replacement position of some features."""
+        uniform = self._rng.random((2, features.size))
+        self._weight[features] *= np.exp(np.log(uniform[0]) / self.sketch_size)
+        self._next[features] += (
+            np.floor(np.log(uniform[1]) / np.log1p(-self._weight[features]))
+            .astype(np.int64) + 1
+        )
@@ -0,0 +1,141 @@
+"""
+This module evaluates every tree of a forest in one vectorized pass.
+
+It contains the ForestEvaluator class, which flattens the trees of a
+fitted RandomForestRegressor into shared node arrays and walks all trees
+for a whole batch at once, one numpy step per depth level. The per-tree
+predictions give the mean, standard deviation and quantiles across the
+trees, the uncertainty band served with the rent estimates.
+
+Point predictions keep using the Cython `predict` of scikit-learn. The
+overhead of the uncertainty band is one numpy step over a
+(n_trees, n_rows) array per depth level, plus the quantile sort over the
+trees, so it grows with the forest depth rather than with a Python loop
+over the trees. `benchmarks/prediction_intervals.py` measures it against
+point-only predictions.
+"""
+
+import weakref
+from typing import Sequence
+
+import numpy as np
+
+LEAF = -1
+
+_evaluators = weakref.WeakKeyDictionary()
+
+
+class ForestEvaluator:
+    """
+    A vectorized evaluator of all the trees of a forest.
+
+    Attributes:
+        roots (np.ndarray): Index of the root node of every tree.
+        max_depth (int): Depth of the deepest tree.
+
+    Methods:
+        __init__: Constructor that flattens the trees of the forest.
+        predict_trees: Returns the prediction of every tree for a batch.
+        predict_distribution: Returns the mean, std and quantiles.
+    """
+
+    def __init__(self, forest) -> None:
+        """Flatten the trees of a fitted forest into shared node arrays.
+
+        Args:
+            forest: A fitted RandomForestRegressor.
+        """
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        node_counts = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate(([0], np.cumsum(node_counts)[:-1]))
+
+        self.roots = offsets
+        self.max_depth = max(tree.max_depth for tree in trees)
+        self._feature = np.concatenate([tree.feature for tree in trees])
+        self._threshold = np.concatenate([tree.threshold for tree in trees])
+        self._value = np.concatenate(
+            [tree.value[:, 0, 0] for tree in trees],
+        )
+        self._left = np.concatenate([
+            _shift(tree.children_left, offset)
+            for tree, offset in zip(trees, offsets)
+        ])
+        self._right = np.concatenate([
+            _shift(tree.children_right, offset)
+            for tree, offset in zip(trees, offsets)
+        ])
+        self._is_leaf = self._left == LEAF
+
+    def predict_trees(self, features) -> np.ndarray:
+        """
+        Return the prediction of every tree for every row of a batch.
+
+        Args:
+            features: The batch of features, in the training feature order.
+
+        Returns:
+            np.ndarray: A (n_trees, n_rows) array of predictions.
+        """
+        # The trees compare float32 features, as scikit-learn does
+        X = np.asarray(features, dtype=np.float32)
+        rows = np.arange(len(X))
+        nodes = np.repeat(self.roots[:, None], len(X), axis=1)
+        for _ in range(self.max_depth):
+            is_leaf = self._is_leaf[nodes]
+            if is_leaf.all():
+                break
+            go_left = X[rows, self._feature[nodes]] <= self._threshold[nodes]
+            children = np.where(go_left, self._left[nodes], self._right[nodes])
+            nodes = np.where(is_leaf, nodes, children)
+        return self._value[nodes]
+
+    def predict_distribution(
+        self,
+        features,
+        quantiles: Sequence[float] = (),
+    ) -> dict:
+        """
+        Return the mean, standard deviation and quantiles across the trees.
+
+        Args:
+            features: The batch of features, in the training feature order.
+            quantiles (Sequence[float], optional): Quantiles to compute,
+                between 0 and 1. Defaults to none.
+
+        Returns:
+            dict: The mean prediction, the standard deviation and the
+                requested quantiles of every row.
+        """
+        per_tree = self.predict_trees(features)
+        distribution = {
+            'prediction': per_tree.mean(axis=0).tolist(),
+            'std': per_tree.std(axis=0).tolist(),
+        }
+        if quantiles:
+            values = np.quantile(per_tree, quantiles, axis=0)
+            distribution['quantiles'] = {
+                str(quantile): row.tolist()
+                for quantile, row in zip(quantiles, values)
+            }
+        return distribution
+
+
+def evaluator_for(forest) -> ForestEvaluator:
+    """Return the evaluator of a forest, built once per loaded model.
+
+    Args:
+        forest: A fitted RandomForestRegressor.
+
+    Returns:
+        ForestEvaluator: The cached evaluator of the forest.
+    """
+    evaluator = _evaluators.get(forest)
+    if evaluator is None:
+        evaluator = ForestEvaluator(forest)
+        _evaluators[forest] = evaluator
+    return evaluator
+
+
+def _shift(children: np.ndarray, offset: int) -> np.ndarray:
+    """Offset the child indices of a tree, keeping the leaf marker."""
+    return np.where(children == LEAF, LEAF, children + offset)
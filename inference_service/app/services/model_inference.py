@@ -2,18 +2,33 @@
 This module provides functionality for managing a ML model.
 
 It contains the ModelInferenceService class, which handles loading and using
-a pre-trained ML model. The class offers methods to load a model
-from a file, building it if it doesn't exist, and to make predictions
-using the loaded model.
+pre-trained ML models. The models are resident in a ModelRegistry, so
+several model names and versions can be served from the same process and
+chosen per request. Point predictions choose their parallelism from the
+size of the batch, see ParallelPredictor.
 """
 
-from pathlib import Path
+from typing import Callable, Sequence
 
-import joblib
 import pandas as pd
 from loguru import logger
 
 from .config import model_settings
+from .forest_evaluator import evaluator_for
+from .model_registry import ModelRegistry
+from .parallelism import ParallelPredictor
+
+FEATURE_COLUMNS = [
+    'area',
+    'constraction_year',
+    'bedrooms',
+    'garden',
+    'balcony_yes',
+    'parking_yes',
+    'furnished_yes',
+    'garage_yes',
+    'storage_yes',
+]
 
 
 class ModelInferenceService:
@@ -25,22 +40,45 @@ class ModelInferenceService:
     predictions using the loaded model.
 
     Attributes:
-        model: ML model managed by this service. Initially set to None.
+        model: Default ML model managed by this service.
         model_path (str): The path to the directory containing the model.
-        model_name (str): The name of the model to load.
+        model_name (str): The name of the default model.
+        model_version (str): The version of the default model.
+        registry (ModelRegistry): The registry holding the resident models.
+        parallel_predictor (ParallelPredictor): Chooses the parallelism of
+            the point predictions.
 
     Methods:
         __init__: Constructor that initializes the ModelService.
         load_model: Loads the model from file or builds it if it doesn't exist.
-        predict: Makes a prediction using the loaded model.
+        predict: Makes a prediction using the default or a chosen model.
+        swap_model: Makes another version the default model.
     """
 
-    def __init__(self) -> None:
-        """Initialize the ModelInferenceService with default values."""
-        self.model = None
+    def __init__(
+        self,
+        registry: ModelRegistry = None,
+        parallel_predictor: ParallelPredictor = None,
+    ) -> None:
+        """Initialize the ModelInferenceService with default values.
+
+        Args:
+            registry (ModelRegistry, optional): The registry holding the
+                resident models. Defaults to a new registry.
+            parallel_predictor (ParallelPredictor, optional): Chooses the
+                parallelism of the point predictions. Defaults to a new
+                predictor.
+        """
         self.model_name = model_settings.models_name
         self.model_path = model_settings.models_path
         self.model_version = model_settings.version
+        self.registry = registry or ModelRegistry(self.model_path)
+        self.parallel_predictor = parallel_predictor or ParallelPredictor()
+
+    @property
+    def model(self):
+        """The default ML model, loaded on first access."""
+        return self.registry.get(self.model_name, self.model_version)
 
     def load_model(self, model_name=None) -> None:
         """Load the model from a specified path, or builds it if not exist.
@@ -57,21 +95,53 @@ class ModelInferenceService:
         if model_name:
             self.model_name = model_name
 
-        version = model_settings.version
-        joblib_model = f'{self.model_name}_version_{version}.joblib'
-        model_path = Path(f'{self.model_path}/{joblib_model}')
+        self.registry.get(self.model_name, self.model_version)
+        # The default model serves most requests, it is never evicted
+        self.registry.pin(self.model_name, self.model_version)
 
-        if not model_path.exists():
-            raise FileNotFoundError(f'Model not found at {model_path} -> ')
+    def swap_model(
+        self,
+        version: str,
+        before_swap: Callable[[str], None] = None,
+    ) -> str:
+        """Make another version of the default model the default model.
 
-        logger.info(
-            f'Model {self.model_name} exists -> '
-            f'Loading Model from {model_path} ...',
-        )
-        with open(model_path, 'rb') as fichier:
-            self.model = joblib.load(fichier)
+        The version is loaded and pinned before it is swapped in, so the
+        requests keep being served by the previous version while it loads.
+        The previous version is unpinned and stays in the registry until it
+        is evicted, as requests in flight may still use it.
+
+        Args:
+            version (str): The version of the new default model.
+            before_swap (Callable, optional): Called with the new version
+                once it is loaded, right before it becomes the default
+                model, e.g. to point other services to it first.
+
+        Returns:
+            str: The version of the previous default model.
 
-    def predict(self, input_parameters: list) -> list:
+        Raises:
+            FileNotFoundError: If the model file is not found
+                                at the specified path
+        """
+        self.registry.get(self.model_name, version)
+        self.registry.pin(self.model_name, version)
+        if before_swap:
+            before_swap(version)
+        previous = self.model_version
+        self.model_version = version
+        if previous != version:
+            self.registry.unpin(self.model_name, previous)
+        return previous
+
+    def predict(
+        self,
+        input_parameters: list,
+        model_name: str = None,
+        version: str = None,
+        quantiles: Sequence[float] = None,
+        return_std: bool = False,
+    ):
         """
         Make a prediction using the loaded model.
 
@@ -80,28 +150,41 @@ class ModelInferenceService:
 
         Args:
             input_parameters (list): The input data for making a prediction.
+            model_name (str, optional): The name of the model to use.
+                Defaults to the default model name.
+            version (str, optional): The version of the model to use.
+                Defaults to the default model version.
+            quantiles (Sequence[float], optional): Quantiles across the
+                trees of the forest to return with the prediction.
+            return_std (bool, optional): Return the standard deviation
+                across the trees of the forest with the prediction.
 
         Returns:
-            list: The prediction result from the model.
+            list: The prediction result from the model, or a dict with the
+                mean prediction, `std` and `quantiles` when an uncertainty
+                band is requested. The band is computed from one vectorized
+                evaluation of all the trees for the whole batch.
         """
-        logger.info(
-            'Predicting the price of the house with the following '
-            f'parameters {input_parameters} ...',
-        )
         if not isinstance(input_parameters, pd.DataFrame):
             input_parameters = pd.DataFrame(
                 [input_parameters],
-                columns=[
-                    'area',
-                    'constraction_year',
-                    'bedrooms',
-                    'garden',
-                    'balcony_yes',
-                    'parking_yes',
-                    'furnished_yes',
-                    'garage_yes',
-                    'storage_yes',
-                ],
+                columns=FEATURE_COLUMNS,
             )
+        logger.debug(
+            f'Predicting the price of {input_parameters.shape[0]} houses '
+            f'of {input_parameters.shape[1]} features ...',
+        )
 
-        return self.model.predict(input_parameters).tolist()
+        model = self.registry.get(
+            model_name or self.model_name,
+            version or self.model_version,
+        )
+        if quantiles or return_std:
+            return evaluator_for(model).predict_distribution(
+                input_parameters,
+                quantiles or (),
+            )
+        return self.parallel_predictor.predict(
+            model,
+            input_parameters,
+        ).tolist()
@@ -0,0 +1,267 @@
+"""
+This module provides a registry of the ML models served by the application.
+
+It contains the ModelRegistry class, which lazily loads model artifacts
+from the models directory, keeps track of the memory footprint of every
+resident model and evicts the least recently used ones once the configured
+memory budget is exceeded. Pinned models, e.g. the default model, are
+never evicted, so loading a candidate model cannot force the default model
+to be reloaded on the request path.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Tuple
+
+from loguru import logger
+
+from .artifact import load_artifact, model_file
+from .config import model_settings
+
+MEGABYTE = 1024 * 1024
+
+
+@dataclass
+class ModelEntry:
+    """
+    A model resident in the registry.
+
+    Attributes:
+        model: The loaded ML model.
+        footprint (int): Estimated memory footprint of the model in bytes.
+        load_seconds (float): Time spent loading the artifact.
+        manifest (dict): Manifest of the artifact, empty for legacy models.
+    """
+
+    model: object
+    footprint: int
+    load_seconds: float
+    manifest: dict
+
+
+class ModelRegistry:
+    """
+    A registry of lazily loaded ML models with LRU residency.
+
+    Attributes:
+        models_path (str): The path to the directory containing the models.
+        memory_budget (int): Memory budget of resident models in bytes.
+
+    Methods:
+        __init__: Constructor that initializes the ModelRegistry.
+        get: Returns a model, loading it if it is not resident.
+        evict: Removes a model from the registry.
+        pin: Keeps a model resident whatever the memory budget.
+        unpin: Lets a pinned model be evicted again.
+        stats: Returns per-model residency, request and load counters.
+    """
+
+    def __init__(
+        self,
+        models_path: str = model_settings.models_path,
+        memory_budget_mb: float = model_settings.models_memory_budget_mb,
+    ) -> None:
+        """Initialize the ModelRegistry with default values.
+
+        Args:
+            models_path (str, optional): The path to the models directory.
+                Defaults to the configured models path.
+            memory_budget_mb (float, optional): Memory budget of resident
+                models in megabytes. Defaults to the configured budget.
+        """
+        self.models_path = models_path
+        self.memory_budget = int(memory_budget_mb * MEGABYTE)
+        self._entries: OrderedDict = OrderedDict()
+        self._requests: dict = {}
+        self._loads: dict = {}
+        self._load_locks: dict = {}
+        self._pinned: set = set()
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str, version: str):
+        """
+        Return a model, loading it from the models directory if needed.
+
+        Args:
+            model_name (str): The name of the model.
+            version (str): The version of the model.
+
+        Returns:
+            The loaded ML model.
+
+        Raises:
+            FileNotFoundError: If the model file is not found
+                                in the models directory
+        """
+        key = (model_name, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._requests[key] = self._requests.get(key, 0) + 1
+                self._entries.move_to_end(key)
+                return entry.model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so resident models keep serving
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                try:
+                    entry = self._load(key)
+                except Exception:
+                    # Unknown models leave no counters behind
+                    with self._lock:
+                        if key not in self._requests:
+                            self._load_locks.pop(key, None)
+                    raise
+                with self._lock:
+                    self._entries[key] = entry
+                    self._evict_over_budget(keep=key)
+            with self._lock:
+                self._requests[key] = self._requests.get(key, 0) + 1
+            return entry.model
+
+    def evict(self, model_name: str, version: str) -> None:
+        """
+        Remove a model from the registry.
+
+        Args:
+            model_name (str): The name of the model.
+            version (str): The version of the model.
+        """
+        with self._lock:
+            self._entries.pop((model_name, version), None)
+
+    def pin(self, model_name: str, version: str) -> None:
+        """
+        Keep a model resident whatever the memory budget.
+
+        Args:
+            model_name (str): The name of the model.
+            version (str): The version of the model.
+        """
+        with self._lock:
+            self._pinned.add((model_name, version))
+
+    def unpin(self, model_name: str, version: str) -> None:
+        """
+        Let a pinned model be evicted again.
+
+        Args:
+            model_name (str): The name of the model.
+            version (str): The version of the model.
+        """
+        with self._lock:
+            self._pinned.discard((model_name, version))
+
+    def stats(self) -> dict:
+        """
+        Return per-model residency, request and load counters.
+
+        Returns:
+            dict: Resident memory, budget and per-model counters.
+        """
+        with self._lock:
+            models = {}
+            for key, requests in self._requests.items():
+                entry = self._entries.get(key)
+                load_times = self._loads.get(key, [])
+                models['{0}:{1}'.format(*key)] = {
+                    'resident': entry is not None,
+                    'pinned': key in self._pinned,
+                    'footprint_mb': entry.footprint / MEGABYTE if entry else 0,
+                    'requests': requests,
+                    'loads': len(load_times),
+                    'last_load_seconds': load_times[-1] if load_times else None,
+                    'manifest': _manifest_summary(entry),
+                }
+            return {
+                'resident_mb': self._resident_bytes() / MEGABYTE,
+                'budget_mb': self.memory_budget / MEGABYTE,
+                'models': models,
+            }
+
+    def _load(self, key: Tuple[str, str]) -> ModelEntry:
+        model_name, version = key
+        model_path = model_file(self.models_path, model_name, version)
+        logger.info(f'Loading Model {model_name}:{version} from {model_path}')
+        start = time.perf_counter()
+        model, manifest = load_artifact(
+            self.models_path,
+            model_name,
+            version,
+            verify_checksum=model_settings.models_verify_checksum,
+        )
+        load_seconds = time.perf_counter() - start
+
+        footprint = _estimate_footprint(model, model_path)
+        with self._lock:
+            self._loads.setdefault(key, []).append(load_seconds)
+        logger.info(
+            f'Model {model_name}:{version} loaded in {load_seconds:.2f}s, '
+            f'footprint is {footprint / MEGABYTE:.1f} MB',
+        )
+        return ModelEntry(model, footprint, load_seconds, manifest)
+
+    def _evict_over_budget(self, keep: Tuple[str, str]) -> None:
+        while self._resident_bytes() > self.memory_budget:
+            evictable = [
+                key
+                for key in self._entries
+                if key != keep and key not in self._pinned
+            ]
+            if not evictable:
+                logger.warning(
+                    'Model {0}:{1} and the pinned models exceed the memory '
+                    'budget'.format(*keep),
+                )
+                return
+            oldest = evictable[0]
+            self._entries.pop(oldest)
+            logger.info('Evicted least recently used model {0}:{1}'.format(
+                *oldest,
+            ))
+
+    def _resident_bytes(self) -> int:
+        return sum(entry.footprint for entry in self._entries.values())
+
+
+def _manifest_summary(entry: ModelEntry = None) -> dict:
+    """Return the manifest fields worth exposing for a resident model."""
+    if entry is None or not entry.manifest:
+        return {}
+    return {
+        'created_at': entry.manifest.get('created_at'),
+        'data_fingerprint': entry.manifest.get('data_fingerprint'),
+        'compression': entry.manifest.get('compression'),
+        'metrics': entry.manifest.get('metrics'),
+    }
+
+
+def _estimate_footprint(model, model_path: Path) -> int:
+    """Estimate the memory footprint of a loaded model in bytes.
+
+    Tree ensembles are measured from their node and value arrays, which
+    hold almost all of their memory. Other models fall back to the size
+    of their artifact on disk.
+
+    Args:
+        model: The loaded ML model.
+        model_path (Path): The path of the model artifact.
+
+    Returns:
+        int: The estimated footprint in bytes.
+    """
+    estimators = getattr(model, 'estimators_', None)
+    if estimators is None:
+        return model_path.stat().st_size
+    footprint = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        footprint += tree.value.nbytes
+        footprint += tree.node_count * tree.__getstate__()['nodes'].itemsize
+    return footprint
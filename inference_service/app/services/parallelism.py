@@ -0,0 +1,262 @@
+"""
+This module chooses the parallelism of every forest prediction.
+
+It contains the ParallelPredictor class, which predicts with the trees
+of a forest split in `n_jobs` chunks, `n_jobs` being chosen from the size
+of the batch. Small batches are predicted in the calling thread, without
+the thread dispatch scikit-learn pays for the `n_jobs` the model was
+trained with. Large batches spread their chunks over one worker pool
+shared by every request, so concurrent large batches queue on a bounded
+number of threads instead of oversubscribing the host. The trees release
+the GIL while they predict.
+
+The number of rows per job is configured, or calibrated at startup on the
+served model by timing batches of increasing size with an increasing
+number of jobs. The crossover points and throughputs of the calibration
+are kept in the report of the predictor.
+"""
+
+import math
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+import numpy as np
+from loguru import logger
+
+from .config import model_settings
+
+CALIBRATION_BATCH_SIZES = (1, 10, 100, 1000, 10000)
+CALIBRATION_REPEATS = 5
+# Speedup needed for a parallel run to count as a crossover, above noise
+CALIBRATION_MIN_SPEEDUP = 1.2
+
+
+class ParallelPredictor:
+    """
+    A service class for predicting with an adaptive number of jobs.
+
+    Attributes:
+        max_workers (int): Threads of the shared worker pool.
+        rows_per_job (float): Rows of a batch per job, batches smaller
+            than two jobs are predicted in the calling thread.
+        calibration (dict): Crossover points and throughputs measured by
+            the last calibration, empty when the rows per job are set.
+
+    Methods:
+        __init__: Constructor that initializes the ParallelPredictor.
+        n_jobs: Returns the number of jobs of a batch.
+        predict: Predicts a batch with the trees of a forest.
+        calibrate: Measures the rows per job on a model.
+        stats: Returns the policy, the calibration and the call counters.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = model_settings.predict_max_workers,
+        rows_per_job: Optional[int] = model_settings.predict_rows_per_job,
+    ) -> None:
+        """Initialize the ParallelPredictor and its worker pool.
+
+        Args:
+            max_workers (int, optional): Threads of the shared worker pool.
+                Defaults to the configured number, or the number of CPUs.
+            rows_per_job (int, optional): Rows of a batch per job.
+                Defaults to the configured number, to be calibrated when
+                not set.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.rows_per_job = rows_per_job or math.inf
+        self.calibration = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='predict',
+        )
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def n_jobs(self, n_rows: int) -> int:
+        """Return the number of jobs of a batch of `n_rows` rows."""
+        if math.isinf(self.rows_per_job):
+            return 1
+        return max(1, min(self.max_workers, n_rows // self.rows_per_job))
+
+    def predict(self, model, features, n_jobs: int = None) -> np.ndarray:
+        """
+        Predict a batch with the trees of a forest.
+
+        Models without trees, e.g. not a forest, use their own `predict`.
+
+        Args:
+            model: A fitted RandomForestRegressor.
+            features: The batch of features, in the training feature order.
+            n_jobs (int, optional): The number of jobs. Defaults to the
+                number chosen from the size of the batch.
+
+        Returns:
+            np.ndarray: The mean prediction of the trees for every row.
+        """
+        estimators = getattr(model, 'estimators_', None)
+        if not estimators:
+            return model.predict(features)
+        # The trees compare float32 features, as scikit-learn does
+        X = np.ascontiguousarray(features, dtype=np.float32)
+        n_jobs = min(n_jobs or self.n_jobs(len(X)), len(estimators))
+        with self._lock:
+            self._calls[str(n_jobs)] = self._calls.get(str(n_jobs), 0) + 1
+
+        if n_jobs == 1:
+            total = _predict_trees(estimators, X)
+        else:
+            chunks = np.array_split(np.arange(len(estimators)), n_jobs)
+            futures = [
+                self._executor.submit(
+                    _predict_trees,
+                    [estimators[index] for index in chunk],
+                    X,
+                )
+                for chunk in chunks
+            ]
+            total = sum(future.result() for future in futures)
+        return total / len(estimators)
+
+    def calibrate(
+        self,
+        model,
+        batch_sizes: Sequence[int] = CALIBRATION_BATCH_SIZES,
+    ) -> dict:
+        """
+        Measure the rows per job on a model and adopt them.
+
+        Batches of increasing size are predicted with 1, 2, 4, ... up to
+        `max_workers` jobs. The first batch size from which more jobs are
+        faster, for it and the next batch size, is the crossover, and the
+        rows per job are chosen so that this batch size gets its fastest
+        number of jobs. The calibration stops once the crossover is
+        confirmed.
+
+        Args:
+            model: A fitted RandomForestRegressor.
+            batch_sizes (Sequence[int], optional): Batch sizes to time.
+
+        Returns:
+            dict: The rows per job, the crossover batch size and the
+                throughput in rows per second of every batch size and
+                number of jobs timed.
+        """
+        rng = np.random.default_rng(0)
+        throughputs = {}
+        candidate = None
+        for batch_size in batch_sizes:
+            features = _synthetic_rows(model, batch_size, rng)
+            rates = {
+                n_jobs: batch_size / self._median_seconds(
+                    model,
+                    features,
+                    n_jobs,
+                )
+                for n_jobs in self._job_counts()
+            }
+            throughputs[str(batch_size)] = {
+                str(n_jobs): rate for n_jobs, rate in rates.items()
+            }
+            fastest = max(rates, key=rates.get)
+            speedup = rates[fastest] / rates[1]
+            if fastest > 1 and speedup >= CALIBRATION_MIN_SPEEDUP:
+                if candidate is not None:
+                    break
+                candidate = (batch_size, fastest)
+            else:
+                # A speedup only counts when the next batch size confirms it
+                candidate = None
+
+        crossover = candidate[0] if candidate else None
+        if candidate:
+            self.rows_per_job = max(1, crossover // candidate[1])
+        else:
+            self.rows_per_job = math.inf
+
+        with self._lock:
+            self._calls = {}
+        self.calibration = {
+            'crossover_rows': crossover,
+            'rows_per_job': _finite(self.rows_per_job),
+            'rows_per_second': throughputs,
+        }
+        for batch_size, rates in throughputs.items():
+            logger.info(
+                f'Calibration batch {batch_size}: ' + ', '.join(
+                    f'{n_jobs} jobs {rate:,.0f} rows/s'
+                    for n_jobs, rate in rates.items()
+                ),
+            )
+        logger.info(
+            f'Predicting with one job per {self.rows_per_job} rows, '
+            f'crossover at {crossover} rows',
+        )
+        return self.calibration
+
+    def stats(self) -> dict:
+        """
+        Return the policy, the calibration and the call counters.
+
+        Returns:
+            dict: The pool size, the rows per job, the last calibration
+                and the number of predict calls per number of jobs.
+        """
+        with self._lock:
+            calls = dict(self._calls)
+        return {
+            'max_workers': self.max_workers,
+            'rows_per_job': _finite(self.rows_per_job),
+            'calibration': self.calibration,
+            'calls_per_n_jobs': calls,
+        }
+
+    def _job_counts(self) -> List[int]:
+        """Return 1, 2, 4, ... up to the size of the worker pool."""
+        counts = [1]
+        while counts[-1] * 2 < self.max_workers:
+            counts.append(counts[-1] * 2)
+        if self.max_workers > 1:
+            counts.append(self.max_workers)
+        return counts
+
+    def _median_seconds(self, model, features, n_jobs: int) -> float:
+        """Return the median run time of a batch over the repeats."""
+        timings = []
+        for _ in range(CALIBRATION_REPEATS):
+            start = time.perf_counter()
+            self.predict(model, features, n_jobs)
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+
+def _predict_trees(estimators: list, X: np.ndarray) -> np.ndarray:
+    """Return the sum of the predictions of some trees."""
+    total = estimators[0].predict(X, check_input=False)
+    for estimator in estimators[1:]:
+        total += estimator.predict(X, check_input=False)
+    return total
+
+
+def _synthetic_rows(model, n_rows: int, rng: np.random.Generator):
+    """Draw rows within the split thresholds of the first tree."""
+    tree = model.estimators_[0].tree_
+    n_features = model.n_features_in_
+    low = np.zeros(n_features)
+    high = np.ones(n_features)
+    for feature in range(n_features):
+        thresholds = tree.threshold[tree.feature == feature]
+        if thresholds.size:
+            low[feature] = thresholds.min()
+            high[feature] = thresholds.max()
+    return rng.uniform(low, high, size=(n_rows, n_features))
+
+
+def _finite(rows_per_job: float) -> Optional[float]:
+    """Return the rows per job, None when batches are never split."""
+    return None if math.isinf(rows_per_job) else rows_per_job
@@ -0,0 +1,195 @@
+"""
+This module provides the lookup of precomputed predictions.
+
+It contains the PredictionStore class, which reads the predictions written
+by the batch scoring job through the pooled read-only engine and keeps
+hit, miss and throughput counters for the lookup path. Predictions are
+keyed by address, by a hash of the features, and by model name and
+version, so a request only hits the prediction of an apartment with its
+own features made by the model it would be served by. Each row records
+how its feature hash was computed, and rows hashed another way are never
+served.
+"""
+
+import hashlib
+import threading
+import time
+from typing import Optional, Sequence
+
+from loguru import logger
+from sqlalchemy import REAL, VARCHAR, Column, MetaData, Table, select
+
+from .config import db_settings, engine, model_settings
+
+# Must match FEATURE_ENCODING of the scoring job, see `feature_key`
+FEATURE_ENCODING = 'sha256-16:float-repr-csv:v1'
+
+
+class PredictionStore:
+    """
+    A service class for looking up precomputed predictions.
+
+    Attributes:
+        model_name (str): Name of the model whose predictions are read.
+        model_version (str): Version of the model whose predictions are read.
+        table (Table): The precomputed predictions table.
+        hits (int): Number of lookups answered by the table.
+        misses (int): Number of lookups that fell back to the live model.
+        encoding_mismatches (int): Number of lookups that found rows whose
+            feature hash was computed with another encoding.
+
+    Methods:
+        __init__: Constructor that initializes the PredictionStore.
+        enabled: Whether a database is configured for lookups.
+        feature_key: Returns the key of a feature vector.
+        lookup: Returns the stored prediction of an apartment, if any.
+        stats: Returns the lookup counters.
+    """
+
+    def __init__(
+        self,
+        model_name: str = model_settings.models_name,
+        model_version: str = model_settings.version,
+    ) -> None:
+        """Initialize the PredictionStore with default values.
+
+        Args:
+            model_name (str, optional): Name of the model whose predictions
+                are read. Defaults to the configured name.
+            model_version (str, optional): Version of the model whose
+                predictions are read. Defaults to the configured version.
+        """
+        self.model_name = model_name
+        self.model_version = model_version
+        self.table = Table(
+            db_settings.predictions_table_name,
+            MetaData(),
+            Column('address', VARCHAR(), primary_key=True),
+            Column('feature_key', VARCHAR(), primary_key=True),
+            Column('feature_encoding', VARCHAR()),
+            Column('model_version', VARCHAR(), primary_key=True),
+            Column('model_name', VARCHAR(), primary_key=True),
+            Column('prediction', REAL()),
+        )
+        self.hits = 0
+        self.misses = 0
+        self.encoding_mismatches = 0
+        self._queried = 0
+        self._lookup_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether a database is configured for lookups."""
+        return engine is not None
+
+    @staticmethod
+    def feature_key(features: Sequence[float]) -> str:
+        """Return the key of a feature vector, encoded as FEATURE_ENCODING.
+
+        The scoring job computes the keys it stores the same way and
+        records its own encoding next to them, which `lookup` checks.
+        """
+        text = ','.join(repr(float(feature)) for feature in features)
+        return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+    def lookup(
+        self,
+        address: Optional[str],
+        features: Sequence[float],
+    ) -> Optional[float]:
+        """
+        Return the precomputed prediction of an apartment.
+
+        Args:
+            address (str, optional): The address of the apartment.
+            features (Sequence[float]): The features of the apartment, in
+                the FEATURE_COLUMNS order.
+
+        Returns:
+            float, optional: The stored prediction, None on a miss.
+        """
+        if not self.enabled or not address:
+            self._record(hit=False, elapsed=None)
+            return None
+
+        start = time.perf_counter()
+        query = select(
+            self.table.c.feature_key,
+            self.table.c.feature_encoding,
+            self.table.c.prediction,
+        ).where(
+            self.table.c.address == address,
+            self.table.c.model_name == self.model_name,
+            self.table.c.model_version == self.model_version,
+        )
+        try:
+            with engine.connect() as connection:
+                rows = connection.execute(query).all()
+        except Exception as error:  # noqa: B902
+            logger.warning(f'Precomputed prediction lookup failed: {error}')
+            rows = []
+        prediction = self._match(rows, self.feature_key(features))
+        self._record(
+            hit=prediction is not None,
+            elapsed=time.perf_counter() - start,
+        )
+        return prediction
+
+    def stats(self) -> dict:
+        """
+        Return the lookup counters.
+
+        Returns:
+            dict: Hits, misses, hit ratio, encoding mismatches and
+                database rows read per second of lookup time.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'encoding_mismatches': self.encoding_mismatches,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'rows_per_second': (
+                    self._queried / self._lookup_seconds
+                    if self._lookup_seconds
+                    else 0.0
+                ),
+            }
+
+    def _match(self, rows: list, key: str) -> Optional[float]:
+        """Return the prediction of the row with the key, if any.
+
+        Rows hashed with another encoding cannot be compared with the key,
+        they are counted and reported instead of being silently missed.
+        """
+        stale = [
+            row for row in rows if row.feature_encoding != FEATURE_ENCODING
+        ]
+        if stale:
+            with self._lock:
+                self.encoding_mismatches += 1
+                first = self.encoding_mismatches == 1
+            if first:
+                logger.warning(
+                    f'Stored predictions use the feature encoding '
+                    f'{stale[0].feature_encoding!r}, expected '
+                    f'{FEATURE_ENCODING!r}, rescore the table',
+                )
+        for row in rows:
+            if row.feature_encoding == FEATURE_ENCODING and (
+                row.feature_key == key
+            ):
+                return row.prediction
+        return None
+
+    def _record(self, hit: bool, elapsed: Optional[float]) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if elapsed is not None:
+                self._queried += 1
+                self._lookup_seconds += elapsed
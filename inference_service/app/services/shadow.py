@@ -0,0 +1,189 @@
+"""
+This module provides shadow scoring of a candidate ML model.
+
+It contains the ShadowScorer class, which sends a sample of the served
+requests to a candidate model on a bounded background thread pool and
+aggregates the deltas with the predictions of the default model in
+constant memory. Requests answered from the precomputed predictions table
+are also predicted by the default model on the shadow thread, so the
+deltas always compare model against model.
+The request path never waits on the candidate model: work is dropped
+when the pool is saturated.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from loguru import logger
+
+from .config import model_settings
+from .model_inference import ModelInferenceService
+
+
+class ShadowScorer:
+    """
+    A service class for scoring a candidate model off the request path.
+
+    Attributes:
+        model_name (str): The name of the candidate model.
+        version (str): The version of the candidate model.
+        sample_rate (float): Fraction of requests sent to the candidate.
+
+    Methods:
+        __init__: Constructor that initializes the ShadowScorer.
+        enabled: Whether a candidate model is configured.
+        submit: Schedules the shadow scoring of a served request.
+        stats: Returns the aggregated deltas and overhead counters.
+    """
+
+    def __init__(
+        self,
+        inference_service: ModelInferenceService,
+        version: str = model_settings.shadow_version,
+        model_name: str = model_settings.shadow_model_name,
+    ) -> None:
+        """Initialize the ShadowScorer with default values.
+
+        Args:
+            inference_service (ModelInferenceService): The service holding
+                the served and candidate models.
+            version (str, optional): The version of the candidate model.
+                Defaults to the configured shadow version.
+            model_name (str, optional): The name of the candidate model.
+                Defaults to the name of the served model.
+        """
+        self.inference_service = inference_service
+        self.version = version
+        self.model_name = model_name or inference_service.model_name
+        self.sample_rate = model_settings.shadow_sample_rate
+        self._executor = ThreadPoolExecutor(
+            max_workers=model_settings.shadow_max_workers,
+            thread_name_prefix='shadow',
+        )
+        self._slots = threading.BoundedSemaphore(
+            model_settings.shadow_max_pending,
+        )
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._dropped = 0
+        self._failed = 0
+        self._overhead_seconds = 0.0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._abs_sum = 0.0
+        self._abs_max = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether a candidate model is configured."""
+        return self.version is not None
+
+    def submit(
+        self,
+        input_parameters: list,
+        prediction: Optional[list] = None,
+    ) -> None:
+        """
+        Schedule the shadow scoring of a served request.
+
+        Returns immediately, the request is dropped when it is not sampled
+        or when every shadow slot is busy.
+
+        Args:
+            input_parameters (list): The validated input parameters.
+            prediction (list, optional): The prediction of the default
+                model. Predicted on the shadow thread when not given, e.g.
+                for a request answered from the precomputed predictions.
+        """
+        if not self.enabled:
+            return
+        if random.random() >= self.sample_rate:  # noqa: S311
+            return
+
+        start = time.perf_counter()
+        if self._slots.acquire(blocking=False):
+            future = self._executor.submit(
+                self._score,
+                input_parameters,
+                prediction,
+            )
+            future.add_done_callback(lambda _: self._slots.release())
+            submitted = True
+        else:
+            submitted = False
+        overhead = time.perf_counter() - start
+
+        with self._lock:
+            self._overhead_seconds += overhead
+            if submitted:
+                self._submitted += 1
+            else:
+                self._dropped += 1
+
+    def stats(self) -> dict:
+        """
+        Return the aggregated deltas and overhead counters.
+
+        Returns:
+            dict: Submitted, dropped and failed counts, the mean, standard
+                deviation, mean absolute and max absolute deltas between
+                the candidate and served predictions, and the mean time
+                spent on the request path.
+        """
+        with self._lock:
+            sampled = self._submitted + self._dropped
+            return {
+                'model': f'{self.model_name}:{self.version}',
+                'submitted': self._submitted,
+                'dropped': self._dropped,
+                'failed': self._failed,
+                'scored': self._count,
+                'delta_mean': self._mean,
+                'delta_std': (
+                    (self._m2 / (self._count - 1)) ** 0.5
+                    if self._count > 1
+                    else 0.0
+                ),
+                'delta_abs_mean': (
+                    self._abs_sum / self._count if self._count else 0.0
+                ),
+                'delta_abs_max': self._abs_max,
+                'overhead_us': (
+                    self._overhead_seconds / sampled * 1e6 if sampled else 0.0
+                ),
+            }
+
+    def _score(
+        self,
+        input_parameters: list,
+        prediction: Optional[list],
+    ) -> None:
+        try:
+            if prediction is None:
+                prediction = self.inference_service.predict(input_parameters)
+            candidate = self.inference_service.predict(
+                input_parameters,
+                model_name=self.model_name,
+                version=self.version,
+            )
+        except Exception as error:  # noqa: B902
+            logger.warning(f'Shadow scoring failed: {error}')
+            with self._lock:
+                self._failed += 1
+            return
+
+        with self._lock:
+            for served, shadowed in zip(prediction, candidate):
+                self._update(shadowed - served)
+
+    def _update(self, delta: float) -> None:
+        self._count += 1
+        previous_mean = self._mean
+        self._mean += (delta - previous_mean) / self._count
+        self._m2 += (delta - previous_mean) * (delta - self._mean)
+        self._abs_sum += abs(delta)
+        self._abs_max = max(self._abs_max, abs(delta))
@@ -0,0 +1,325 @@
+"""
+This module runs the training of new model versions in the background.
+
+It contains the TrainingJobManager class, which starts every training job
+as a separate process, `runner_training_job.py` of the training project,
+from a small bounded thread pool, so neither the request threads nor the
+interpreter of the service do any training work. The job process limits
+its own CPU time and memory and lowers its priority before training.
+A job submitted for a version already being trained returns the running
+job instead of starting another one.
+
+The progress of a job, its completed stages with their durations and its
+running stage, is read from the status file the job process writes after
+every stage. When a job succeeds, the new version is loaded on the job
+thread and only then becomes the default model, the request threads never
+wait for it to load. The services following the default model are pointed
+to the new version before it is swapped in.
+"""
+
+import json
+import os
+import re
+import signal
+import subprocess  # noqa: S404
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional, Tuple
+
+from loguru import logger
+
+from .artifact import model_file
+from .config import training_settings
+from .model_inference import ModelInferenceService
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+RUNNER = 'runner_training_job.py'
+VERSION_PATTERN = re.compile(r'[\w.-]+')
+# Finished jobs kept for the status endpoint
+MAX_FINISHED_JOBS = 100
+LOG_TAIL_BYTES = 2048
+
+
+class TrainingJobError(ValueError):
+    """Raised when a training job cannot be submitted."""
+
+
+@dataclass
+class TrainingJob:
+    """
+    A training job of a model version.
+
+    Attributes:
+        job_id (str): The identifier of the job.
+        version (str): The version of the model the job builds.
+        state (str): 'queued', 'running', 'succeeded' or 'failed'.
+        submitted_at (str): When the job was submitted, in ISO format.
+        started_at (str, optional): When the job process started.
+        finished_at (str, optional): When the job finished.
+        pid (int, optional): The pid of the job process.
+        returncode (int, optional): The exit code of the job process,
+            negative when it was killed by a signal.
+        error (str, optional): Why the job failed.
+        served (bool): Whether the version became the default model.
+    """
+
+    job_id: str
+    version: str
+    state: str
+    submitted_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    pid: Optional[int] = None
+    returncode: Optional[int] = None
+    error: Optional[str] = None
+    served: bool = False
+
+
+class TrainingJobManager:
+    """
+    A service class for running training jobs in separate processes.
+
+    Attributes:
+        inference_service (ModelInferenceService): The service whose
+            default model is replaced by the trained versions.
+        status_dir (str): Directory of the job status files and logs.
+
+    Methods:
+        __init__: Constructor that initializes the TrainingJobManager.
+        submit: Starts the training of a version, or joins its running job.
+        status: Returns the state and progress of a job.
+        stats: Returns the state and progress of every job.
+    """
+
+    def __init__(
+        self,
+        inference_service: ModelInferenceService,
+        on_swap: Callable[[str], None] = None,
+    ) -> None:
+        """Initialize the TrainingJobManager and its job threads.
+
+        Args:
+            inference_service (ModelInferenceService): The service whose
+                default model is replaced by the trained versions.
+            on_swap (Callable, optional): Called with the new version once
+                it is loaded, right before it becomes the default model,
+                e.g. to update other services.
+        """
+        self.inference_service = inference_service
+        self.status_dir = training_settings.training_status_dir
+        self._on_swap = on_swap
+        self._executor = ThreadPoolExecutor(
+            max_workers=training_settings.training_max_jobs,
+            thread_name_prefix='training',
+        )
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict = OrderedDict()
+        self._active: dict = {}
+        os.makedirs(self.status_dir, exist_ok=True)
+
+    def submit(self, version: str) -> Tuple[dict, bool]:
+        """
+        Start the training of a version, or join its running job.
+
+        Args:
+            version (str): The version of the model to build.
+
+        Returns:
+            Tuple[dict, bool]: The status of the job, and whether it was
+                created by this call rather than already queued or running.
+
+        Raises:
+            TrainingJobError: If the version is not a valid version name,
+                or already exists.
+        """
+        if not VERSION_PATTERN.fullmatch(version):
+            raise TrainingJobError(f'Invalid version {version!r}')
+        with self._lock:
+            job = self._active.get(version)
+            if job is not None:
+                logger.info(
+                    f'Training of {version} already {job.state} '
+                    f'as job {job.job_id}',
+                )
+                return self._describe(job), False
+            model_path = model_file(
+                self.inference_service.model_path,
+                self.inference_service.model_name,
+                version,
+            )
+            if model_path.exists():
+                raise TrainingJobError(f'Version {version} already exists')
+            job = TrainingJob(
+                job_id=uuid.uuid4().hex[:12],
+                version=version,
+                state=QUEUED,
+                submitted_at=_now(),
+            )
+            self._jobs[job.job_id] = job
+            self._active[version] = job
+            self._forget_finished()
+        logger.info(f'Training job {job.job_id} of {version} queued')
+        self._executor.submit(self._run, job)
+        return self._describe(job), True
+
+    def status(self, job_id: str) -> Optional[dict]:
+        """
+        Return the state and progress of a job.
+
+        Args:
+            job_id (str): The identifier of the job.
+
+        Returns:
+            dict, optional: The job, its planned and completed stages with
+                their durations, its running stage and the fraction of
+                stages completed. None for an unknown job.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._describe(job) if job else None
+
+    def stats(self) -> dict:
+        """
+        Return the state and progress of every job.
+
+        Returns:
+            dict: The default model version and the jobs, newest first.
+        """
+        with self._lock:
+            jobs = [
+                self._describe(job) for job in reversed(self._jobs.values())
+            ]
+        return {
+            'served_version': self.inference_service.model_version,
+            'jobs': jobs,
+        }
+
+    def _run(self, job: TrainingJob) -> None:
+        """Run the job process, then serve the version it built."""
+        command = [
+            training_settings.training_python or sys.executable,
+            RUNNER,
+            job.version,
+            os.path.abspath(self._path(job, 'json')),
+            '--nice',
+            str(training_settings.training_nice),
+        ]
+        if training_settings.training_cpu_seconds:
+            command += [
+                '--cpu-seconds',
+                str(training_settings.training_cpu_seconds),
+            ]
+        if training_settings.training_memory_mb:
+            command += [
+                '--memory-mb',
+                str(training_settings.training_memory_mb),
+            ]
+
+        try:
+            with open(self._path(job, 'log'), 'wb') as log:
+                process = subprocess.Popen(  # noqa: S603
+                    command,
+                    cwd=training_settings.training_project_dir,
+                    stdin=subprocess.DEVNULL,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                )
+                self._update(
+                    job,
+                    state=RUNNING,
+                    pid=process.pid,
+                    started_at=_now(),
+                )
+                logger.info(
+                    f'Training job {job.job_id} of {job.version} started '
+                    f'as process {process.pid}',
+                )
+                returncode = process.wait()
+            self._update(job, returncode=returncode)
+            if returncode:
+                raise TrainingJobError(self._failure(job, returncode))
+            self._serve(job)
+        except Exception as error:  # noqa: B902
+            logger.warning(f'Training job {job.job_id} failed: {error}')
+            self._update(job, state=FAILED, error=str(error))
+        else:
+            self._update(job, state=SUCCEEDED)
+        finally:
+            with self._lock:
+                job.finished_at = _now()
+                self._active.pop(job.version, None)
+
+    def _serve(self, job: TrainingJob) -> None:
+        """Make the version built by a job the default model."""
+        previous = self.inference_service.swap_model(
+            job.version,
+            before_swap=self._on_swap,
+        )
+        self._update(job, served=True)
+        logger.info(
+            f'Serving {self.inference_service.model_name}:{job.version} '
+            f'instead of {previous}',
+        )
+
+    def _describe(self, job: TrainingJob) -> dict:
+        """Return a job with the progress read from its status file."""
+        progress = self._read_status(job)
+        stages = progress.get('stages', [])
+        completed = progress.get('completed', {})
+        return {
+            **asdict(job),
+            'stages': stages,
+            'completed_stages': completed,
+            'current_stage': progress.get('current'),
+            'progress': len(completed) / len(stages) if stages else 0.0,
+            'report': progress.get('report'),
+        }
+
+    def _read_status(self, job: TrainingJob) -> dict:
+        status_path = self._path(job, 'json')
+        if not os.path.exists(status_path):
+            return {}
+        with open(status_path, encoding='utf-8') as fichier:
+            return json.load(fichier)
+
+    def _failure(self, job: TrainingJob, returncode: int) -> str:
+        """Return why a job process failed, from its status or its log."""
+        if returncode < 0:
+            reason = f'killed by {signal.Signals(-returncode).name}'
+        else:
+            reason = f'exited with {returncode}'
+        error = self._read_status(job).get('error')
+        if error is None:
+            with open(self._path(job, 'log'), 'rb') as log:
+                log.seek(max(0, os.path.getsize(log.name) - LOG_TAIL_BYTES))
+                error = log.read().decode(errors='replace')
+        return f'Training process {reason}: {error}'
+
+    def _update(self, job: TrainingJob, **fields) -> None:
+        with self._lock:
+            for name, field_value in fields.items():
+                setattr(job, name, field_value)
+
+    def _forget_finished(self) -> None:
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.state in {SUCCEEDED, FAILED}
+        ]
+        for job_id in finished[:-MAX_FINISHED_JOBS]:
+            self._jobs.pop(job_id)
+
+    def _path(self, job: TrainingJob, extension: str) -> str:
+        return os.path.join(self.status_dir, f'{job.job_id}.{extension}')
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,91 @@
+"""
+Tests of the Unix domain socket client.
+
+Run from the `app` directory: `python3 -m pytest tests`.
+"""
+
+import socket
+import threading
+
+import numpy as np
+import pytest
+from uds import protocol
+from uds.client import PredictionClient
+
+RECV_SIZE = 64 * 1024
+TIMEOUT = 60
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    """Serve one connection the way PredictionServer does.
+
+    The stub answers the frames of every receive with a blocking write, so
+    a client that stops reading stops the stub from reading its requests.
+    A request of a single NaN row is answered with an error frame.
+    """
+    path = str(tmp_path / 'uds.sock')
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(1)
+    server = threading.Thread(target=_serve, args=(listener,), daemon=True)
+    server.start()
+    yield path
+    listener.close()
+
+
+def test_pipelining_megabytes_does_not_deadlock(socket_path):
+    """Requests and responses larger than the socket buffers go through."""
+    rng = np.random.default_rng(0)
+    batches = [
+        rng.random((5000, protocol.NUM_FEATURES), dtype=np.float32)
+        for _ in range(50)
+    ]
+    results = []
+
+    with PredictionClient(socket_path) as client:
+        caller = threading.Thread(
+            target=lambda: results.extend(client.predict_many(batches)),
+            daemon=True,
+        )
+        caller.start()
+        caller.join(TIMEOUT)
+
+        assert not caller.is_alive(), 'predict_many is deadlocked'
+    assert sum(batch.nbytes for batch in batches) > 8 * 1024 * 1024
+    assert len(results) == len(batches)
+    for batch, predictions in zip(batches, results):
+        np.testing.assert_allclose(predictions, batch.sum(axis=1))
+
+
+def test_error_frame_keeps_the_connection_in_sync(socket_path):
+    """A failed batch is reported after the other responses are read."""
+    batches = [np.ones((2, protocol.NUM_FEATURES)), [[np.nan] * 9]]
+
+    with PredictionClient(socket_path) as client:
+        with pytest.raises(protocol.ProtocolError, match='NaN'):
+            client.predict_many([*batches, np.ones((1, 9))])
+        predictions = client.predict(np.ones((3, protocol.NUM_FEATURES)))
+
+    np.testing.assert_allclose(predictions, [9, 9, 9])
+
+
+def _serve(listener: socket.socket) -> None:
+    connection, _ = listener.accept()
+    buffer = bytearray()
+    with connection:
+        while True:
+            received = connection.recv(RECV_SIZE)
+            if not received:
+                return
+            buffer += received
+            payloads, used = protocol.split_frames(buffer)
+            del buffer[:used]
+            connection.sendall(b''.join(map(_answer, payloads)))
+
+
+def _answer(payload: bytes) -> bytes:
+    features = protocol.decode_request(payload)
+    if np.isnan(features).any():
+        return protocol.encode_error('NaN features')
+    return protocol.encode_response(features.sum(axis=1))
@@ -0,0 +1 @@
+"""Binary prediction server and client on a Unix domain socket."""
@@ -0,0 +1,159 @@
+"""
+This module provides a client of the Unix domain socket prediction server.
+
+It only depends on numpy and `uds.protocol`, so local callers can use it
+without loading the inference service.
+
+Usage:
+    with PredictionClient('/tmp/inference_service.sock') as client:
+        predictions = client.predict([[85, 2015, 2, 20, 1, 1, 0, 1, 0]])
+"""
+
+import socket
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from uds import protocol
+
+
+class PredictionClient:
+    """
+    A client of the Unix domain socket prediction server.
+
+    Attributes:
+        socket_path (str): The path of the server socket.
+
+    Methods:
+        __init__: Constructor that connects to the server.
+        predict: Returns the predictions of a batch of rows.
+        predict_many: Pipelines several batches on the connection.
+        close: Closes the connection.
+    """
+
+    def __init__(self, socket_path: str) -> None:
+        """Connect to the server.
+
+        Args:
+            socket_path (str): The path of the server socket.
+        """
+        self.socket_path = socket_path
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(socket_path)
+        self._reader = self._socket.makefile('rb')
+
+    def __enter__(self) -> 'PredictionClient':
+        """Return the connected client."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Close the connection."""
+        self.close()
+
+    def predict(self, rows) -> np.ndarray:
+        """
+        Return the predictions of a batch of rows.
+
+        Args:
+            rows: A (n_rows, 9) array-like of features, in the Appartment
+                schema order.
+
+        Returns:
+            np.ndarray: One prediction per row.
+
+        Raises:
+            ProtocolError: If the server could not predict the batch.
+        """
+        self._socket.sendall(protocol.encode_request(rows))
+        return self._read_response()
+
+    def predict_many(self, batches: Sequence) -> List[np.ndarray]:
+        """
+        Pipeline several batches on the connection.
+
+        The requests are written by a sender thread while the responses are
+        read, so the server can merge the requests that arrive together
+        into one model call. Writing every request before reading would
+        deadlock once the responses fill the socket buffers: the server
+        blocks writing them and stops reading the requests.
+
+        Args:
+            batches (Sequence): Batches of rows, as accepted by `predict`.
+
+        Returns:
+            List[np.ndarray]: The predictions of every batch, in order.
+
+        Raises:
+            ProtocolError: If the server could not predict a batch, once
+                the responses of the other batches are read.
+            ConnectionError: If the server closed the connection.
+        """
+        frames = [protocol.encode_request(rows) for rows in batches]
+        sender = threading.Thread(
+            target=self._send_frames,
+            args=(frames,),
+            daemon=True,
+        )
+        sender.start()
+        try:
+            responses, error = self._read_responses(len(frames))
+        finally:
+            sender.join()
+        if error is not None:
+            raise error
+        return responses
+
+    def close(self) -> None:
+        """Close the connection."""
+        self._reader.close()
+        self._socket.close()
+
+    def _send_frames(self, frames: List[bytes]) -> None:
+        """Write request frames until the server closes the connection."""
+        try:
+            for frame in frames:
+                self._socket.sendall(frame)
+        except OSError:
+            # The reader reports why the server closed the connection
+            return
+
+    def _read_responses(
+        self,
+        count: int,
+    ) -> Tuple[List[np.ndarray], Optional[protocol.ProtocolError]]:
+        """Read `count` responses, keeping the stream in sync on errors.
+
+        An error frame answers one request only, the responses of the next
+        requests are still read, so the connection stays usable.
+
+        Returns:
+            Tuple[List[np.ndarray], ProtocolError]: The predictions of the
+                successful requests and the first error, if any.
+        """
+        responses = []
+        error = None
+        for _ in range(count):
+            try:
+                responses.append(self._read_response())
+            except protocol.ProtocolError as failure:
+                error = error or failure
+            except ConnectionError:
+                # A server closing after an error frame has no more answers
+                if error is None:
+                    raise
+                break
+        return responses, error
+
+    def _read_response(self) -> np.ndarray:
+        """Read and decode the next response frame."""
+        (length,) = protocol.LENGTH.unpack(
+            self._read_exactly(protocol.LENGTH.size),
+        )
+        return protocol.decode_response(self._read_exactly(length))
+
+    def _read_exactly(self, size: int) -> bytes:
+        """Read exactly `size` bytes from the connection."""
+        data = self._reader.read(size)
+        if len(data) < size:
+            raise ConnectionError('Connection closed by the server')
+        return data
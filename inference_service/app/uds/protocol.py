@@ -0,0 +1,144 @@
+"""
+This module defines the binary protocol of the Unix domain socket server.
+
+Every message is a frame made of a little-endian uint32 payload length
+followed by the payload:
+- request payload: uint32 number of rows, then the rows as packed float32,
+  NUM_FEATURES values per row in the Appartment schema order.
+- response payload: uint32 number of rows, then one packed float64
+  prediction per row. On error, the number of rows is ERROR_ROWS and the
+  rest of the payload is the UTF-8 error message.
+Responses are sent in the order of the requests, so a client can pipeline
+several requests on a connection. It must read the responses while it
+writes the requests: the server stops reading while a response write is
+blocked, see `PredictionClient.predict_many`. A request holds at most the
+rows of one model call of the server, a longer frame is a protocol error
+and the server closes the connection.
+"""
+
+import struct
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+NUM_FEATURES = 9
+ERROR_ROWS = 0xFFFFFFFF
+LENGTH = struct.Struct('<I')
+ROWS = struct.Struct('<I')
+FEATURE_DTYPE = np.dtype('<f4')
+PREDICTION_DTYPE = np.dtype('<f8')
+
+
+class ProtocolError(ValueError):
+    """Raised when a frame does not follow the protocol."""
+
+
+def encode_request(rows) -> bytes:
+    """
+    Encode rows of features as a request frame.
+
+    Args:
+        rows: A (n_rows, NUM_FEATURES) array-like of features.
+
+    Returns:
+        bytes: The request frame.
+    """
+    features = np.ascontiguousarray(rows, dtype=FEATURE_DTYPE)
+    features = features.reshape(-1, NUM_FEATURES)
+    payload = ROWS.pack(len(features)) + features.tobytes()
+    return LENGTH.pack(len(payload)) + payload
+
+
+def decode_request(payload: bytes) -> np.ndarray:
+    """
+    Decode the payload of a request frame.
+
+    Args:
+        payload (bytes): The payload, without its length prefix.
+
+    Returns:
+        np.ndarray: A (n_rows, NUM_FEATURES) float32 array of features.
+
+    Raises:
+        ProtocolError: If the payload size does not match its row count.
+    """
+    if len(payload) < ROWS.size:
+        raise ProtocolError('Missing row count')
+    (n_rows,) = ROWS.unpack_from(payload)
+    expected = ROWS.size + n_rows * NUM_FEATURES * FEATURE_DTYPE.itemsize
+    if len(payload) != expected:
+        raise ProtocolError(f'Expected {expected} bytes, got {len(payload)}')
+    features = np.frombuffer(payload, FEATURE_DTYPE, offset=ROWS.size)
+    return features.reshape(n_rows, NUM_FEATURES)
+
+
+def encode_response(predictions) -> bytes:
+    """Encode predictions as a response frame."""
+    values = np.ascontiguousarray(predictions, dtype=PREDICTION_DTYPE)
+    payload = ROWS.pack(len(values)) + values.tobytes()
+    return LENGTH.pack(len(payload)) + payload
+
+
+def encode_error(message: str) -> bytes:
+    """Encode an error message as a response frame."""
+    payload = ROWS.pack(ERROR_ROWS) + message.encode()
+    return LENGTH.pack(len(payload)) + payload
+
+
+def decode_response(payload: bytes) -> np.ndarray:
+    """
+    Decode the payload of a response frame.
+
+    Args:
+        payload (bytes): The payload, without its length prefix.
+
+    Returns:
+        np.ndarray: The predictions.
+
+    Raises:
+        ProtocolError: If the server answered with an error.
+    """
+    (n_rows,) = ROWS.unpack_from(payload)
+    if n_rows == ERROR_ROWS:
+        raise ProtocolError(payload[ROWS.size:].decode())
+    return np.frombuffer(payload, PREDICTION_DTYPE, offset=ROWS.size)
+
+
+def max_request_length(max_rows: int) -> int:
+    """Return the payload length of a request of `max_rows` rows."""
+    return ROWS.size + max_rows * NUM_FEATURES * FEATURE_DTYPE.itemsize
+
+
+def split_frames(
+    buffer: bytearray,
+    max_length: Optional[int] = None,
+) -> Tuple[List[bytes], int]:
+    """
+    Split the complete frames at the start of a receive buffer.
+
+    Args:
+        buffer (bytearray): The bytes received so far.
+        max_length (int, optional): The longest payload accepted, checked
+            as soon as the length prefix arrives. Defaults to no limit.
+
+    Returns:
+        Tuple[List[bytes], int]: The payloads of the complete frames and
+            the number of bytes they used in the buffer.
+
+    Raises:
+        ProtocolError: If a payload is longer than `max_length`.
+    """
+    payloads = []
+    offset = 0
+    while len(buffer) - offset >= LENGTH.size:
+        (length,) = LENGTH.unpack_from(buffer, offset)
+        if max_length is not None and length > max_length:
+            raise ProtocolError(
+                f'Frame of {length} bytes, at most {max_length} accepted',
+            )
+        end = offset + LENGTH.size + length
+        if len(buffer) < end:
+            break
+        payloads.append(bytes(buffer[offset + LENGTH.size:end]))
+        offset = end
+    return payloads, offset
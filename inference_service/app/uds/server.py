@@ -0,0 +1,149 @@
+"""
+This module serves predictions on a Unix domain socket.
+
+It contains the PredictionServer class, a threaded Unix stream server
+speaking the binary protocol of `uds.protocol`. Local callers skip the
+HTTP parsing, the JSON encoding and the schema validation of the Flask
+API: features arrive as packed float32 rows and predictions leave as
+packed float64 values.
+
+Every connection is served by its own thread. The complete frames that
+arrived together on a connection, e.g. pipelined requests, are merged
+into one model call of at most `uds_max_batch_rows` rows, and their
+responses are sent back in order with a single write. Their features are
+folded into the served feature statistics, as for the HTTP API. A frame
+longer than a request of `uds_max_batch_rows` rows is answered with an
+error and the connection is closed, before its payload is buffered.
+"""
+
+import os
+import socketserver
+from typing import List
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from services import feature_stats, model_inference_service
+from services.config import server_settings
+from services.model_inference import FEATURE_COLUMNS
+from uds import protocol
+
+RECV_SIZE = 64 * 1024
+
+
+class PredictionHandler(socketserver.BaseRequestHandler):
+    """Serve the frames of one connection until the client closes it."""
+
+    def handle(self) -> None:
+        """Read the frames of the connection and answer them in order."""
+        buffer = bytearray()
+        max_length = protocol.max_request_length(self.server.max_batch_rows)
+        while True:
+            received = self.request.recv(RECV_SIZE)
+            if not received:
+                return
+            buffer += received
+            try:
+                payloads, used = protocol.split_frames(buffer, max_length)
+            except protocol.ProtocolError as error:
+                logger.warning(f'Closing binary connection: {error}')
+                self.request.sendall(protocol.encode_error(str(error)))
+                return
+            if payloads:
+                del buffer[:used]
+                self.request.sendall(self.server.answer(payloads))
+
+
+class PredictionServer(socketserver.ThreadingUnixStreamServer):
+    """
+    A threaded Unix domain socket server of predictions.
+
+    Attributes:
+        socket_path (str): The path of the socket.
+        max_batch_rows (int): Rows of pipelined requests merged into one
+            model call, and the most rows of a single request.
+
+    Methods:
+        __init__: Constructor that binds the socket.
+        answer: Returns the response frames of a list of request payloads.
+        server_close: Closes the server and removes the socket file.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str = server_settings.uds_path,
+        inference_service=model_inference_service,
+        max_batch_rows: int = server_settings.uds_max_batch_rows,
+    ) -> None:
+        """Bind the server to its socket, replacing a stale socket file.
+
+        Args:
+            socket_path (str, optional): The path of the socket.
+                Defaults to the configured path.
+            inference_service (ModelInferenceService, optional): The
+                service making the predictions.
+            max_batch_rows (int, optional): Rows of pipelined requests
+                merged into one model call.
+        """
+        self.socket_path = socket_path
+        self.inference_service = inference_service
+        self.max_batch_rows = max_batch_rows
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, PredictionHandler)
+
+    def answer(self, payloads: List[bytes]) -> bytes:
+        """
+        Return the response frames of a list of request payloads.
+
+        Args:
+            payloads (List[bytes]): The request payloads, in arrival order.
+
+        Returns:
+            bytes: The response frames, in the same order.
+        """
+        responses = []
+        batch = []
+        for payload in payloads:
+            try:
+                features = protocol.decode_request(payload)
+            except protocol.ProtocolError as error:
+                responses.extend(self._predict_batch(batch))
+                batch = []
+                responses.append(protocol.encode_error(str(error)))
+                continue
+            batch_rows = sum(len(batched) for batched in batch)
+            if batch and batch_rows + len(features) > self.max_batch_rows:
+                responses.extend(self._predict_batch(batch))
+                batch = []
+            batch.append(features)
+        responses.extend(self._predict_batch(batch))
+        return b''.join(responses)
+
+    def server_close(self) -> None:
+        """Close the server and remove its socket file."""
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def _predict_batch(self, batch: List[np.ndarray]) -> List[bytes]:
+        """Predict the requests of a batch with one model call."""
+        if not batch:
+            return []
+        features = pd.DataFrame(np.concatenate(batch), columns=FEATURE_COLUMNS)
+        feature_stats.update(features)
+        try:
+            predictions = np.asarray(
+                self.inference_service.predict(features),
+                dtype=protocol.PREDICTION_DTYPE,
+            )
+        except Exception as error:  # noqa: B902
+            logger.warning(f'Binary prediction failed: {error}')
+            return [protocol.encode_error(str(error)) for _ in batch]
+        bounds = np.cumsum([len(features) for features in batch])[:-1]
+        return [
+            protocol.encode_response(values)
+            for values in np.split(predictions, bounds)
+        ]
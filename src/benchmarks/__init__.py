@@ -0,0 +1 @@
+"""Benchmarks of the ML pipelines, run from the `src` directory."""
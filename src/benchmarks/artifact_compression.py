@@ -0,0 +1,76 @@
+"""
+Benchmark of the model artifact load time for each compression setting.
+
+The current model is saved with every compression setting in a temporary
+directory, then loaded several times. The artifact size, the dump time
+and the median load time are logged for each setting, after the median
+time to read the manifest of the current model.
+
+Usage:
+    cd src; python3 -m benchmarks.artifact_compression
+"""
+
+import os
+import statistics
+import tempfile
+import time
+from importlib.util import find_spec
+
+import joblib
+from loguru import logger
+
+from config import model_settings
+from model.pipeline.artifact import load_artifact, read_manifest
+
+REPEATS = 5
+SETTINGS = [
+    None,
+    ('zlib', 1),
+    ('zlib', 3),
+    ('zlib', 9),
+    ('lz4', 1),
+    ('lz4', 3),
+    ('lz4', 9),
+]
+
+
+def main():
+    """Run the compression benchmark on the current model."""
+    model, _ = load_artifact()
+    manifest_seconds = _median_seconds(read_manifest)
+    logger.info(f'Manifest read in {manifest_seconds * 1e3:.2f} ms')
+
+    with tempfile.TemporaryDirectory(prefix='bench_') as bench_dir:
+        for compression in SETTINGS:
+            if compression and not _available(compression[0]):
+                logger.warning(f'Skipping {compression}, not installed')
+                continue
+            model_path = os.path.join(bench_dir, 'model.joblib')
+            start = time.perf_counter()
+            joblib.dump(model, model_path, compress=compression or 0)
+            dump_seconds = time.perf_counter() - start
+            load_seconds = _median_seconds(joblib.load, model_path)
+            logger.info(
+                f'{model_settings.models_name} {compression or "none"}: '
+                f'{os.path.getsize(model_path) / 1e6:.1f} MB, '
+                f'dump {dump_seconds:.3f}s, load {load_seconds:.3f}s',
+            )
+
+
+def _available(method: str) -> bool:
+    """Check whether the module of a compression method is installed."""
+    return method != 'lz4' or find_spec('lz4') is not None
+
+
+def _median_seconds(function, *args) -> float:
+    """Return the median run time of a function over REPEATS runs."""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+if __name__ == '__main__':
+    main()
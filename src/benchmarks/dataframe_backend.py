@@ -0,0 +1,110 @@
+"""
+Benchmark of the data preparation with each dataframe backend.
+
+Synthetic apartments tables of several sizes are written to temporary
+SQLite databases, then prepared end to end with the pandas backend, the
+Arrow backend and the SQL pushdown of the encoding. The median preparation
+time and throughput of each backend are logged, after checking that they
+all give the same DataFrame.
+
+Usage:
+    cd src; python3 -m benchmarks.dataframe_backend
+"""
+
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sqlalchemy import create_engine
+
+from databases.db_model import RentApartments
+from model.pipeline import arrow_backend
+from model.pipeline.preparation import prepare_data
+
+TABLE_SIZES = [100000, 1000000]
+BACKENDS = ['pandas', 'arrow', 'sql']
+REPEATS = 3
+YES_NO = np.array(['yes', 'no'])
+
+
+def main():
+    """Run the dataframe backend benchmark for every table size."""
+    rng = np.random.default_rng(42)
+    reader = 'ADBC' if arrow_backend.adbc_sqlite else 'pandas pyarrow dtypes'
+    logger.info(f'Arrow backend reads SQLite with {reader}')
+    with tempfile.TemporaryDirectory(prefix='bench_') as bench_dir:
+        for table_size in TABLE_SIZES:
+            db_path = os.path.join(bench_dir, f'rent_{table_size}.sqlite')
+            bind = create_engine(f'sqlite:///{db_path}')
+            _write_table(bind, rng, table_size)
+
+            prepared = {
+                backend: prepare_data(backend=backend, bind=bind)
+                for backend in BACKENDS
+            }
+            for backend in BACKENDS[1:]:
+                pd.testing.assert_frame_equal(
+                    prepared['pandas'],
+                    prepared[backend],
+                )
+            for backend in BACKENDS:
+                seconds = _median_seconds(prepare_data, backend, bind)
+                logger.info(
+                    f'{table_size} rows {backend}: {seconds:.3f}s, '
+                    f'{table_size / seconds:,.0f} rows/s',
+                )
+            bind.dispose()
+
+
+def _write_table(bind, rng: np.random.Generator, table_size: int) -> None:
+    """Write a synthetic apartments table of the given size."""
+    gardens = rng.integers(0, 120, table_size)
+    rows = pd.DataFrame({
+        'address': [f'Street {index}' for index in range(table_size)],
+        'area': rng.integers(20, 200, table_size).astype(float),
+        'constraction_year': rng.integers(1900, 2024, table_size),
+        'rooms': rng.integers(1, 8, table_size),
+        'bedrooms': rng.integers(1, 6, table_size),
+        'bathrooms': rng.integers(1, 3, table_size),
+        'garden': np.where(
+            gardens < 60,
+            'Not present',
+            [f'Present ({garden} m²)' for garden in gardens],
+        ),
+        'balcony': rng.choice(YES_NO, table_size),
+        'parking': rng.choice(YES_NO, table_size),
+        'furnished': rng.choice(YES_NO, table_size),
+        'garage': rng.choice(YES_NO, table_size),
+        'storage': rng.choice(YES_NO, table_size),
+        'energy': rng.choice(list('ABCDEFG'), table_size),
+        'facilities': 'Shopping centre, Schools',
+        'zip': rng.integers(1000, 9999, table_size).astype(str),
+        'neighborhood': rng.choice(['North', 'South', 'Centre'], table_size),
+        'rent': rng.integers(500, 5000, table_size),
+    })
+    RentApartments.__table__.create(bind)
+    rows.to_sql(
+        RentApartments.__tablename__,
+        bind,
+        if_exists='append',
+        index=False,
+        chunksize=50000,
+    )
+
+
+def _median_seconds(function, *args) -> float:
+    """Return the median run time of a function over REPEATS runs."""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function(None, *args)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,8 @@ class DbSettings(BaseSettings):
         model_config (SettingsConfigDict): Model config, loaded from .env file.
         db_connection (str): Database connection string.
         table_name (str): Name of the rental apartments table in DB.
+        predictions_table_name (str): Name of the precomputed predictions
+            table in DB.
     """
 
     model_config = SettingsConfigDict(
@@ -27,6 +29,7 @@ class DbSettings(BaseSettings):
 
     db_connection: str
     table_name: str
+    predictions_table_name: str = 'rent_predictions'
 
 
 db_settings = DbSettings()
@@ -5,7 +5,10 @@ It utilizes Pydantic's BaseSettings for configuration management,
 allowing settings to be read from environment variables and a .env file.
 """
 
-from pydantic import DirectoryPath
+from importlib.util import find_spec
+from typing import Literal, Optional
+
+from pydantic import DirectoryPath, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -19,6 +22,49 @@ class ModelSettings(BaseSettings):
         models_name (str): Name of the ML model.
         version (str): Version of the ML model.
         data_file_name (str): Name of the data file.
+        incremental_trees (int): Trees added by an incremental refresh.
+        incremental_fraction (float): Fraction of the training rows drawn by
+            the 'weighted' sampling of an incremental refresh.
+        incremental_sampling (str): 'recent' to train on the rows added
+            since the current version, 'weighted' to draw a
+            recency-weighted sample of all the training rows.
+        out_of_core (bool): Train from database chunks instead of loading
+            the whole table in memory.
+        ooc_chunk_size (int): Rows per chunk of the out-of-core training.
+        ooc_max_workers (int, optional): Processes fitting the chunks.
+            Defaults to the number of CPUs.
+        shared_training_data (bool): Share the training matrix with the
+            cross-validation workers through a memory-mapped file instead
+            of pickling it for every fit.
+        shared_memory_dir (str, optional): Directory of the memory-mapped
+            file. Defaults to /dev/shm when available.
+        model_compression (str): Compression of the saved model artifacts,
+            'none', 'lz4' (requires the lz4 package) or 'zlib'. An
+            unavailable codec fails when the settings load.
+        model_compression_level (int): Compression level, from 1 to 9.
+        profile_training (bool): Run every training stage under cProfile.
+        profile_dir (str): Directory of the training profiles.
+        dataframe_backend (str): Backend of the data preparation, 'pandas'
+            for object columns, 'arrow' for Arrow columns (requires the
+            pyarrow package, and reads SQLite through ADBC when the
+            adbc-driver-sqlite package is installed) or 'sql' to encode
+            the features in the SQLite query.
+        search_checkpoint (bool): Save the score of every (candidate, fold)
+            of the hyperparameter search, so an interrupted or extended
+            search only runs the missing fits. Off by default: the
+            `training_seconds` metric then only covers the fits run by the
+            last search, not the time to train the model from scratch.
+        search_checkpoint_dir (str): Directory of the search checkpoints.
+        distillation (bool): Distill the selected forest into a smaller
+            forest meeting the latency target, saved as a separate model.
+            Off by default, it fits one more full forest and the students.
+        distillation_latency_ms (float): Target latency of a single row
+            prediction by the distilled model, in milliseconds.
+        distillation_synthetic_ratio (float): Synthetic rows labelled by
+            the selected forest, per training row.
+        distillation_model_name (str, optional): Name of the distilled
+            model. Defaults to `{models_name}_distilled`.
+        distillation_seed (int): Seed of the synthetic rows and students.
     """
 
     model_config = SettingsConfigDict(
@@ -31,6 +77,44 @@ class ModelSettings(BaseSettings):
     models_name: str
     version: str
     data_file_name: str
+    incremental_trees: int = 50
+    incremental_fraction: float = 0.2
+    incremental_sampling: Literal['recent', 'weighted'] = 'recent'
+    out_of_core: bool = False
+    ooc_chunk_size: int = 50000
+    ooc_max_workers: Optional[int] = None
+    shared_training_data: bool = False
+    shared_memory_dir: Optional[str] = None
+    model_compression: Literal['none', 'lz4', 'zlib'] = 'none'
+    model_compression_level: int = 3
+    profile_training: bool = False
+    profile_dir: str = 'logs/profiles'
+    dataframe_backend: Literal['pandas', 'arrow', 'sql'] = 'pandas'
+    search_checkpoint: bool = False
+    search_checkpoint_dir: str = 'checkpoints/search'
+    distillation: bool = False
+    distillation_latency_ms: float = 5.0
+    distillation_synthetic_ratio: float = 1.0
+    distillation_model_name: Optional[str] = None
+    distillation_seed: int = 42
+
+    @field_validator('model_compression')
+    @classmethod
+    def check_compression(cls, compression: str) -> str:
+        """Check that the package of the compression codec is installed.
+
+        Args:
+            compression (str): The compression codec.
+
+        Returns:
+            str: The compression codec.
+
+        Raises:
+            ValueError: If the codec is 'lz4' and lz4 is not installed.
+        """
+        if compression == 'lz4' and find_spec('lz4') is None:
+            raise ValueError('lz4 compression requires the lz4 package')
+        return compression
 
 
 model_settings = ModelSettings()
@@ -63,3 +63,36 @@ class RentApartments(Base):
     zip: Mapped[str] = mapped_column(VARCHAR())
     neighborhood: Mapped[str] = mapped_column(VARCHAR())
     rent: Mapped[int] = mapped_column(INTEGER())
+
+
+class RentPredictions(Base):
+    """
+    SQLAlchemy model class for precomputed rent predictions.
+
+    Rows are written by the batch scoring job and read by the inference
+    service before falling back to the live model. Several apartments can
+    share an address, so rows are also keyed by their features. The
+    registry of the service serves several models, which can share a
+    version, so rows are keyed by model name and version.
+
+    Attributes:
+        address (str): The address of the apartment, part of the primary key.
+        feature_key (str): Hash of the features of the apartment, part of
+            the primary key, see `model.pipeline.scoring.feature_key`.
+        feature_encoding (str): How `feature_key` was computed, checked by
+            the inference service before it trusts the key.
+        model_version (str): Version of the model that produced the row,
+            part of the primary key.
+        model_name (str): Name of the model that produced the row, part
+            of the primary key.
+        prediction (float): Predicted monthly rent price.
+    """
+
+    __tablename__ = db_settings.predictions_table_name
+
+    address: Mapped[str] = mapped_column(VARCHAR(), primary_key=True)
+    feature_key: Mapped[str] = mapped_column(VARCHAR(), primary_key=True)
+    feature_encoding: Mapped[str] = mapped_column(VARCHAR())
+    model_version: Mapped[str] = mapped_column(VARCHAR(), primary_key=True)
+    model_name: Mapped[str] = mapped_column(VARCHAR(), primary_key=True)
+    prediction: Mapped[float] = mapped_column(REAL())
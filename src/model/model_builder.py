@@ -5,12 +5,13 @@ It contains the ModelBuilderService class, which handles the training
 of a ML model from a specified path,
 """
 
-from pathlib import Path
-
 from loguru import logger
 
 from config import model_settings
+from model.pipeline.artifact import artifact_dir, artifact_exists
+from model.pipeline.incremental import refresh_model
 from model.pipeline.model import build_model
+from model.pipeline.out_of_core import build_model_out_of_core
 
 
 class ModelBuilderService:
@@ -29,6 +30,7 @@ class ModelBuilderService:
     Methods:
         __init__: Constructor that initializes the ModelBuilderService.
         train_model: Train the model from a specified path.
+        refresh_model: Grow the current model with trees fitted on new rows.
     """
 
     def __init__(self) -> None:
@@ -40,6 +42,9 @@ class ModelBuilderService:
     def train_model(self, model_name=None) -> None:
         """Train the model from a specified path, or builds it if not exist.
 
+        The model is built out-of-core when `model_settings.out_of_core`
+        is set, for tables that do not fit in memory.
+
         Args:
             model_name (str, optional): The name of the model to load.
                 Defaults to None.
@@ -48,13 +53,30 @@ class ModelBuilderService:
         if model_name:
             self.model_name = model_name
 
-        joblib_model = f'{self.model_name}_version_{self.model_version}.joblib'
-        model_path = Path(f'{self.model_path}/{joblib_model}')
+        model_path = artifact_dir(self.model_version, self.model_name)
 
-        if not model_path.exists():
+        if not artifact_exists(self.model_version, self.model_name):
             logger.warning(
                 f'Model not found at {model_path} -> '
                 + f'Building a new {model_settings.models_name} model ...',
             )
 
-            build_model()
+            if model_settings.out_of_core:
+                build_model_out_of_core()
+            else:
+                build_model()
+
+    def refresh_model(self, new_version: str) -> dict:
+        """Refresh the current model and save it as a new version.
+
+        Args:
+            new_version (str): The version of the refreshed model.
+
+        Returns:
+            dict: The metrics of the refreshed model.
+        """
+        logger.info(
+            f'Refreshing Model {self.model_name} version '
+            f'{self.model_version} -> {new_version} ...',
+        )
+        return refresh_model(new_version)
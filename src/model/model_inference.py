@@ -7,13 +7,11 @@ from a file, building it if it doesn't exist, and to make predictions
 using the loaded model.
 """
 
-from pathlib import Path
-
-import joblib
 import pandas as pd
 from loguru import logger
 
 from config import model_settings
+from model.pipeline.artifact import load_artifact
 
 
 class ModelInferenceService:
@@ -28,6 +26,7 @@ class ModelInferenceService:
         model: ML model managed by this service. Initially set to None.
         model_path (str): The path to the directory containing the model.
         model_name (str): The name of the model to load.
+        manifest (dict): Manifest of the loaded model artifact.
 
     Methods:
         __init__: Constructor that initializes the ModelService.
@@ -38,6 +37,7 @@ class ModelInferenceService:
     def __init__(self) -> None:
         """Initialize the ModelInferenceService with default values."""
         self.model = None
+        self.manifest = {}
         self.model_name = model_settings.models_name
         self.model_path = model_settings.models_path
         self.model_version = model_settings.version
@@ -52,24 +52,17 @@ class ModelInferenceService:
         Raises:
             FileNotFoundError: If the model file is not found
                                 at the specified path
+            ArtifactError: If the model file does not match its manifest
         """
         logger.info('Checking the existence of model config file ...')
         if model_name:
             self.model_name = model_name
 
-        version = model_settings.version
-        joblib_model = f'{self.model_name}_version_{version}.joblib'
-        model_path = Path(f'{self.model_path}/{joblib_model}')
-
-        if not model_path.exists():
-            raise FileNotFoundError(f'Model not found at {model_path} -> ')
-
-        logger.info(
-            f'Model {self.model_name} exists -> '
-            f'Loading Model from {model_path} ...',
+        self.model, self.manifest = load_artifact(
+            self.model_version,
+            self.model_name,
         )
-        with open(model_path, 'rb') as fichier:
-            self.model = joblib.load(fichier)
+        logger.info(f'Model {self.model_name} {self.model_version} loaded')
 
     def predict(self, input_parameters: list) -> list:
         """
@@ -104,4 +97,4 @@ class ModelInferenceService:
                 ],
             )
 
-        return self.model.predict(input_parameters)
+        return self.model.predict(input_parameters).tolist()
@@ -0,0 +1,175 @@
+"""
+This module provides the Arrow backend of the data preparation.
+
+The default backend reads the database rows into Python objects and
+encodes object columns with pandas. This backend keeps the columns in
+Arrow memory from the database to the encoded features:
+- the rows are read into an Arrow table, by the ADBC SQLite driver when
+  `adbc-driver-sqlite` is installed, so no Python object is created per
+  value, otherwise by pandas with pyarrow-backed dtypes.
+- the yes/no columns and the garden column are encoded with vectorized
+  Arrow compute kernels instead of `get_dummies` and a Python regex per
+  row.
+The encoded table is converted to pandas once, at the end, and gives the
+same DataFrame as the default backend, column order and dtypes included.
+"""
+
+from typing import List
+
+import pandas as pd
+from loguru import logger
+from sqlalchemy import Engine, select
+
+from config import engine
+from databases.db_model import RentApartments
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover
+    pa = None
+
+try:
+    from adbc_driver_sqlite import dbapi as adbc_sqlite
+except ImportError:  # pragma: no cover
+    adbc_sqlite = None
+
+# Value of the garden column of an apartment without garden, shared by
+# every preparation backend
+GARDEN_ABSENT = 'Not present'
+
+
+def prepare_table(
+    columns: List[str],
+    cat_columns: List[str],
+    bind: Engine = None,
+) -> pd.DataFrame:
+    """Load, encode and parse the columns of the apartments table.
+
+    Args:
+        columns (List[str]): The columns of the table to load.
+        cat_columns (List[str]): The yes/no columns to encode.
+        bind (Engine, optional): The database engine.
+            Defaults to the configured engine.
+
+    Returns:
+        pd.DataFrame: The encoded columns, as `encode_cat_cols` and
+            `parse_garden_col` return them.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    if pa is None:
+        raise ImportError('The arrow dataframe backend requires pyarrow')
+    table = load_table_from_db(columns, bind)
+    table = encode_cat_cols(table, cat_columns)
+    table = parse_garden_col(table)
+    return table.to_pandas()
+
+
+def load_table_from_db(columns: List[str], bind: Engine = None) -> 'pa.Table':
+    """Load columns of the apartments table into an Arrow table.
+
+    Args:
+        columns (List[str]): The columns of the table to load.
+        bind (Engine, optional): The database engine.
+            Defaults to the configured engine.
+
+    Returns:
+        pa.Table: The loaded columns.
+    """
+    query = select(*[getattr(RentApartments, col) for col in columns])
+    if adbc_available(bind):
+        return read_adbc(query, bind)
+
+    logger.info('Loading data from database into Arrow dtypes ...')
+    db_data = pd.read_sql(query, bind or engine, dtype_backend='pyarrow')
+    # Without the pandas metadata, `to_pandas` gives numpy dtypes back
+    return pa.Table.from_pandas(
+        db_data,
+        preserve_index=False,
+    ).replace_schema_metadata()
+
+
+def adbc_available(bind: Engine = None) -> bool:
+    """Check whether a database can be read with the ADBC SQLite driver."""
+    bind = bind or engine
+    return (
+        pa is not None
+        and adbc_sqlite is not None
+        and bind.dialect.name == 'sqlite'
+    )
+
+
+def read_adbc(query, bind: Engine = None) -> 'pa.Table':
+    """Run a query with the ADBC SQLite driver.
+
+    Args:
+        query: The SQLAlchemy Core query.
+        bind (Engine, optional): The SQLite database engine.
+            Defaults to the configured engine.
+
+    Returns:
+        pa.Table: The result of the query.
+    """
+    bind = bind or engine
+    logger.info('Loading data from database with ADBC ...')
+    sql = str(query.compile(bind, compile_kwargs={'literal_binds': True}))
+    with adbc_sqlite.connect(bind.url.database) as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetch_arrow_table()
+
+
+def encode_cat_cols(table: 'pa.Table', columns: List[str]) -> 'pa.Table':
+    """Encode categorical columns as uint8 dummies, as `get_dummies` does.
+
+    Every category but the first, in sorted order, gets a `{col}_{value}`
+    column appended after the other columns, missing values encode as 0.
+
+    Args:
+        table (pa.Table): The table holding the columns to encode.
+        columns (List[str]): The columns to encode.
+
+    Returns:
+        pa.Table: The table with the encoded columns.
+    """
+    logger.info(f'Encoding categorical columns {columns} with Arrow')
+    dummies = []
+    for col in columns:
+        values = table[col]
+        categories = sorted(pc.unique(values).drop_null().to_pylist())
+        for category in categories[1:]:
+            dummy = pc.fill_null(pc.equal(values, category), False)
+            dummies.append((f'{col}_{category}', pc.cast(dummy, pa.uint8())))
+        table = table.drop_columns([col])
+    for name, dummy in dummies:
+        table = table.append_column(name, dummy)
+    return table
+
+
+def parse_garden_col(table: 'pa.Table') -> 'pa.Table':
+    """Replace the garden descriptions with the garden area.
+
+    Args:
+        table (pa.Table): The table holding the 'garden' column.
+
+    Returns:
+        pa.Table: The table with the garden area, 0 without a garden.
+    """
+    logger.info('Parsing garden column with Arrow ...')
+    garden = table['garden']
+    area = pc.struct_field(
+        pc.extract_regex(garden, r'(?P<area>\d+)'),
+        'area',
+    )
+    parsed = pc.if_else(
+        pc.equal(garden, GARDEN_ABSENT),
+        0,
+        pc.cast(area, pa.int64()),
+    )
+    return table.set_column(
+        table.schema.get_field_index('garden'),
+        'garden',
+        parsed,
+    )
@@ -0,0 +1,336 @@
+"""
+This module defines the versioned artifact format of the ML models.
+
+A model is saved as a directory `{models_path}/{models_name}/{version}`
+holding the serialized model and a `manifest.json` describing it: feature
+order and dtypes, training metrics, a fingerprint of the training data,
+a profile of the training features, the compression used and the checksum
+of every file. The manifest is small, so it can be validated before
+reading the model itself.
+
+Models saved before this format, as a single
+`{models_name}_version_{version}.joblib` file, are still loaded.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+import joblib
+import pandas as pd
+from loguru import logger
+
+from config import model_settings
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+MODEL_FILE = 'model.joblib'
+CHECKSUM_BLOCK = 1024 * 1024
+PROFILE_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+FLAG_SUFFIX = '_yes'
+
+
+class ArtifactError(ValueError):
+    """Raised when a model artifact does not match its manifest."""
+
+
+def artifact_dir(version: str = None, model_name: str = None) -> str:
+    """Return the directory of a model artifact.
+
+    Args:
+        version (str, optional): The model version.
+            Defaults to `model_settings.version`.
+        model_name (str, optional): The model name.
+            Defaults to `model_settings.models_name`.
+
+    Returns:
+        str: The artifact directory.
+    """
+    return os.path.join(
+        model_settings.models_path,
+        model_name or model_settings.models_name,
+        version or model_settings.version,
+    )
+
+
+def legacy_model_path(version: str = None, model_name: str = None) -> str:
+    """Return the path of a model saved as a single joblib file."""
+    model_name = model_name or model_settings.models_name
+    version = version or model_settings.version
+    return os.path.join(
+        model_settings.models_path,
+        f'{model_name}_version_{version}.joblib',
+    )
+
+
+def artifact_exists(version: str = None, model_name: str = None) -> bool:
+    """Check whether a model exists, in either format."""
+    manifest_path = os.path.join(
+        artifact_dir(version, model_name),
+        MANIFEST_FILE,
+    )
+    return os.path.exists(manifest_path) or os.path.exists(
+        legacy_model_path(version, model_name),
+    )
+
+
+def save_artifact(
+    model,
+    version: str = None,
+    x_train: pd.DataFrame = None,
+    y_train: pd.Series = None,
+    model_name: str = None,
+    profile: dict = None,
+    fingerprint: str = None,
+) -> str:
+    """Save a model and its manifest in the artifact directory.
+
+    Args:
+        model: The model to save. It must be serializable.
+        version (str, optional): The model version.
+            Defaults to `model_settings.version`.
+        x_train (pd.DataFrame, optional): The training features, used for
+            the feature order, dtypes and data fingerprint.
+        y_train (pd.Series, optional): The training target, used for the
+            data fingerprint.
+        model_name (str, optional): The model name.
+            Defaults to `model_settings.models_name`.
+        profile (dict, optional): The feature profile, for models whose
+            training rows do not fit in `x_train`. Defaults to the profile
+            of `x_train`.
+        fingerprint (str, optional): The data fingerprint, for the same
+            models. Defaults to the fingerprint of `x_train` and `y_train`.
+
+    Returns:
+        str: The artifact directory.
+    """
+    version = version or model_settings.version
+    model_name = model_name or model_settings.models_name
+    directory = artifact_dir(version, model_name)
+    os.makedirs(directory, exist_ok=True)
+
+    model_path = os.path.join(directory, MODEL_FILE)
+    compression = _compression()
+    logger.info(
+        f'Saving Model at {model_path} '
+        f"with compression {compression or 'none'}",
+    )
+    joblib.dump(model, model_path, compress=compression or 0)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model_name': model_name,
+        'version': version,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'model_class': type(model).__name__,
+        'features': _features(model, x_train),
+        'dtypes': (
+            {col: str(dtype) for col, dtype in x_train.dtypes.items()}
+            if x_train is not None
+            else {}
+        ),
+        'data_fingerprint': fingerprint or (
+            data_fingerprint(x_train, y_train)
+            if x_train is not None
+            else None
+        ),
+        'feature_profile': profile or (
+            feature_profile(x_train) if x_train is not None else None
+        ),
+        'metrics': {},
+        'compression': {
+            'method': compression[0] if compression else 'none',
+            'level': compression[1] if compression else 0,
+        },
+        'files': {MODEL_FILE: _file_entry(model_path)},
+    }
+    write_manifest(manifest, version, model_name)
+    return directory
+
+
+def load_artifact(
+    version: str = None,
+    model_name: str = None,
+    verify_checksum: bool = False,
+) -> Tuple[object, dict]:
+    """Load a model and its manifest.
+
+    Args:
+        version (str, optional): The model version.
+            Defaults to `model_settings.version`.
+        model_name (str, optional): The model name.
+            Defaults to `model_settings.models_name`.
+        verify_checksum (bool, optional): Also check the checksum of the
+            model file, which reads it twice. Defaults to False.
+
+    Returns:
+        Tuple[object, dict]: The model and its manifest, empty for models
+            saved in the legacy format.
+
+    Raises:
+        FileNotFoundError: If the model is not found.
+        ArtifactError: If the model file does not match its manifest.
+    """
+    manifest = read_manifest(version, model_name)
+    if manifest is None:
+        model_path = legacy_model_path(version, model_name)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f'Model not found at {model_path} -> ')
+        logger.info(f'Loading legacy Model from {model_path} ...')
+        return joblib.load(model_path), {}
+
+    directory = artifact_dir(version, model_name)
+    validate_manifest(manifest, directory, verify_checksum)
+    model_path = os.path.join(directory, MODEL_FILE)
+    logger.info(f'Loading Model from {model_path} ...')
+    return joblib.load(model_path), manifest
+
+
+def read_manifest(
+    version: str = None,
+    model_name: str = None,
+) -> Optional[dict]:
+    """Read the manifest of a model, None for a legacy or missing model."""
+    manifest_path = os.path.join(
+        artifact_dir(version, model_name),
+        MANIFEST_FILE,
+    )
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding='utf-8') as fichier:
+        return json.load(fichier)
+
+
+def write_manifest(
+    manifest: dict,
+    version: str = None,
+    model_name: str = None,
+) -> None:
+    """Write the manifest of a model in its artifact directory."""
+    manifest_path = os.path.join(
+        artifact_dir(version, model_name),
+        MANIFEST_FILE,
+    )
+    with open(manifest_path, 'w', encoding='utf-8') as fichier:
+        json.dump(manifest, fichier, indent=2)
+
+
+def validate_manifest(
+    manifest: dict,
+    directory: str,
+    verify_checksum: bool = False,
+) -> None:
+    """Check a manifest against the files of its artifact directory.
+
+    The format version and file sizes are always checked, which only
+    needs a `stat` call per file. Checksums are optional.
+
+    Args:
+        manifest (dict): The manifest to validate.
+        directory (str): The artifact directory.
+        verify_checksum (bool, optional): Also compare the checksums.
+
+    Raises:
+        ArtifactError: If the artifact does not match its manifest.
+    """
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ArtifactError(
+            f"Unsupported artifact format {manifest.get('format_version')}",
+        )
+    for file_name, entry in manifest['files'].items():
+        file_path = os.path.join(directory, file_name)
+        if not os.path.exists(file_path):
+            raise ArtifactError(f'Missing artifact file {file_path}')
+        if os.path.getsize(file_path) != entry['size']:
+            raise ArtifactError(f'Size mismatch for artifact file {file_path}')
+        if verify_checksum and _sha256(file_path) != entry['sha256']:
+            raise ArtifactError(f'Checksum mismatch for {file_path}')
+
+
+def data_fingerprint(x_train: pd.DataFrame, y_train: pd.Series = None) -> str:
+    """Return a fingerprint of the training data.
+
+    Args:
+        x_train (pd.DataFrame): The training features.
+        y_train (pd.Series, optional): The training target.
+
+    Returns:
+        str: The sha256 of the row hashes of the features and target.
+    """
+    digest = hashlib.sha256()
+    digest.update(','.join(x_train.columns).encode())
+    digest.update(pd.util.hash_pandas_object(x_train).to_numpy().tobytes())
+    if y_train is not None:
+        digest.update(
+            pd.util.hash_pandas_object(y_train).to_numpy().tobytes(),
+        )
+    return digest.hexdigest()
+
+
+def feature_profile(x_train: pd.DataFrame) -> dict:
+    """Return the statistics of the training features.
+
+    The inference service compares the features it receives with this
+    profile to detect drift.
+
+    Args:
+        x_train (pd.DataFrame): The training features.
+
+    Returns:
+        dict: Per feature, the count, mean, standard deviation, bounds and
+            quantiles, and the frequency of the binary `*_yes` flags.
+    """
+    profile = {}
+    for column in x_train.columns:
+        values = x_train[column].astype('float64')
+        stats = {
+            'count': int(values.count()),
+            'mean': float(values.mean()),
+            'std': float(values.std(ddof=0)),
+            'min': float(values.min()),
+            'max': float(values.max()),
+        }
+        if column.endswith(FLAG_SUFFIX):
+            stats['frequency'] = stats['mean']
+        else:
+            stats['quantiles'] = {
+                str(quantile): float(value)
+                for quantile, value in values.quantile(
+                    list(PROFILE_QUANTILES),
+                ).items()
+            }
+        profile[column] = stats
+    return profile
+
+
+def _compression() -> Optional[Tuple[str, int]]:
+    """Return the joblib compression configured for the artifacts."""
+    if model_settings.model_compression == 'none':
+        return None
+    return (
+        model_settings.model_compression,
+        model_settings.model_compression_level,
+    )
+
+
+def _features(model, x_train: pd.DataFrame = None) -> list:
+    """Return the feature order the model expects."""
+    if x_train is not None:
+        return list(x_train.columns)
+    return [str(feature) for feature in getattr(model, 'feature_names_in_', [])]
+
+
+def _file_entry(file_path: str) -> dict:
+    """Return the size and checksum of an artifact file."""
+    return {'size': os.path.getsize(file_path), 'sha256': _sha256(file_path)}
+
+
+def _sha256(file_path: str) -> str:
+    """Return the sha256 checksum of a file."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as fichier:
+        for block in iter(lambda: fichier.read(CHECKSUM_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
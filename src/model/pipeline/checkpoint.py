@@ -0,0 +1,203 @@
+"""
+This module provides a hyperparameter search that can be resumed.
+
+It runs the same fits as `GridSearchCV`, one per candidate of the grid
+and per cross-validation fold, but every finished fit writes its score
+to a checkpoint file as soon as it completes. The checkpoints live in
+`{search_checkpoint_dir}/{data fingerprint}/`, one small JSON file per
+(candidate, fold) named after a hash of the estimator, the candidate
+parameters, the number of folds, the fold and the scorer. A search
+restarted on the same training data, e.g. after a preemption or an OOM
+kill, or with a grid extended with new values, only runs the fits
+missing from the store. The best candidate is then refit on the whole
+training set, as `GridSearchCV` does.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import List, Tuple
+
+from joblib import Parallel, delayed
+from loguru import logger
+from sklearn.base import BaseEstimator, clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import KFold, ParameterGrid
+
+from config import model_settings
+
+
+class CheckpointStore:
+    """
+    A directory of the (candidate, fold) results of a search.
+
+    Attributes:
+        directory (str): The directory of the checkpoints of one dataset.
+
+    Methods:
+        __init__: Constructor that creates the checkpoint directory.
+        key: Returns the key of a (candidate, fold) pair.
+        load: Returns the stored result of a pair, if any.
+        save: Stores the result of a pair atomically.
+    """
+
+    def __init__(self, fingerprint: str, root: str = None) -> None:
+        """Create the checkpoint directory of a training dataset.
+
+        Args:
+            fingerprint (str): The fingerprint of the training data.
+            root (str, optional): The root of the checkpoint store.
+                Defaults to `model_settings.search_checkpoint_dir`.
+        """
+        self.directory = os.path.join(
+            root or model_settings.search_checkpoint_dir,
+            fingerprint,
+        )
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(
+        estimator: BaseEstimator,
+        params: dict,
+        cv: int,
+        fold: int,
+        scoring: str,
+    ) -> str:
+        """Return the key of a (candidate, fold) pair scored by a scorer."""
+        description = json.dumps(
+            {
+                'estimator': type(estimator).__name__,
+                'params': params,
+                'cv': cv,
+                'fold': fold,
+                'scoring': scoring,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(description.encode()).hexdigest()[:32]
+
+    def load(self, key: str) -> dict:
+        """Return the stored result of a pair, None when it is missing."""
+        checkpoint_path = os.path.join(self.directory, f'{key}.json')
+        if not os.path.exists(checkpoint_path):
+            return None
+        with open(checkpoint_path, encoding='utf-8') as fichier:
+            return json.load(fichier)
+
+    def save(self, key: str, result: dict) -> None:
+        """Store the result of a pair, never leaving a partial file."""
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'w', encoding='utf-8') as fichier:
+            json.dump(result, fichier)
+        os.replace(tmp_path, os.path.join(self.directory, f'{key}.json'))
+
+
+def checkpointed_search(
+    estimator: BaseEstimator,
+    grid_space: dict,
+    x_train,
+    y_train,
+    fingerprint: str,
+    cv: int = 5,
+    scoring: str = 'r2',
+    n_jobs: int = -1,
+) -> BaseEstimator:
+    """Search the grid, running only the fits missing from the store.
+
+    Args:
+        estimator (BaseEstimator): The estimator to tune.
+        grid_space (dict): The grid of parameters, as for `GridSearchCV`.
+        x_train: The training features, a DataFrame or an array.
+        y_train: The training target.
+        fingerprint (str): The fingerprint of the training data, which
+            keys the checkpoint store.
+        cv (int, optional): The number of folds. Defaults to 5.
+        scoring (str, optional): The scorer name. Defaults to 'r2'.
+        n_jobs (int, optional): The parallel fits. Defaults to -1.
+
+    Returns:
+        BaseEstimator: The best candidate, refit on the training data.
+    """
+    store = CheckpointStore(fingerprint)
+    candidates = list(ParameterGrid(grid_space))
+    folds = list(KFold(n_splits=cv).split(x_train))
+    keys = {
+        (index, fold): store.key(estimator, params, cv, fold, scoring)
+        for index, params in enumerate(candidates)
+        for fold in range(cv)
+    }
+    missing = [pair for pair, key in keys.items() if store.load(key) is None]
+    logger.info(
+        f'Search of {len(keys)} fits: {len(keys) - len(missing)} restored '
+        f'from {store.directory}, {len(missing)} to run',
+    )
+
+    Parallel(n_jobs=n_jobs)(
+        delayed(_fit_and_checkpoint)(
+            estimator,
+            candidates[index],
+            x_train,
+            y_train,
+            folds[fold],
+            scoring,
+            store,
+            keys[index, fold],
+        )
+        for index, fold in missing
+    )
+
+    mean_scores = [
+        _mean_score(store, [keys[index, fold] for fold in range(cv)])
+        for index in range(len(candidates))
+    ]
+    # Ties go to the first candidate, as in GridSearchCV
+    best_index = max(range(len(candidates)), key=mean_scores.__getitem__)
+    best_params = candidates[best_index]
+    logger.info(
+        f'Best params {best_params} with mean {scoring} '
+        f'{mean_scores[best_index]:.4f}',
+    )
+    return clone(estimator).set_params(**best_params).fit(x_train, y_train)
+
+
+def _fit_and_checkpoint(
+    estimator: BaseEstimator,
+    params: dict,
+    x_train,
+    y_train,
+    fold: Tuple[List[int], List[int]],
+    scoring: str,
+    store: CheckpointStore,
+    key: str,
+) -> None:
+    """Fit and score a candidate on a fold, then store its result."""
+    train, test = fold
+    estimator = clone(estimator).set_params(**params)
+    start = time.perf_counter()
+    estimator.fit(_rows(x_train, train), _rows(y_train, train))
+    fit_seconds = time.perf_counter() - start
+    score = get_scorer(scoring)(
+        estimator,
+        _rows(x_train, test),
+        _rows(y_train, test),
+    )
+    store.save(key, {
+        'params': params,
+        'score': float(score),
+        'fit_seconds': fit_seconds,
+    })
+
+
+def _mean_score(store: CheckpointStore, keys: List[str]) -> float:
+    """Return the mean score of a candidate over its folds."""
+    scores = [store.load(key)['score'] for key in keys]
+    return sum(scores) / len(scores)
+
+
+def _rows(data, indices):
+    """Select rows of a DataFrame, Series or array by position."""
+    if hasattr(data, 'iloc'):
+        return data.iloc[indices]
+    return data[indices]
@@ -5,18 +5,26 @@ It includes a function to extract data from the RentApartments table
 in the database and load it into a pandas DataFrame. This module is useful
 for scenarios where data needs to be retrieved from a database for further
 analysis or processing. It uses SQLAlchemy for executing database queries
-and pandas for handling the data in a DataFrame format.
+and pandas for handling the data in a DataFrame format. The features can
+also be encoded by the database itself while it scans the table, see
+`load_encoded_data_from_db`.
 """
 
 import os
+import string
+from typing import List
 
 import pandas as pd
 from loguru import logger
 from pydantic import FilePath
-from sqlalchemy import select
+from sqlalchemy import Engine, Integer, case, cast, func, select
 
 from config import engine, model_settings
 from databases.db_model import RentApartments
+from model.pipeline import arrow_backend
+
+# Characters before the garden area, e.g. 'Present (47 m²)'
+GARDEN_PREFIX = f'{string.ascii_letters} :('
 
 
 def load_data(path: FilePath = model_settings.data_file_name) -> pd.DataFrame:
@@ -39,9 +47,21 @@ def load_data(path: FilePath = model_settings.data_file_name) -> pd.DataFrame:
     return pd.read_csv(csv_path)
 
 
-def load_data_from_db() -> pd.DataFrame:
+def load_data_from_db(
+    columns: List[str] = None,
+    bind: Engine = None,
+) -> pd.DataFrame:
     """Charge les données à partir d'une base de données SQLite.
 
+    Args:
+        columns: List[str], optionnel
+            Les colonnes de la table à charger. Par défaut, toutes les
+            colonnes sont chargées. Ne sélectionner que les colonnes utiles
+            évite de lire les colonnes textuelles dans la mémoire.
+        bind: Engine, optionnel
+            Le moteur de la base de données. Par défaut, le moteur
+            configuré.
+
     Returns:
         pd.DataFrame :Un DataFrame contenant les données de la table 'data'.
 
@@ -51,5 +71,86 @@ def load_data_from_db() -> pd.DataFrame:
     >>> print(df.head())
     """
     logger.info('Loading data from database ...')
-    query = select(RentApartments)
-    return pd.read_sql(query, engine)
+    if columns is None:
+        query = select(RentApartments)
+    else:
+        query = select(*[getattr(RentApartments, col) for col in columns])
+    return pd.read_sql(query, bind or engine)
+
+
+def load_encoded_data_from_db(
+    columns: List[str],
+    cat_columns: List[str],
+    bind: Engine = None,
+) -> pd.DataFrame:
+    """Charge les données déjà encodées par la base de données.
+
+    Les colonnes oui/non sont encodées par des expressions `CASE` et la
+    surface du jardin est extraite par des fonctions de chaînes SQL,
+    pendant le parcours de la table. Le résultat est celui de
+    `encode_cat_cols` puis `parse_garden_col`, colonnes et ordre compris,
+    sans créer d'objet Python par valeur textuelle. Le résultat est lu
+    en mémoire Arrow par le pilote ADBC quand il est installé.
+
+    Args:
+        columns: List[str]
+            Les colonnes de la table à charger.
+        cat_columns: List[str]
+            Les colonnes oui/non à encoder en colonnes `{col}_yes`.
+        bind: Engine, optionnel
+            Le moteur de la base de données. Par défaut, le moteur
+            configuré.
+
+    Returns:
+        pd.DataFrame : Un DataFrame contenant les colonnes encodées.
+
+    Exemple:
+    --------
+    >>> df = load_encoded_data_from_db(['area', 'garden', 'balcony'],
+    ...                                ['balcony'])
+    >>> print(df.head())
+    """
+    logger.info('Loading encoded data from database ...')
+    query = encoded_query(columns, cat_columns)
+    if arrow_backend.adbc_available(bind):
+        return arrow_backend.read_adbc(query, bind).to_pandas()
+    return pd.read_sql(query, bind or engine)
+
+
+def encoded_query(columns: List[str], cat_columns: List[str]):
+    """Construit la requête qui encode les colonnes dans la base.
+
+    Comme `get_dummies`, les colonnes encodées suivent les autres
+    colonnes. La surface du jardin est le premier nombre de sa
+    description : `ltrim` retire le préfixe textuel et `CAST` lit le
+    nombre qui le suit, comme le fait SQLite pour une chaîne qui commence
+    par des chiffres.
+
+    Args:
+        columns: List[str]
+            Les colonnes de la table à charger.
+        cat_columns: List[str]
+            Les colonnes oui/non à encoder.
+
+    Returns:
+        Select : La requête SQLAlchemy Core.
+    """
+    selected = []
+    for col in columns:
+        if col in cat_columns:
+            continue
+        column = getattr(RentApartments, col)
+        if col == 'garden':
+            column = case(
+                (column == arrow_backend.GARDEN_ABSENT, 0),
+                else_=cast(func.ltrim(column, GARDEN_PREFIX), Integer),
+            ).label(col)
+        selected.append(column)
+    for col in cat_columns:
+        selected.append(
+            case(
+                (getattr(RentApartments, col) == 'yes', 1),
+                else_=0,
+            ).label(f'{col}_yes'),
+        )
+    return select(*selected)
@@ -0,0 +1,279 @@
+"""
+This module distills the selected forest into a faster servable forest.
+
+The grid search selects the forest with the best R², whatever its size,
+and its prediction latency can exceed what the inference service allows.
+The distillation trains smaller students, forests with fewer and
+shallower trees, on the predictions of this teacher forest over the
+training rows and over synthetic rows. The synthetic rows are training
+rows whose features are each swapped, with some probability, with the
+same feature of another training row: they stay within the values of
+every feature while covering combinations the training rows miss, where
+the student learns the teacher instead of the noise of the target.
+
+The students are trained on most of the training rows and compared on
+the rest, a validation split that neither the students nor their teacher
+see: the selected forest was refit on every training row, so a copy of
+it is fitted without the validation rows to label the students. The
+latency of every student is measured on the current machine, as the
+median time to predict a single row, and the student with the best R² on
+the validation rows among those within the latency target is saved as a
+separate artifact, `{models_name}_distilled` by default, next to the full
+model. Only the chosen student is scored on the test set, so its test R²
+is a held-out estimate.
+"""
+
+import statistics
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sklearn.base import BaseEstimator, clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import r2_score
+from sklearn.model_selection import ParameterGrid, train_test_split
+
+from config import model_settings
+from model.pipeline.artifact import read_manifest, save_artifact, write_manifest
+
+STUDENT_GRID = {'n_estimators': [10, 25, 50, 100], 'max_depth': [4, 6, 8, 10]}
+LATENCY_REPEATS = 50
+# Probability of swapping each feature of a synthetic row with another row
+SWAP_PROBABILITY = 0.5
+# Share of the training rows held out to select the student
+VALIDATION_SIZE = 0.2
+
+
+def distill_model(
+    teacher: BaseEstimator,
+    x_train: pd.DataFrame,
+    y_train: pd.Series,
+    x_test: pd.DataFrame,
+    y_test: pd.Series,
+    version: str = None,
+) -> dict:
+    """Distill a forest and save the best student within the latency target.
+
+    Args:
+        teacher (BaseEstimator): The forest selected by the grid search.
+        x_train (pd.DataFrame): The training features, split into the rows
+            the students learn from and the rows selecting the student.
+        y_train (pd.Series): The training target, described in the
+            manifest of the student.
+        x_test (pd.DataFrame): The test features.
+        y_test (pd.Series): The test target.
+        version (str, optional): The version of the student artifact.
+            Defaults to `model_settings.version`.
+
+    Returns:
+        dict: The latency target, the name of the student artifact, the
+            teacher and the student chosen, if any, with their test score,
+            fidelity to the teacher and latency, and every student tried
+            with its validation score.
+    """
+    target_ms = model_settings.distillation_latency_ms
+    model_name = distilled_model_name()
+    students, best, training_rows = _train_students(teacher, x_train, y_train)
+    y_teacher = teacher.predict(x_test)
+    teacher_report = _describe(teacher, x_test, y_test, y_teacher)
+    distillation = {
+        'latency_target_ms': target_ms,
+        'model_name': model_name,
+        'teacher': teacher_report,
+        'student': None,
+        'students': students,
+    }
+    if best is None:
+        logger.warning(
+            f'No student meets the latency target of {target_ms} ms, '
+            f'the teacher predicts in {teacher_report["latency_ms"]:.2f} ms',
+        )
+        return distillation
+
+    report = _describe(best, x_test, y_test, y_teacher)
+    distillation['student'] = report
+    logger.info(
+        f"Saving student of {report['n_estimators']} trees of depth "
+        f"{report['max_depth']} as {model_name}: test score "
+        f"{report['score']:.4f} in {report['latency_ms']:.2f} ms against "
+        f"{teacher_report['score']:.4f} in "
+        f"{teacher_report['latency_ms']:.2f} ms for the teacher",
+    )
+    save_artifact(best, version, x_train, y_train, model_name=model_name)
+    manifest = read_manifest(version, model_name)
+    manifest['metrics'] = {
+        'mode': 'distilled',
+        'score': report['score'],
+        'fidelity': report['fidelity'],
+        'latency_ms': report['latency_ms'],
+        'latency_target_ms': target_ms,
+        'teacher': {
+            'model_name': model_settings.models_name,
+            **teacher_report,
+        },
+        'training_rows': training_rows,
+        'n_estimators': best.n_estimators,
+    }
+    write_manifest(manifest, version, model_name)
+    return distillation
+
+
+def distilled_model_name() -> str:
+    """Return the name of the distilled model artifact."""
+    return (
+        model_settings.distillation_model_name
+        or f'{model_settings.models_name}_distilled'
+    )
+
+
+def synthetic_rows(
+    x_train: pd.DataFrame,
+    n_rows: int,
+    rng: np.random.Generator,
+) -> pd.DataFrame:
+    """Draw rows mixing the features of random training rows.
+
+    Every synthetic row starts from a random training row, and each of its
+    features is replaced, with probability SWAP_PROBABILITY, by the same
+    feature of another random training row.
+
+    Args:
+        x_train (pd.DataFrame): The training features.
+        n_rows (int): The number of rows to draw.
+        rng (np.random.Generator): The random generator.
+
+    Returns:
+        pd.DataFrame: The synthetic rows, with the columns and dtypes of
+            the training features.
+    """
+    base = rng.integers(len(x_train), size=n_rows)
+    donors = rng.integers(len(x_train), size=(n_rows, x_train.shape[1]))
+    swapped = rng.random((n_rows, x_train.shape[1])) < SWAP_PROBABILITY
+    rows = np.where(swapped, donors, base[:, None])
+    return pd.DataFrame({
+        column: x_train[column].to_numpy()[rows[:, index]]
+        for index, column in enumerate(x_train.columns)
+    })
+
+
+def row_latency_ms(model: BaseEstimator, x_rows: pd.DataFrame) -> float:
+    """Return the median time in milliseconds to predict a single row.
+
+    Args:
+        model (BaseEstimator): The fitted model.
+        x_rows (pd.DataFrame): The rows predicted one at a time, in turn.
+
+    Returns:
+        float: The median latency over LATENCY_REPEATS predictions.
+    """
+    timings: List[float] = []
+    for repeat in range(LATENCY_REPEATS):
+        row = x_rows.iloc[[repeat % len(x_rows)]]
+        start = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e3
+
+
+def _train_students(
+    teacher: BaseEstimator,
+    x_train: pd.DataFrame,
+    y_train: pd.Series,
+) -> Tuple[List[dict], Optional[BaseEstimator], int]:
+    """Train the students of the grid and select one on validation rows.
+
+    The validation rows are held out of the training rows, the students
+    learn from the others and from synthetic rows drawn from them, as
+    labelled by a copy of the teacher fitted on the same rows only.
+
+    Args:
+        teacher (BaseEstimator): The forest selected by the grid search.
+        x_train (pd.DataFrame): The training features.
+        y_train (pd.Series): The training target.
+
+    Returns:
+        Tuple[List[dict], BaseEstimator, int]: The validation report of
+            every student, the student with the best validation score
+            among those within the latency target, None if there is none,
+            and the number of rows the students learned from.
+    """
+    x_fit, x_val, y_fit, y_val = train_test_split(
+        x_train,
+        y_train,
+        test_size=VALIDATION_SIZE,
+        random_state=model_settings.distillation_seed,
+    )
+    # The teacher saw the validation rows, they would favour the students
+    # closest to it instead of those that generalize
+    fit_teacher = clone(teacher).set_params(n_jobs=-1).fit(x_fit, y_fit)
+    x_synthetic = synthetic_rows(
+        x_fit,
+        int(len(x_fit) * model_settings.distillation_synthetic_ratio),
+        np.random.default_rng(model_settings.distillation_seed),
+    )
+    x_student = pd.concat([x_fit, x_synthetic], ignore_index=True)
+    logger.info(
+        f'Distilling into students on {len(x_fit)} training rows and '
+        f'{len(x_synthetic)} synthetic rows, selected on {len(x_val)} '
+        f'validation rows, target '
+        f'{model_settings.distillation_latency_ms} ms per row',
+    )
+    students, best = _select_student(
+        x_student,
+        fit_teacher.predict(x_student),
+        x_val,
+        y_val,
+        fit_teacher.predict(x_val),
+    )
+    return students, best, len(x_student)
+
+
+def _select_student(
+    x_student: pd.DataFrame,
+    y_student: np.ndarray,
+    x_val: pd.DataFrame,
+    y_val: pd.Series,
+    y_teacher: np.ndarray,
+) -> Tuple[List[dict], Optional[BaseEstimator]]:
+    """Fit every student of the grid and keep the best within the target."""
+    students = []
+    best, best_score = None, -np.inf
+    for params in ParameterGrid(STUDENT_GRID):
+        student = RandomForestRegressor(
+            random_state=model_settings.distillation_seed,
+            n_jobs=-1,
+            **params,
+        ).fit(x_student, y_student)
+        # Served models predict in the calling thread
+        student.set_params(n_jobs=None)
+        report = _describe(student, x_val, y_val, y_teacher)
+        students.append(report)
+        logger.info(
+            f"Student {params}: validation score {report['score']:.4f}, "
+            f"fidelity {report['fidelity']:.4f}, "
+            f"{report['latency_ms']:.2f} ms",
+        )
+        if report['latency_ms'] > model_settings.distillation_latency_ms:
+            continue
+        if report['score'] > best_score:
+            best, best_score = student, report['score']
+    return students, best
+
+
+def _describe(
+    model: BaseEstimator,
+    x_test: pd.DataFrame,
+    y_test: pd.Series,
+    y_teacher: np.ndarray,
+) -> dict:
+    """Return the score, fidelity to the teacher and latency of a model."""
+    y_pred = model.predict(x_test)
+    return {
+        'score': float(r2_score(y_test, y_pred)),
+        'fidelity': float(r2_score(y_teacher, y_pred)),
+        'latency_ms': row_latency_ms(model, x_test),
+        'n_estimators': int(getattr(model, 'n_estimators', 0)),
+        'max_depth': getattr(model, 'max_depth', None),
+    }
@@ -0,0 +1,288 @@
+"""
+This module creates the pipeline for refreshing a trained ML model.
+
+Instead of rebuilding the whole forest through grid search, it loads the
+current model artifact and grows additional trees with `warm_start` on
+the rows added to the table since that version was trained, or on a
+recency-weighted sample of the training rows. The refreshed model is
+evaluated on the held-out split of the last full rebuild: the table only
+grows by appending rows, so splitting again its first `holdout_rows`
+rows, recorded in the metrics, gives back the same test rows, whatever
+the number of rows added since. Out-of-core builds hold out rows by a hash
+of their address, their refreshes hold out the same hashed rows.
+"""
+
+import math
+import time
+from itertools import count
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sklearn.base import BaseEstimator
+
+from config import model_settings
+from model.pipeline.artifact import load_artifact
+from model.pipeline.model import (
+    _get_x_y,
+    evaluate_model,
+    load_metrics,
+    save_metrics,
+    save_model,
+    split_train_test,
+)
+from model.pipeline.out_of_core import HOLDOUT_SPLIT, TEST_FOLD, hash_folds
+from model.pipeline.preparation import prepare_data
+
+TEST_SIZE = 0.2
+
+
+class RefreshData(NamedTuple):
+    """
+    The rows of an incremental refresh.
+
+    Attributes:
+        x_new (pd.DataFrame): The features the new trees are fitted on.
+        y_new (pd.Series): The target the new trees are fitted on.
+        x_test (pd.DataFrame): The held-out features of the full rebuild.
+        y_test (pd.Series): The held-out target of the full rebuild.
+        table_rows (int): The rows of the table at the refresh.
+        holdout_rows (int): The rows of the table split by the full rebuild.
+    """
+
+    x_new: pd.DataFrame
+    y_new: pd.Series
+    x_test: pd.DataFrame
+    y_test: pd.Series
+    table_rows: int
+    holdout_rows: int
+
+
+def refresh_model(new_version: str) -> dict:
+    """
+    Grow the current model with new trees and save it as a new version.
+
+    Args:
+        new_version (str): The version of the refreshed model.
+
+    Returns:
+        dict: The metrics of the refreshed model.
+
+    Raises:
+        ValueError: If the held-out split of the current version is
+            unknown, or no row was added since it was trained.
+    """
+    logger.info(f'Starting Incremental Model refresh to {new_version} ...')
+    base_metrics = load_metrics()
+    data = split_refresh_data(base_metrics)
+
+    model = load_current_model()
+    baseline_score = evaluate_model(model, data.x_test, data.y_test)
+
+    start = time.perf_counter()
+    model = grow_model(model, data.x_new, data.y_new)
+    training_seconds = time.perf_counter() - start
+
+    metrics = {
+        'mode': 'incremental',
+        'base_version': model_settings.version,
+        'score': evaluate_model(model, data.x_test, data.y_test),
+        'base_score': baseline_score,
+        'training_seconds': training_seconds,
+        'training_rows': len(data.x_new),
+        'table_rows': data.table_rows,
+        'holdout_rows': data.holdout_rows,
+        'n_estimators': model.n_estimators,
+    }
+    if 'holdout_split' in base_metrics:
+        metrics['holdout_split'] = base_metrics['holdout_split']
+    _log_comparison(metrics, base_metrics)
+    save_model(
+        model,
+        version=new_version,
+        x_train=data.x_new,
+        y_train=data.y_new,
+    )
+    save_metrics(metrics, version=new_version)
+    return metrics
+
+
+def split_refresh_data(base_metrics: dict) -> RefreshData:
+    """Split the table into the refresh rows and the held-out rows.
+
+    Args:
+        base_metrics (dict): The metrics of the current version.
+
+    Returns:
+        RefreshData: The rows the new trees are fitted on and the
+            held-out rows of the last full rebuild.
+    """
+    dataframe = prepare_data(extra_columns=['address'])
+    X, y = _get_x_y(dataframe)
+    holdout_rows = _holdout_rows(base_metrics)
+    if base_metrics.get('holdout_split') == HOLDOUT_SPLIT:
+        folds = hash_folds(dataframe['address'].iloc[:holdout_rows])
+        x_test = X.iloc[:holdout_rows][folds == TEST_FOLD]
+        y_test = y.loc[x_test.index]
+    else:
+        _, x_test, _, y_test = split_train_test(
+            X.iloc[:holdout_rows],
+            y.iloc[:holdout_rows],
+            test_size=TEST_SIZE,
+        )
+    selected = select_recent_rows(
+        X.index.difference(x_test.index),
+        X.index[base_metrics.get('table_rows', holdout_rows):],
+    )
+    return RefreshData(
+        X.loc[selected],
+        y.loc[selected],
+        x_test,
+        y_test,
+        len(X),
+        holdout_rows,
+    )
+
+
+def load_current_model() -> BaseEstimator:
+    """Load the model artifact of the configured version.
+
+    Returns:
+        BaseEstimator: The current model.
+
+    Raises:
+        FileNotFoundError: If the model file is not found.
+    """
+    logger.info(f'Loading current Model {model_settings.version} ...')
+    model, _ = load_artifact()
+    return model
+
+
+def select_recent_rows(
+    train_index: pd.Index,
+    new_index: pd.Index,
+    fraction: float = None,
+    sampling: str = None,
+) -> pd.Index:
+    """Select the training rows an incremental refresh learns from.
+
+    Rows are ordered by their position in the table, which follows
+    the insertion order, so a larger index means a more recent row.
+
+    Args:
+        train_index (pd.Index): The rows that may be trained on, every
+            row of the table but the held-out ones.
+        new_index (pd.Index): The rows added since the current version.
+        fraction (float, optional): Fraction of the training rows drawn
+            by the 'weighted' sampling.
+            Defaults to `model_settings.incremental_fraction`.
+        sampling (str, optional): 'recent' keeps the rows added since the
+            current version, 'weighted' draws a sample whose weights halve
+            every `fraction` of the table going back in time. Defaults to
+            `model_settings.incremental_sampling`.
+
+    Returns:
+        pd.Index: The selected rows.
+
+    Raises:
+        ValueError: If no row was added since the current version.
+    """
+    if fraction is None:
+        fraction = model_settings.incremental_fraction
+    sampling = sampling or model_settings.incremental_sampling
+    if not len(new_index):
+        raise ValueError(
+            f'No row added since version {model_settings.version}',
+        )
+
+    if sampling == 'weighted':
+        n_rows = max(1, int(len(train_index) * fraction))
+        ordered_index = train_index.sort_values()
+        age = np.arange(len(ordered_index))[::-1]
+        weights = 0.5 ** (age / n_rows)
+        rng = np.random.default_rng(42)
+        selected = pd.Index(rng.choice(
+            ordered_index,
+            size=n_rows,
+            replace=False,
+            p=weights / weights.sum(),
+        ))
+    else:
+        selected = new_index
+
+    logger.info(
+        f'Selected {len(selected)} {sampling} rows for the refresh ...',
+    )
+    return selected
+
+
+def grow_model(
+    model: BaseEstimator,
+    X_new: pd.DataFrame,
+    y_new: pd.Series,
+    n_trees: int = None,
+) -> BaseEstimator:
+    """Add trees fitted on the new rows to a trained forest.
+
+    Args:
+        model (BaseEstimator): The trained forest.
+        X_new (pd.DataFrame): The features of the new rows.
+        y_new (pd.Series): The target of the new rows.
+        n_trees (int, optional): Number of trees to add.
+            Defaults to `model_settings.incremental_trees`.
+
+    Returns:
+        BaseEstimator: The forest with the additional trees.
+    """
+    n_trees = n_trees or model_settings.incremental_trees
+    n_estimators = model.n_estimators + n_trees
+    logger.info(f'Growing Model from {model.n_estimators} to {n_estimators}')
+    model.set_params(warm_start=True, n_estimators=n_estimators)
+    model.fit(X_new, y_new)
+    model.set_params(warm_start=False)
+    return model
+
+
+def _holdout_rows(base_metrics: dict) -> int:
+    """Return the rows of the table split by the last full rebuild.
+
+    Versions built before `holdout_rows` was recorded only saved their
+    number of training rows, the table had the smallest number of rows
+    leaving that many rows out of the test split.
+
+    Args:
+        base_metrics (dict): The metrics of the current version.
+
+    Returns:
+        int: The rows of the table the held-out split was drawn from.
+
+    Raises:
+        ValueError: If the metrics do not record the held-out split.
+    """
+    if 'holdout_rows' in base_metrics:
+        return base_metrics['holdout_rows']
+    if base_metrics.get('mode') != 'full':
+        raise ValueError(
+            f'Unknown held-out split for version {model_settings.version}',
+        )
+    training_rows = base_metrics['training_rows']
+    return next(
+        n_rows
+        for n_rows in count(training_rows)
+        if n_rows - math.ceil(n_rows * TEST_SIZE) == training_rows
+    )
+
+
+def _log_comparison(metrics: dict, full_metrics: dict) -> None:
+    """Log the refresh metrics against those of the last full rebuild."""
+    if not full_metrics:
+        logger.warning('No metrics saved for the current Model version')
+        return
+    speedup = full_metrics['training_seconds'] / metrics['training_seconds']
+    logger.info(
+        f"Incremental refresh trained in {metrics['training_seconds']:.2f}s "
+        f"vs {full_metrics['training_seconds']:.2f}s for the full rebuild "
+        f'(x{speedup:.1f}), score is {metrics["score"]:.3f} '
+        f"vs {full_metrics['score']:.3f}",
+    )
@@ -6,21 +6,49 @@ RandomForestRegressor, hyperparameter tuning with GridSearchCV,
 model evaluation, and serialization of the trained model.
 """
 
-import os
 from typing import List, Tuple
 
-import joblib
 import pandas as pd
+from joblib.externals.loky import get_reusable_executor
 from loguru import logger
 from sklearn.base import BaseEstimator
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.model_selection import (
+    GridSearchCV,
+    ParameterGrid,
+    train_test_split,
+)
 
 from config import model_settings
+from model.pipeline.artifact import (
+    artifact_dir,
+    data_fingerprint,
+    read_manifest,
+    save_artifact,
+    write_manifest,
+)
+from model.pipeline.checkpoint import checkpointed_search
+from model.pipeline.distillation import distill_model
+from model.pipeline.monitoring import StageTimer, log_peak_rss
 from model.pipeline.preparation import prepare_data
+from model.pipeline.shared_data import log_pickled_bytes, shared_training_data
 
+FEATURE_COLUMNS = [
+    'area',
+    'constraction_year',
+    'bedrooms',
+    'garden',
+    'balcony_yes',
+    'parking_yes',
+    'furnished_yes',
+    'garage_yes',
+    'storage_yes',
+]
+GRID_SPACE = {'n_estimators': [100, 200, 300], 'max_depth': [3, 6, 9, 12]}
+CV_FOLDS = 5
 
-def build_model() -> None:
+
+def build_model(stages: StageTimer = None, version: str = None) -> dict:
     """
     Construit, entraîne, évalue et sauvegarde un modèle de classification.
 
@@ -36,22 +64,89 @@ def build_model() -> None:
             d'entraînement.
         - evaluate_model(model, X_test, y_test) : Évalue les performances
             du modèle sur l'ensemble de test.
+        - distill_model(model, ...) : Distille le modèle en une forêt plus
+            petite qui respecte la latence cible, quand
+            `model_settings.distillation` est activé.
         - save_model(model) : Sauvegarde le modèle entraîné.
+        - save_metrics(metrics) : Sauvegarde le score et la durée
+            d'entraînement, qui servent de référence aux mises à jour
+            incrémentales.
+
+    Chaque étape est chronométrée, et profilée avec cProfile quand
+    `model_settings.profile_training` est activé. Un rapport des durées
+    et du pic cumulé de mémoire résidente (RSS) du processus à la fin de
+    chaque étape est journalisé à la fin.
+
+    Args:
+        stages: StageTimer, optional
+            Le chronomètre des étapes. Par défaut, un nouveau chronomètre.
+        version: str, optional
+            La version du modèle construit. Par défaut,
+            `model_settings.version`.
 
+    Returns:
+        dict, Le rapport de la durée et du pic de RSS de chaque étape.
     """
     logger.info('Starting  Building Model Pipeline ...')
+    stages = stages or StageTimer('build_model')
     # Préparation des données
-    dataframe = prepare_data()
+    with stages.stage('prepare'):
+        dataframe = prepare_data()
     # Extraction des caractéristiques et de la variable cible
-    X, y = _get_x_y(dataframe)
-    # Division en ensembles d'entraînement et de test
-    X_train, X_test, y_train, y_test = split_train_test(X, y)
+    # et division en ensembles d'entraînement et de test
+    with stages.stage('split'):
+        X, y = _get_x_y(dataframe)
+        X_train, X_test, y_train, y_test = split_train_test(X, y)
     # Entraînement du modèle
-    rf_classifier = train_model(X_train, y_train)
+    with stages.stage('grid search'):
+        rf_classifier = train_model(X_train, y_train)
     # Évaluation du modèle
-    evaluate_model(rf_classifier, X_test, y_test)
-    # Sauvegarde du modèle entraîné
-    save_model(rf_classifier)
+    with stages.stage('evaluate'):
+        score = evaluate_model(rf_classifier, X_test, y_test)
+    metrics = {
+        'mode': 'full',
+        'score': score,
+        'training_seconds': stages.timings['grid search'],
+        'training_rows': len(X_train),
+        # Rows of the table split, refreshes keep the same held-out rows
+        'table_rows': len(X),
+        'holdout_rows': len(X),
+        'n_estimators': rf_classifier.n_estimators,
+    }
+    # Distillation en un modèle servable plus rapide
+    if model_settings.distillation:
+        with stages.stage('distill'):
+            metrics['distillation'] = distill_model(
+                rf_classifier,
+                X_train,
+                y_train,
+                X_test,
+                y_test,
+                version=version,
+            )
+    # Sauvegarde du modèle entraîné et de ses métriques
+    with stages.stage('save'):
+        save_model(
+            rf_classifier,
+            version=version,
+            x_train=X_train,
+            y_train=y_train,
+        )
+        save_metrics(metrics, version=version)
+    return stages.report()
+
+
+def build_stages() -> List[str]:
+    """Retourne les étapes que `build_model` chronomètre, dans l'ordre.
+
+    Returns:
+        List[str], Les noms des étapes, pour suivre la progression.
+    """
+    stages = ['prepare', 'split', 'grid search', 'evaluate']
+    if model_settings.distillation:
+        stages.append('distill')
+    stages.append('save')
+    return stages
 
 
 def _get_x_y(
@@ -85,17 +180,7 @@ def _get_x_y(
                     La série représentant la variable cible.
     """
     if col_x is None:
-        col_x = [
-            'area',
-            'constraction_year',
-            'bedrooms',
-            'garden',
-            'balcony_yes',
-            'parking_yes',
-            'furnished_yes',
-            'garage_yes',
-            'storage_yes',
-        ]
+        col_x = FEATURE_COLUMNS
     logger.info('Getting X, y data ...')
     X = df[col_x]
     y = df[col_y]
@@ -155,20 +240,92 @@ def train_model(
 
     Returns:
         BaseEstimator: Le modèle de classification entraîné.
+
+    Notes
+    -----
+    Avec `model_settings.shared_training_data`, les données sont écrites
+    une seule fois dans un fichier mappé en mémoire que tous les workers
+    de la validation croisée lisent sans copie, au lieu d'être sérialisées
+    pour chaque candidat et chaque fold.
+
+    Avec `model_settings.search_checkpoint`, le score de chaque couple
+    (candidat, fold) est sauvegardé dès qu'il est calculé : une recherche
+    interrompue ou étendue à de nouvelles valeurs ne refait que les
+    entraînements manquants.
     """
     logger.info('Training model and tunning hyperparams ...')
-    rf_classifier = RandomForestRegressor()
-    grid_space = {'n_estimators': [100, 200, 300], 'max_depth': [3, 6, 9, 12]}
+    grid_space = GRID_SPACE
     logger.debug(f'Grid Space is {grid_space}  ...')
+    fingerprint = (
+        data_fingerprint(x_train, y_train)
+        if model_settings.search_checkpoint
+        else None
+    )
+    n_tasks = len(ParameterGrid(grid_space)) * CV_FOLDS
+    if not model_settings.shared_training_data:
+        log_pickled_bytes(x_train, y_train, n_tasks, shared=False)
+        best_estimator = _search(x_train, y_train, grid_space, fingerprint)
+        _shutdown_workers()
+        log_peak_rss('grid search on pickled data', children=True)
+        return best_estimator
+
+    with shared_training_data(x_train, y_train) as (x_shared, y_shared):
+        log_pickled_bytes(x_shared, y_shared, n_tasks, shared=True)
+        best_estimator = _search(x_shared, y_shared, grid_space, fingerprint)
+    _shutdown_workers()
+    log_peak_rss('grid search on shared data', children=True)
+    # Served models are called with DataFrames holding these columns
+    best_estimator.feature_names_in_ = x_train.columns.to_numpy(dtype=object)
+    return best_estimator
+
+
+def _search(
+    x_train,
+    y_train,
+    grid_space: dict,
+    fingerprint: str = None,
+) -> BaseEstimator:
+    """Cherche les meilleurs hyperparamètres et réentraîne le modèle.
+
+    Avec une empreinte des données, chaque couple (candidat, fold) terminé
+    est sauvegardé, et seules les combinaisons absentes du dépôt de points
+    de reprise sont entraînées. Sinon, `GridSearchCV` est utilisé.
+
+    Args:
+        x_train: Les caractéristiques d'entraînement.
+        y_train: La variable cible.
+        grid_space: dict, La grille des hyperparamètres.
+        fingerprint: str, optional
+            L'empreinte des données d'entraînement, qui identifie les
+            points de reprise. Par défaut, aucun point de reprise.
+
+    Returns:
+        BaseEstimator: Le meilleur modèle, réentraîné sur toutes les données.
+    """
+    if fingerprint is not None:
+        return checkpointed_search(
+            RandomForestRegressor(),
+            grid_space,
+            x_train,
+            y_train,
+            fingerprint,
+            cv=CV_FOLDS,
+            scoring='r2',
+            n_jobs=-1,
+        )
     grid = GridSearchCV(
-        rf_classifier,
+        RandomForestRegressor(),
         param_grid=grid_space,
-        cv=5,
+        cv=CV_FOLDS,
         scoring='r2',
         n_jobs=-1,
     )
-    model_grid = grid.fit(x_train, y_train)
-    return model_grid.best_estimator_
+    return grid.fit(x_train, y_train).best_estimator_
+
+
+def _shutdown_workers() -> None:
+    """Arrête les workers loky pour que leur pic de RSS soit comptabilisé."""
+    get_reusable_executor().shutdown(wait=True)
 
 
 def evaluate_model(
@@ -191,27 +348,73 @@ def evaluate_model(
     return score
 
 
-def save_model(model):
-    """Sauvegarde le modèle à la fois en format joblib.
+def save_model(
+    model,
+    version: str = None,
+    x_train: pd.DataFrame = None,
+    y_train: pd.Series = None,
+    profile: dict = None,
+    fingerprint: str = None,
+):
+    """Sauvegarde le modèle dans son répertoire d'artefact versionné.
 
-    Dans le repertoire MODELS_DIR.
+    Dans le repertoire MODELS_DIR, sous `{models_name}/{version}`, avec
+    un manifeste décrivant les features, leurs types, l'empreinte des
+    données d'entraînement et les checksums des fichiers. La compression
+    est choisie par `model_settings.model_compression`.
 
     Args:
         model: object
             Le modèle à sauvegarder. Il doit être sérialisable.
+        version: str, optional
+            La version du modèle. Par défaut, `model_settings.version`.
+        x_train: pandas.DataFrame, optional
+            Les caractéristiques d'entraînement, décrites dans le manifeste.
+        y_train: pandas.Series, optional
+            La variable cible d'entraînement, incluse dans l'empreinte.
+        profile: dict, optional
+            Le profil des features, quand les données d'entraînement ne
+            tiennent pas dans `x_train`. Par défaut, celui de `x_train`.
+        fingerprint: str, optional
+            L'empreinte des données, dans le même cas. Par défaut, celle
+            de `x_train` et `y_train`.
+    """
+    save_artifact(
+        model,
+        version,
+        x_train,
+        y_train,
+        profile=profile,
+        fingerprint=fingerprint,
+    )
 
-    Notes
-    -----
-    Cette fonction utilise les variables globales model_name et version pour
-    générer les noms de fichiers. Assurez-vous que ces variables sont définies
-    correctement avant d'appeler cette fonction.
+
+def save_metrics(metrics: dict, version: str = None) -> None:
+    """Sauvegarde les métriques d'entraînement dans le manifeste du modèle.
+
+    Args:
+        metrics: dict
+            Les métriques à sauvegarder, sérialisables en JSON.
+        version: str, optional
+            La version du modèle. Par défaut, `model_settings.version`.
+    """
+    manifest = read_manifest(version)
+    manifest['metrics'] = metrics
+    logger.info(f'Saving Model metrics in {artifact_dir(version)}')
+    write_manifest(manifest, version)
+
+
+def load_metrics(version: str = None) -> dict:
+    """Charge les métriques d'entraînement d'un modèle.
+
+    Args:
+        version: str, optional
+            La version du modèle. Par défaut, `model_settings.version`.
+
+    Returns:
+        dict, Les métriques sauvegardées, vide si elles n'existent pas.
     """
-    version = model_settings.version
-    joblib_model = f'{model_settings.models_name}_version_{version}'
-    extension = '.joblib'
-    joblib_model += extension
-    persist_path = os.path.join(model_settings.models_path, joblib_model)
-    logger.info(f'Saving Model at {persist_path}')
-    # Sauvegarde en format joblib
-    with open(persist_path, 'wb') as fichier:
-        joblib.dump(model, fichier)
+    manifest = read_manifest(version)
+    if manifest is None:
+        return {}
+    return manifest['metrics']
@@ -0,0 +1,245 @@
+"""
+This module provides resource monitoring helpers for the ML pipelines.
+
+It reports the peak resident set size (RSS) of the process, so the memory
+used by the training pipeline can be checked from the logs, and times the
+stages of a pipeline with the StageTimer class. On Linux the StageTimer
+resets the high-water mark of the process at the start of every stage,
+through /proc/self/clear_refs, so the peak it reports is the peak of that
+stage alone. Where the mark cannot be reset, it reports the RSS at the
+start and at the end of the stage instead. When
+`model_settings.profile_training` is set, every stage is also run under
+cProfile and its profile is dumped to `model_settings.profile_dir`.
+"""
+
+import cProfile
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+
+from loguru import logger
+
+from config import model_settings
+
+KILOBYTE = 1024
+MEGABYTE = KILOBYTE * KILOBYTE
+CLEAR_REFS = '/proc/self/clear_refs'
+PROC_STATUS = '/proc/self/status'
+# Written to clear_refs, resets the peak RSS to the current RSS
+RESET_PEAK_RSS = '5'
+
+
+def reset_peak_rss() -> bool:
+    """Reset the high-water mark of the resident set size.
+
+    Once reset, `peak_rss_mb` reports the peak since the reset instead of
+    the peak since the process started. Needs Linux 4.0 or later.
+
+    Returns:
+        bool: Whether the high-water mark was reset.
+    """
+    try:
+        with open(CLEAR_REFS, 'w') as clear_refs:
+            clear_refs.write(RESET_PEAK_RSS)
+    except OSError:
+        return False
+    return True
+
+
+def current_rss_mb() -> Optional[float]:
+    """Return the current resident set size in megabytes.
+
+    Returns:
+        float, optional: The current RSS, None without /proc/self/status.
+    """
+    return _read_status_mb('VmRSS')
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """Return the peak resident set size in megabytes.
+
+    Args:
+        children (bool, optional): Report the largest peak among the
+            terminated child processes instead of the current process.
+
+    Returns:
+        float: The peak RSS since the last `reset_peak_rss`, or since the
+            process started when it was never reset.
+    """
+    if not children:
+        peak_rss = _read_status_mb('VmHWM')
+        if peak_rss is not None:
+            return peak_rss
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak_rss = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    if sys.platform == 'darwin':
+        return peak_rss / MEGABYTE
+    return peak_rss / KILOBYTE
+
+
+def log_peak_rss(stage: str, children: bool = False) -> float:
+    """Log the peak resident set size at the end of a step.
+
+    The peak covers the enclosing StageTimer stage when its high-water
+    mark could be reset, the whole process since it started otherwise.
+
+    Args:
+        stage (str): The name of the step that just completed.
+        children (bool, optional): Also log the largest peak among the
+            terminated child processes, e.g. the training workers.
+
+    Returns:
+        float: The peak RSS of the current process in megabytes.
+    """
+    peak_rss = peak_rss_mb()
+    message = f'Peak RSS after {stage} is {peak_rss:.1f} MB'
+    if children:
+        message += f', {peak_rss_mb(children=True):.1f} MB in workers'
+    logger.info(message)
+    return peak_rss
+
+
+def _read_status_mb(field: str) -> Optional[float]:
+    """Return a memory field of /proc/self/status in megabytes."""
+    try:
+        with open(PROC_STATUS) as status:
+            for line in status:
+                if line.startswith(f'{field}:'):
+                    # The fields are in kilobytes, e.g. 'VmHWM:  1024 kB'
+                    return int(line.split()[1]) / KILOBYTE
+    except OSError:
+        return None
+    return None
+
+
+class StageTimer:
+    """
+    A timer of the stages of a pipeline.
+
+    Attributes:
+        timings (dict): Duration of every completed stage, in seconds.
+        peaks (dict): Peak RSS of every completed stage, in megabytes, None
+            when the high-water mark could not be reset.
+        rss (dict): RSS at the start and at the end of every completed
+            stage, in megabytes, the peak RSS of the process where the
+            current RSS cannot be read.
+
+    Methods:
+        __init__: Constructor that initializes the StageTimer.
+        stage: Context manager timing, and optionally profiling, a stage.
+        report: Logs and returns the per-stage timing report.
+    """
+
+    def __init__(
+        self,
+        name: str = 'pipeline',
+        on_stage: Optional[Callable[[str, float], None]] = None,
+    ) -> None:
+        """Initialize the StageTimer with default values.
+
+        Args:
+            name (str, optional): Name of the timed pipeline, used in the
+                profile file names. Defaults to 'pipeline'.
+            on_stage (Callable, optional): Called with the name and the
+                duration of every completed stage, e.g. to report progress.
+        """
+        self.name = name
+        self.timings: dict = {}
+        self.peaks: dict = {}
+        self.rss: dict = {}
+        self._on_stage = on_stage
+        self._run_id = datetime.now().strftime('%Y%m%dT%H%M%S')
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """Time a stage, and profile it when training profiling is enabled.
+
+        Args:
+            stage (str): The name of the stage.
+
+        Yields:
+            None: The stage runs inside the context.
+        """
+        profiler = None
+        if model_settings.profile_training:
+            profiler = cProfile.Profile()
+        reset = reset_peak_rss()
+        start_rss = self._rss_mb()
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+            self.timings[stage] = time.perf_counter() - start
+            self._record_memory(stage, reset, start_rss)
+            if profiler:
+                self._dump(profiler, stage)
+            if self._on_stage:
+                self._on_stage(stage, self.timings[stage])
+
+    def report(self) -> dict:
+        """Log and return the per-stage timing report.
+
+        Returns:
+            dict: Duration in seconds, peak RSS and RSS at the start and
+                at the end of every stage, in megabytes.
+        """
+        total = sum(self.timings.values()) or 1
+        lines = [f'{self.name} stage timings:']
+        for stage, seconds in self.timings.items():
+            lines.append(
+                f'  {stage:<12} {seconds:9.2f}s {seconds / total:6.1%} '
+                f'{self._describe_memory(stage)}',
+            )
+        logger.info('\n'.join(lines))
+        return {
+            stage: {
+                'seconds': seconds,
+                'peak_rss_mb': self.peaks[stage],
+                'start_rss_mb': self.rss[stage][0],
+                'end_rss_mb': self.rss[stage][1],
+            }
+            for stage, seconds in self.timings.items()
+        }
+
+    @staticmethod
+    def _rss_mb() -> float:
+        current_rss = current_rss_mb()
+        return peak_rss_mb() if current_rss is None else current_rss
+
+    def _record_memory(
+        self,
+        stage: str,
+        reset: bool,
+        start_rss: float,
+    ) -> None:
+        self.peaks[stage] = peak_rss_mb() if reset else None
+        self.rss[stage] = (start_rss, self._rss_mb())
+        logger.info(f'{stage} used {self._describe_memory(stage)}')
+
+    def _describe_memory(self, stage: str) -> str:
+        if self.peaks[stage] is not None:
+            return f'peak RSS {self.peaks[stage]:.1f} MB'
+        start_rss, end_rss = self.rss[stage]
+        return (
+            f'RSS {start_rss:.1f} -> {end_rss:.1f} MB '
+            f'({end_rss - start_rss:+.1f} MB)'
+        )
+
+    def _dump(self, profiler: cProfile.Profile, stage: str) -> None:
+        os.makedirs(model_settings.profile_dir, exist_ok=True)
+        file_name = f'{self.name}_{self._run_id}_{stage}.prof'
+        profile_path = os.path.join(
+            model_settings.profile_dir,
+            file_name.replace(' ', '_'),
+        )
+        profiler.dump_stats(profile_path)
+        logger.info(f'Profile of {stage} dumped to {profile_path}')
@@ -0,0 +1,476 @@
+"""
+This module creates the out-of-core pipeline for building the ML model.
+
+It trains the model on tables larger than the memory of the training node.
+Prepared chunks are streamed from the database and spooled to disk, the
+train/test split and the cross-validation folds are derived from a hash of
+the `address` column instead of an in-memory shuffle, and forest
+sub-ensembles are fitted on disjoint chunks in a process pool shared by
+the whole search. The yes/no columns are encoded by the query itself, so
+every chunk gets the same flag columns whatever values it holds. The
+sub-ensembles are merged into a single RandomForestRegressor, so the saved
+artifact is served like any other model. Its manifest holds a feature
+profile and a fingerprint accumulated chunk by chunk, see TrainingProfile.
+Peak memory is bounded by the chunk size times the number of workers.
+"""
+
+import hashlib
+import os
+import tempfile
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import ParameterGrid
+
+from config import engine, model_settings
+from model.pipeline.artifact import feature_profile
+from model.pipeline.collect import encoded_query
+from model.pipeline.model import (
+    FEATURE_COLUMNS,
+    GRID_SPACE,
+    save_metrics,
+    save_model,
+)
+from model.pipeline.monitoring import StageTimer
+from model.pipeline.preparation import (
+    CAT_COLUMNS,
+    MODEL_COLUMNS,
+    downcast_dtypes,
+)
+
+TEST_SIZE = 0.2
+CV_FOLDS = 5
+TEST_FOLD = -1
+HASH_RANGE = 2 ** 32
+PROFILE_SAMPLE_SIZE = 10000
+# Recorded in the metrics, refreshes hold out the same hashed rows
+HOLDOUT_SPLIT = 'address_hash'
+
+
+class TrainingProfile:
+    """
+    A profile of the training rows, accumulated chunk by chunk.
+
+    The counts, means, standard deviations and bounds of the features are
+    exact, their quantiles are computed on a uniform sample of the rows,
+    so the rows are never all in memory at once.
+
+    Attributes:
+        rows (int): Number of training rows added.
+        table_rows (int): Number of rows added, test rows included.
+
+    Methods:
+        __init__: Constructor that initializes the TrainingProfile.
+        add: Adds the training rows of a chunk.
+        fingerprint: Returns the fingerprint of the training rows.
+        sample: Returns the uniform sample of the training features.
+        profile: Returns the feature profile of the training rows.
+    """
+
+    def __init__(self, sample_size: int = PROFILE_SAMPLE_SIZE) -> None:
+        """Initialize the TrainingProfile with default values.
+
+        Args:
+            sample_size (int, optional): Rows kept for the quantiles.
+                Defaults to PROFILE_SAMPLE_SIZE.
+        """
+        self.rows = 0
+        self.table_rows = 0
+        self._sample_size = sample_size
+        self._sums = np.zeros(len(FEATURE_COLUMNS))
+        self._squares = np.zeros(len(FEATURE_COLUMNS))
+        self._mins = np.full(len(FEATURE_COLUMNS), np.inf)
+        self._maxs = np.full(len(FEATURE_COLUMNS), -np.inf)
+        self._sample = np.empty((0, len(FEATURE_COLUMNS)), dtype=np.float32)
+        self._keys = np.empty(0)
+        self._rng = np.random.default_rng(42)
+        self._x_digest = hashlib.sha256(','.join(FEATURE_COLUMNS).encode())
+        self._y_digest = hashlib.sha256()
+
+    def add(self, X: np.ndarray, y: np.ndarray, folds: np.ndarray) -> None:
+        """Add the training rows of a chunk.
+
+        Args:
+            X (np.ndarray): The features of the chunk.
+            y (np.ndarray): The target of the chunk.
+            folds (np.ndarray): The folds of the rows, see `hash_folds`.
+        """
+        mask = folds != TEST_FOLD
+        self.table_rows += len(folds)
+        self.rows += int(mask.sum())
+        X_train = X[mask]
+        values = X_train.astype(np.float64)
+        self._sums += values.sum(axis=0)
+        self._squares += np.square(values).sum(axis=0)
+        if len(values):
+            self._mins = np.minimum(self._mins, values.min(axis=0))
+            self._maxs = np.maximum(self._maxs, values.max(axis=0))
+        self._x_digest.update(_row_hashes(X_train))
+        self._y_digest.update(_row_hashes(y[mask]))
+        # Bottom-k sampling: the rows with the smallest random keys
+        # are a uniform sample of every row added so far
+        keys = np.concatenate([self._keys, self._rng.random(len(X_train))])
+        rows = np.concatenate([self._sample, X_train])
+        kept = np.argsort(keys)[:self._sample_size]
+        self._keys, self._sample = keys[kept], rows[kept]
+
+    def fingerprint(self) -> str:
+        """Return the sha256 of the row hashes of the features and target."""
+        digest = hashlib.sha256(self._x_digest.digest())
+        digest.update(self._y_digest.digest())
+        return digest.hexdigest()
+
+    def sample(self) -> pd.DataFrame:
+        """Return the uniform sample of the training features."""
+        return pd.DataFrame(self._sample, columns=FEATURE_COLUMNS)
+
+    def profile(self) -> dict:
+        """Return the feature profile of the training rows.
+
+        Returns:
+            dict: The profile of `artifact.feature_profile`, with the exact
+                moments and bounds of every training row.
+        """
+        profile = feature_profile(self.sample())
+        means = self._sums / max(self.rows, 1)
+        variances = self._squares / max(self.rows, 1) - np.square(means)
+        for index, column in enumerate(FEATURE_COLUMNS):
+            stats = profile[column]
+            stats.update(
+                count=self.rows,
+                mean=float(means[index]),
+                std=float(np.sqrt(max(variances[index], 0))),
+                min=float(self._mins[index]),
+                max=float(self._maxs[index]),
+            )
+            if 'frequency' in stats:
+                stats['frequency'] = stats['mean']
+        return profile
+
+
+def build_model_out_of_core(
+    stages: StageTimer = None,
+    version: str = None,
+) -> dict:
+    """
+    Build, evaluate and save the ML model without loading the whole table.
+
+    The hyperparameters are tuned on the hashed cross-validation folds of
+    the training rows, the best candidate is then fitted on every training
+    row and evaluated on the hashed test rows.
+
+    Args:
+        stages (StageTimer, optional): The timer of the pipeline stages.
+            Defaults to a new timer.
+        version (str, optional): The version of the saved model.
+            Defaults to `model_settings.version`.
+
+    Returns:
+        dict: The duration and peak RSS of every stage.
+    """
+    logger.info('Starting Out-of-core Building Model Pipeline ...')
+    stages = stages or StageTimer('build_model_out_of_core')
+    with tempfile.TemporaryDirectory(prefix='ooc_') as spool_dir:
+        with stages.stage('prepare'):
+            chunk_paths = spool_chunks(spool_dir)
+            training = profile_chunks(chunk_paths)
+        with stages.stage('grid search'), ProcessPoolExecutor(
+            model_settings.ooc_max_workers,
+        ) as executor:
+            best_params = search_params(chunk_paths, executor)
+            model = fit_forest(chunk_paths, best_params, executor)
+        with stages.stage('evaluate'):
+            score = stream_r2(model, chunk_paths, fold=TEST_FOLD)
+            logger.info(f'Evaluating Model, Score is {score:.2f}')
+
+    with stages.stage('save'):
+        save_model(
+            model,
+            version=version,
+            x_train=training.sample(),
+            profile=training.profile(),
+            fingerprint=training.fingerprint(),
+        )
+        save_metrics({
+            'mode': 'out_of_core',
+            'score': score,
+            'training_seconds': stages.timings['grid search'],
+            'training_rows': training.rows,
+            # Rows of the table split, refreshes keep the same held-out rows
+            'table_rows': training.table_rows,
+            'holdout_rows': training.table_rows,
+            'holdout_split': HOLDOUT_SPLIT,
+            'n_estimators': model.n_estimators,
+            'chunks': len(chunk_paths),
+        }, version=version)
+    return stages.report()
+
+
+def build_stages_out_of_core() -> List[str]:
+    """Return the stages `build_model_out_of_core` times, in order."""
+    return ['prepare', 'grid search', 'evaluate', 'save']
+
+
+def spool_chunks(
+    spool_dir: str,
+    chunk_size: int = None,
+) -> List[str]:
+    """Stream prepared chunks from the database to the spool directory.
+
+    Args:
+        spool_dir (str): The directory receiving the chunk files.
+        chunk_size (int, optional): Rows per chunk.
+            Defaults to `model_settings.ooc_chunk_size`.
+
+    Returns:
+        List[str]: The paths of the chunk files.
+    """
+    chunk_paths = []
+    for index, chunk in enumerate(read_prepared_chunks(chunk_size)):
+        chunk_path = os.path.join(spool_dir, f'chunk_{index}.joblib')
+        joblib.dump(
+            (
+                chunk[FEATURE_COLUMNS].to_numpy(dtype=np.float32),
+                chunk['rent'].to_numpy(),
+                hash_folds(chunk['address']),
+            ),
+            chunk_path,
+        )
+        chunk_paths.append(chunk_path)
+    logger.info(f'Spooled {len(chunk_paths)} chunks to {spool_dir}')
+    return chunk_paths
+
+
+def profile_chunks(chunk_paths: List[str]) -> TrainingProfile:
+    """Profile the training rows of the chunk files.
+
+    Args:
+        chunk_paths (List[str]): The paths of the chunk files.
+
+    Returns:
+        TrainingProfile: The profile of their training rows.
+    """
+    training = TrainingProfile()
+    for chunk_path in chunk_paths:
+        training.add(*joblib.load(chunk_path))
+    logger.info(f'Profiled {training.rows} training rows')
+    return training
+
+
+def read_prepared_chunks(chunk_size: int = None) -> Iterator[pd.DataFrame]:
+    """Read the apartments table by chunks and prepare each of them.
+
+    Args:
+        chunk_size (int, optional): Rows per chunk.
+            Defaults to `model_settings.ooc_chunk_size`.
+
+    Yields:
+        pd.DataFrame: A prepared chunk with the features, target and address.
+    """
+    chunk_size = chunk_size or model_settings.ooc_chunk_size
+    # Encoded per row, unlike get_dummies a chunk missing a value keeps
+    # the meaning of its flag columns
+    query = encoded_query([*MODEL_COLUMNS, 'address'], CAT_COLUMNS)
+    logger.info(f'Streaming data from database by {chunk_size} rows ...')
+    with engine.connect() as connection:
+        streaming = connection.execution_options(stream_results=True)
+        for chunk in pd.read_sql(query, streaming, chunksize=chunk_size):
+            yield downcast_dtypes(
+                chunk[[*FEATURE_COLUMNS, 'rent', 'address']],
+            )
+
+
+def hash_folds(
+    addresses: pd.Series,
+    test_size: float = TEST_SIZE,
+    cv: int = CV_FOLDS,
+) -> np.ndarray:
+    """Assign every row to the test set or to a cross-validation fold.
+
+    The assignment only depends on the address, so it is stable across
+    chunks and runs, and rows sharing an address never leak between
+    the train and test sets.
+
+    Args:
+        addresses (pd.Series): The addresses of the rows.
+        test_size (float, optional): Share of the addresses in the test set.
+        cv (int, optional): Number of cross-validation folds.
+
+    Returns:
+        np.ndarray: `TEST_FOLD` for test rows, the fold index otherwise.
+    """
+    buckets = np.fromiter(
+        (zlib.crc32(str(address).encode()) for address in addresses),
+        dtype=np.float64,
+        count=len(addresses),
+    ) / HASH_RANGE
+    folds = ((buckets - test_size) / (1 - test_size) * cv).astype(np.int8)
+    return np.where(buckets < test_size, TEST_FOLD, folds)
+
+
+def search_params(chunk_paths: List[str], executor: Executor) -> dict:
+    """Select the hyperparameters on the hashed cross-validation folds.
+
+    Args:
+        chunk_paths (List[str]): The paths of the chunk files.
+        executor (Executor): The process pool fitting the sub-ensembles.
+
+    Returns:
+        dict: The candidate with the best mean R2 score.
+
+    Raises:
+        ValueError: If no fold can be scored, e.g. on a tiny table.
+    """
+    logger.info('Tunning hyperparams on hashed folds ...')
+    logger.debug(f'Grid Space is {GRID_SPACE}  ...')
+    best_score, best_params = -np.inf, None
+    for params in ParameterGrid(GRID_SPACE):
+        scores = np.array([
+            stream_r2(
+                fit_forest(
+                    chunk_paths,
+                    params,
+                    executor,
+                    held_out_fold=fold,
+                ),
+                chunk_paths,
+                fold=fold,
+            )
+            for fold in range(CV_FOLDS)
+        ])
+        # Folds without rows, or with a constant target, have no score
+        scores = scores[~np.isnan(scores)]
+        if not len(scores):
+            continue
+        logger.debug(f'Candidate {params} scored {scores.mean():.3f}')
+        if scores.mean() > best_score:
+            best_score, best_params = scores.mean(), params
+    if best_params is None:
+        raise ValueError('No cross-validation fold can be scored')
+    logger.info(f'Best params are {best_params}, CV score {best_score:.3f}')
+    return best_params
+
+
+def fit_forest(
+    chunk_paths: List[str],
+    params: dict,
+    executor: Executor,
+    held_out_fold: Optional[int] = None,
+) -> RandomForestRegressor:
+    """Fit one sub-ensemble per chunk in a process pool and merge them.
+
+    The trees of the candidate are spread over the chunks, the first
+    chunks getting one more tree each, so the merged forest has
+    `n_estimators` trees. With fewer trees than chunks, the last chunks
+    get no tree and are not fitted.
+
+    Args:
+        chunk_paths (List[str]): The paths of the chunk files.
+        params (dict): The forest hyperparameters.
+        executor (Executor): The process pool fitting the sub-ensembles.
+        held_out_fold (int, optional): Fold excluded from the training rows.
+
+    Returns:
+        RandomForestRegressor: The merged forest.
+    """
+    trees, extra_trees = divmod(params['n_estimators'], len(chunk_paths))
+    chunk_params = [
+        {**params, 'n_estimators': trees + (index < extra_trees)}
+        for index in range(min(len(chunk_paths), params['n_estimators']))
+    ]
+    forests = executor.map(
+        _fit_chunk,
+        chunk_paths[:len(chunk_params)],
+        chunk_params,
+        [held_out_fold] * len(chunk_params),
+        range(len(chunk_params)),
+    )
+    return merge_forests([forest for forest in forests if forest])
+
+
+def merge_forests(
+    forests: List[RandomForestRegressor],
+) -> RandomForestRegressor:
+    """Merge sub-ensembles into a single RandomForestRegressor.
+
+    Args:
+        forests (List[RandomForestRegressor]): The fitted sub-ensembles.
+
+    Returns:
+        RandomForestRegressor: A forest holding the trees of all of them.
+    """
+    merged = forests[0]
+    merged.estimators_ = [
+        tree for forest in forests for tree in forest.estimators_
+    ]
+    merged.n_estimators = len(merged.estimators_)
+    # Served models are called with DataFrames holding these columns
+    merged.feature_names_in_ = np.array(FEATURE_COLUMNS, dtype=object)
+    return merged
+
+
+def stream_r2(
+    model: RandomForestRegressor,
+    chunk_paths: List[str],
+    fold: int,
+) -> float:
+    """Compute the R2 score of a fold one chunk at a time.
+
+    Args:
+        model (RandomForestRegressor): The model to evaluate.
+        chunk_paths (List[str]): The paths of the chunk files.
+        fold (int): The fold to evaluate, `TEST_FOLD` for the test set.
+
+    Returns:
+        float: The R2 score of the model on the rows of the fold, NaN when
+            the fold has no rows or a constant target.
+    """
+    n_rows, y_sum, y_square_sum, squared_error = 0, 0.0, 0.0, 0.0
+    for chunk_path in chunk_paths:
+        X, y, folds = joblib.load(chunk_path)
+        mask = folds == fold
+        if not mask.any():
+            continue
+        y_fold = y[mask].astype(np.float64)
+        X_fold = pd.DataFrame(X[mask], columns=FEATURE_COLUMNS)
+        residuals = y_fold - model.predict(X_fold)
+        n_rows += len(y_fold)
+        y_sum += y_fold.sum()
+        y_square_sum += np.square(y_fold).sum()
+        squared_error += np.square(residuals).sum()
+    if not n_rows:
+        return np.nan
+    total_variance = y_square_sum - y_sum ** 2 / n_rows
+    # Rounding leaves a tiny variance for a constant target
+    if total_variance <= np.finfo(np.float64).eps * y_square_sum:
+        return np.nan
+    return 1 - squared_error / total_variance
+
+
+def _fit_chunk(
+    chunk_path: str,
+    params: dict,
+    held_out_fold: Optional[int],
+    seed: int,
+) -> Optional[RandomForestRegressor]:
+    """Fit a sub-ensemble on the training rows of one chunk."""
+    X, y, folds = joblib.load(chunk_path)
+    mask = (folds != TEST_FOLD) & (folds != held_out_fold)
+    if not mask.any():
+        return None
+    forest = RandomForestRegressor(**params, random_state=seed)
+    return forest.fit(X[mask], y[mask])
+
+
+def _row_hashes(values: np.ndarray) -> bytes:
+    """Return the hashes of the rows of an array, whatever their chunk."""
+    return pd.util.hash_pandas_object(
+        pd.DataFrame(values),
+        index=False,
+    ).to_numpy().tobytes()
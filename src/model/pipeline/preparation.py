@@ -3,23 +3,64 @@ This module provides functionality for preparing a dataset for ML model.
 
 It consists of functions to load data from a database,
 encode categorical columns, and parse specific columns for further processing.
+Only the columns the model uses are loaded, and they are downcast to compact
+dtypes so the memory scales with the number of features rather than with the
+width of the table. The load, encoding and garden parsing run on pandas
+object columns, on Arrow columns with the 'arrow' `dataframe_backend`
+(see `model.pipeline.arrow_backend`), or in the database query itself with
+the 'sql' backend (see `load_encoded_data_from_db`). All give the same
+DataFrame.
 """
 
 import re
+from typing import List
 
 import pandas as pd
 from loguru import logger
-
-from model.pipeline.collect import load_data_from_db
-
-
-def prepare_data() -> pd.DataFrame:
+from sqlalchemy import Engine
+
+from config import model_settings
+from model.pipeline import arrow_backend
+from model.pipeline.collect import (
+    load_data_from_db,
+    load_encoded_data_from_db,
+)
+
+CAT_COLUMNS = ['balcony', 'parking', 'furnished', 'garage', 'storage']
+MODEL_COLUMNS = [
+    'area',
+    'constraction_year',
+    'bedrooms',
+    'garden',
+    *CAT_COLUMNS,
+    'rent',
+]
+
+
+def prepare_data(
+    extra_columns: List[str] = None,
+    backend: str = None,
+    bind: Engine = None,
+) -> pd.DataFrame:
     """
     Prépare les données pour l'analyse en chargeant les données.
 
     En encodant les colonnes catégorielles,
     et en transformant la colonne 'garden'.
 
+    Args:
+        extra_columns: List[str], optionnel
+            Les colonnes à charger en plus de celles utilisées par le modèle,
+            par exemple 'address'. Par défaut, aucune.
+        backend: str, optionnel
+            Le moteur de la préparation : 'pandas' encode les colonnes
+            objet en mémoire, 'arrow' encode des colonnes Arrow (nécessite
+            le paquet pyarrow) et 'sql' encode les colonnes dans la
+            requête SQLite. Par défaut, `model_settings.dataframe_backend`.
+        bind: Engine, optionnel
+            Le moteur de la base de données. Par défaut, le moteur
+            configuré.
+
     Returns:
         pandas.DataFrame
             Un DataFrame préparé avec les colonnes catégorielles encodées
@@ -30,14 +71,24 @@ def prepare_data() -> pd.DataFrame:
     >>> df = prepare_data()
     >>> print(df.head())
     """
-    logger.info('Preparing data pipeline processing ...')
-    db_data = load_data_from_db()
-    # Encoder les colonnes 'balcony', 'parking',
-    # 'furnished', 'garage', 'storage'
-    data_encoded = encode_cat_cols(db_data)
-    # Parser la colonne 'garden'
-    df = parse_garden_col(data_encoded)
-    return df
+    backend = backend or model_settings.dataframe_backend
+    logger.info(f'Preparing data pipeline processing with {backend} ...')
+    columns = MODEL_COLUMNS + (extra_columns or [])
+    if backend == 'arrow':
+        # Charger, encoder et parser en mémoire Arrow
+        df = arrow_backend.prepare_table(columns, CAT_COLUMNS, bind)
+    elif backend == 'sql':
+        # Encoder dans la requête, pendant le parcours de la table
+        df = load_encoded_data_from_db(columns, CAT_COLUMNS, bind)
+    else:
+        db_data = load_data_from_db(columns, bind)
+        # Encoder les colonnes 'balcony', 'parking',
+        # 'furnished', 'garage', 'storage'
+        data_encoded = encode_cat_cols(db_data)
+        # Parser la colonne 'garden'
+        df = parse_garden_col(data_encoded)
+    # Réduire les types numériques
+    return downcast_dtypes(df)
 
 
 def encode_cat_cols(
@@ -59,7 +110,7 @@ def encode_cat_cols(
     Returns:
         pandas.DataFrame
             Un DataFrame avec les colonnes spécifiées encodées en variables
-            fictives, en supprimant la première catégorie pour éviter
+            fictives uint8, en supprimant la première catégorie pour éviter
             la multicolinéarité.
 
     Exemple:
@@ -75,9 +126,14 @@ def encode_cat_cols(
     >>> print(encoded_df)
     """
     if columns is None:
-        columns = ['balcony', 'parking', 'furnished', 'garage', 'storage']
+        columns = CAT_COLUMNS
     logger.info(f'Encoding categorical columns {columns}')
-    return pd.get_dummies(df_data, columns=columns, drop_first=True)
+    return pd.get_dummies(
+        df_data,
+        columns=columns,
+        drop_first=True,
+        dtype='uint8',
+    )
 
 
 def parse_garden_col(df_data: pd.DataFrame) -> pd.DataFrame:
@@ -105,6 +161,36 @@ def parse_garden_col(df_data: pd.DataFrame) -> pd.DataFrame:
     """
     logger.info('Parsing garden column ...')
     df_data['garden'] = df_data['garden'].apply(
-        lambda x: 0 if x == 'Not present' else int(re.findall(r'\d+', x)[0]),
+        lambda x: (
+            0
+            if x == arrow_backend.GARDEN_ABSENT
+            else int(re.findall(r'\d+', x)[0])
+        ),
     )
     return df_data
+
+
+def downcast_dtypes(df_data: pd.DataFrame) -> pd.DataFrame:
+    """Réduit les colonnes numériques au plus petit type suffisant.
+
+    Les entiers sont convertis vers le plus petit type entier, non signé
+    quand c'est possible, capable de contenir leurs valeurs et les
+    flottants en float32, le type utilisé par les arbres de scikit-learn,
+    ce qui évite aussi une copie à l'entraînement.
+
+    Args:
+        df_data: pandas.DataFrame
+            Le DataFrame dont les colonnes numériques sont à réduire.
+
+    Returns:
+        pandas.DataFrame
+            Le DataFrame avec des types numériques compacts.
+    """
+    logger.info('Downcasting numerical columns ...')
+    for col in df_data.select_dtypes(include='integer').columns:
+        downcast = 'unsigned' if (df_data[col] >= 0).all() else 'integer'
+        df_data[col] = pd.to_numeric(df_data[col], downcast=downcast)
+    for col in df_data.select_dtypes(include='float').columns:
+        df_data[col] = pd.to_numeric(df_data[col], downcast='float')
+    logger.debug(f'Prepared dtypes are {df_data.dtypes.to_dict()}')
+    return df_data
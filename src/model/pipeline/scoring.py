@@ -0,0 +1,158 @@
+"""
+This module provides the batch scoring job for the rental apartments table.
+
+It scores every apartment of the RentApartments table with the current
+model and persists the results, keyed by address, features, model name
+and model version, in the RentPredictions table. The inference service
+reads this table before falling back to the live model.
+"""
+
+import hashlib
+import time
+from typing import Sequence
+
+import pandas as pd
+from loguru import logger
+from sqlalchemy import delete, insert, inspect
+
+from config import engine, model_settings
+from databases.db_model import RentPredictions
+from model.model_inference import ModelInferenceService
+from model.pipeline.model import _get_x_y
+from model.pipeline.preparation import prepare_data
+
+# Recorded with every row, bump it whenever `feature_key` changes
+FEATURE_ENCODING = 'sha256-16:float-repr-csv:v1'
+
+
+def score_table() -> int:
+    """Score the whole apartments table and store the predictions.
+
+    Apartments sharing the same address and the same features are scored
+    once, apartments sharing an address with other features get their own
+    row, and apartments without an address are skipped since they can
+    never be looked up. Previous predictions of the same model name and
+    version are replaced.
+
+    Returns:
+        int: The number of predictions written.
+    """
+    logger.info('Starting batch scoring of the apartments table ...')
+    start = time.perf_counter()
+
+    dataframe = prepare_data(extra_columns=['address'])
+    total_rows = len(dataframe)
+    dataframe = dataframe.dropna(subset=['address'])
+    covered_rows = len(dataframe)
+    X, _ = _get_x_y(dataframe)
+    dataframe = dataframe.assign(
+        feature_key=[feature_key(row) for row in X.itertuples(index=False)],
+    ).drop_duplicates(subset=['address', 'feature_key'])
+    X = X.loc[dataframe.index]
+
+    ml_inference = ModelInferenceService()
+    ml_inference.load_model()
+    predictions = ml_inference.model.predict(X)
+
+    scored_rows = _write_predictions(
+        dataframe['address'],
+        dataframe['feature_key'],
+        predictions,
+    )
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f'Scored {scored_rows} apartments in {elapsed:.2f}s '
+        f'({scored_rows / elapsed:.0f} rows/s), '
+        f'expected hit ratio on table rows is '
+        f'{_hit_ratio(covered_rows, total_rows):.2%}',
+    )
+    return scored_rows
+
+
+def feature_key(features: Sequence[float]) -> str:
+    """Return the key of a feature vector in the predictions table.
+
+    The inference service computes the key of a request the same way,
+    see `PredictionStore.feature_key`. Every row records FEATURE_ENCODING
+    and the service refuses rows whose encoding differs from its own, so
+    a change of either side shows up as encoding mismatches in its lookup
+    counters instead of silent misses.
+
+    Args:
+        features (Sequence[float]): The features, in the FEATURE_COLUMNS
+            order.
+
+    Returns:
+        str: The truncated sha256 of the features as floats.
+    """
+    text = ','.join(repr(float(feature)) for feature in features)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def _write_predictions(
+    addresses: pd.Series,
+    feature_keys: pd.Series,
+    predictions,
+) -> int:
+    """Replace the predictions of the current model name and version.
+
+    Args:
+        addresses (pd.Series): Addresses of the scored apartments.
+        feature_keys (pd.Series): Keys of the features of the apartments.
+        predictions: Predictions aligned with `addresses`.
+
+    Returns:
+        int: The number of rows written.
+    """
+    records = [
+        {
+            'address': address,
+            'feature_key': key,
+            'feature_encoding': FEATURE_ENCODING,
+            'model_version': model_settings.version,
+            'model_name': model_settings.models_name,
+            'prediction': float(prediction),
+        }
+        for address, key, prediction in zip(
+            addresses,
+            feature_keys,
+            predictions,
+        )
+    ]
+    _drop_outdated_table()
+    RentPredictions.metadata.create_all(
+        engine,
+        tables=[RentPredictions.__table__],
+    )
+    logger.info(
+        f'Writing {len(records)} predictions to '
+        f'{RentPredictions.__tablename__} ...',
+    )
+    with engine.begin() as connection:
+        connection.execute(
+            delete(RentPredictions).where(
+                RentPredictions.model_name == model_settings.models_name,
+                RentPredictions.model_version == model_settings.version,
+            ),
+        )
+        connection.execute(insert(RentPredictions), records)
+    return len(records)
+
+
+def _drop_outdated_table() -> None:
+    """Drop a predictions table created without the feature encoding."""
+    table_name = RentPredictions.__tablename__
+    inspector = inspect(engine)
+    if not inspector.has_table(table_name):
+        return
+    columns = {column['name'] for column in inspector.get_columns(table_name)}
+    if 'feature_encoding' not in columns:
+        logger.warning(f'Recreating {table_name} keyed by features ...')
+        RentPredictions.__table__.drop(engine)
+
+
+def _hit_ratio(hits: int, total: int) -> float:
+    """Return the ratio of `hits` over `total`, 0 when `total` is empty."""
+    if not total:
+        return 0.0
+    return hits / total
@@ -0,0 +1,104 @@
+"""
+This module shares the training data with the cross-validation workers.
+
+GridSearchCV sends `x_train` and `y_train` to its loky workers for every
+candidate and fold. DataFrames are pickled in full each time, while numpy
+memory maps are sent as a reference to their file. This module writes the
+prepared training matrix once to a memory-mapped file, in shared memory
+when available, so every worker and forest fit reads the same pages
+without copying them.
+"""
+
+import os
+import pickle
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import model_settings
+
+SHARED_MEMORY_DIR = '/dev/shm'
+
+
+@contextmanager
+def shared_training_data(
+    x_train: pd.DataFrame,
+    y_train: pd.Series,
+) -> Iterator[Tuple[np.memmap, np.memmap]]:
+    """Write the training data to memory-mapped files for the workers.
+
+    The features are stored as a C-contiguous float32 matrix, the layout
+    the forest fits use, so the workers never convert or copy them.
+
+    Args:
+        x_train (pd.DataFrame): The training features.
+        y_train (pd.Series): The training target.
+
+    Yields:
+        Tuple[np.memmap, np.memmap]: Read-only maps of the features and
+            target, valid until the context exits.
+    """
+    with tempfile.TemporaryDirectory(
+        prefix='train_',
+        dir=_shared_dir(),
+    ) as shared_dir:
+        x_path = os.path.join(shared_dir, 'x_train.joblib')
+        y_path = os.path.join(shared_dir, 'y_train.joblib')
+        joblib.dump(
+            np.ascontiguousarray(x_train.to_numpy(dtype=np.float32)),
+            x_path,
+        )
+        joblib.dump(y_train.to_numpy(), y_path)
+        shared_bytes = os.path.getsize(x_path) + os.path.getsize(y_path)
+        logger.info(
+            f'Shared {shared_bytes / 1e6:.1f} MB of training data '
+            f'once in {shared_dir}',
+        )
+        yield (
+            joblib.load(x_path, mmap_mode='r'),
+            joblib.load(y_path, mmap_mode='r'),
+        )
+
+
+def log_pickled_bytes(
+    x_train,
+    y_train,
+    n_tasks: int,
+    shared: bool,
+) -> int:
+    """Log the bytes of training data pickled to the workers.
+
+    Args:
+        x_train: The training features sent to the workers.
+        y_train: The training target sent to the workers.
+        n_tasks (int): Number of candidate and fold fits dispatched.
+        shared (bool): Whether the data is memory-mapped, in which case
+            only a reference to the file is pickled.
+
+    Returns:
+        int: The estimated number of bytes pickled for all the tasks.
+    """
+    if shared:
+        payload = len(pickle.dumps((x_train.filename, y_train.filename)))
+    else:
+        payload = len(pickle.dumps((x_train, y_train), protocol=5))
+    pickled_bytes = payload * n_tasks
+    logger.info(
+        f'Training data pickled to workers: {pickled_bytes / 1e6:.1f} MB '
+        f'({n_tasks} tasks x {payload / 1e3:.1f} kB)',
+    )
+    return pickled_bytes
+
+
+def _shared_dir() -> str:
+    """Return the directory of the memory-mapped files."""
+    if model_settings.shared_memory_dir:
+        return model_settings.shared_memory_dir
+    if os.path.isdir(SHARED_MEMORY_DIR):
+        return SHARED_MEMORY_DIR
+    return tempfile.gettempdir()
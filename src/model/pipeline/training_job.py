@@ -0,0 +1,165 @@
+"""
+This module runs `build_model`, or `build_model_out_of_core`, as a
+background training job.
+
+A training job is a separate process started by the inference service,
+see `runner_training_job.py`. Before training, the process limits its own
+CPU time and address space with `setrlimit` and lowers its scheduling
+priority, which its training workers inherit, so the serving processes
+keep the CPUs whenever they need them. The progress of the job, the
+completed stages with their durations and the running stage, is written
+to a JSON status file after every stage, replaced atomically so the
+service never reads a partial file.
+"""
+
+import json
+import os
+import resource
+import tempfile
+import traceback
+from datetime import datetime, timezone
+from typing import List
+
+from loguru import logger
+
+from config import model_settings
+from model.pipeline.model import build_model, build_stages
+from model.pipeline.monitoring import StageTimer
+from model.pipeline.out_of_core import (
+    build_model_out_of_core,
+    build_stages_out_of_core,
+)
+
+MEGABYTE = 1024 * 1024
+
+
+class JobStatus:
+    """
+    The status file of a training job.
+
+    Attributes:
+        status_path (str): The path of the JSON status file.
+        status (dict): The last status written.
+
+    Methods:
+        __init__: Constructor that initializes the JobStatus.
+        start: Writes the planned stages of a running job.
+        on_stage: Records a completed stage, a StageTimer callback.
+        finish: Writes the stage report of a succeeded job.
+        fail: Writes the error of a failed job.
+    """
+
+    def __init__(self, status_path: str) -> None:
+        """Initialize the JobStatus of a status file.
+
+        Args:
+            status_path (str): The path of the JSON status file.
+        """
+        self.status_path = status_path
+        self.status: dict = {}
+
+    def start(self, version: str, stages: List[str]) -> None:
+        """Write the planned stages of a running job."""
+        self.status = {
+            'state': 'running',
+            'pid': os.getpid(),
+            'version': version,
+            'stages': stages,
+            'completed': {},
+            'current': stages[0] if stages else None,
+            'started_at': _now(),
+        }
+        self._write()
+
+    def on_stage(self, stage: str, seconds: float) -> None:
+        """Record a completed stage and the next planned one."""
+        self.status['completed'][stage] = seconds
+        remaining = [
+            planned
+            for planned in self.status['stages']
+            if planned not in self.status['completed']
+        ]
+        self.status['current'] = remaining[0] if remaining else None
+        self._write()
+
+    def finish(self, report: dict) -> None:
+        """Write the stage report of a succeeded job."""
+        self.status.update(state='succeeded', current=None, report=report)
+        self._write()
+
+    def fail(self, error: str) -> None:
+        """Write the error of a failed job."""
+        self.status.update(state='failed', error=error)
+        self._write()
+
+    def _write(self) -> None:
+        self.status['updated_at'] = _now()
+        directory = os.path.dirname(os.path.abspath(self.status_path))
+        handle, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(handle, 'w', encoding='utf-8') as fichier:
+            json.dump(self.status, fichier)
+        os.replace(tmp_path, self.status_path)
+
+
+def limit_resources(
+    cpu_seconds: int = None,
+    memory_mb: int = None,
+    nice: int = 0,
+) -> None:
+    """Limit the resources of the current process and its children.
+
+    Args:
+        cpu_seconds (int, optional): CPU time after which the process is
+            killed, per process. Defaults to no limit.
+        memory_mb (int, optional): Address space of the process, beyond
+            which allocations fail. Defaults to no limit.
+        nice (int, optional): Increment of the scheduling niceness.
+            Defaults to 0.
+    """
+    if cpu_seconds:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+    if memory_mb:
+        limit = memory_mb * MEGABYTE
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if nice:
+        os.nice(nice)
+    logger.info(
+        f'Training job limited to {cpu_seconds or "unlimited"} CPU seconds, '
+        f'{memory_mb or "unlimited"} MB, niceness {os.nice(0)}',
+    )
+
+
+def run_training_job(version: str, status_path: str) -> dict:
+    """Build a model version and report its progress in a status file.
+
+    The model is built out-of-core when `model_settings.out_of_core` is
+    set, as `ModelBuilderService.train_model` does.
+
+    Args:
+        version (str): The version of the model to build.
+        status_path (str): The path of the JSON status file.
+
+    Returns:
+        dict: The report of the duration and peak RSS of every stage.
+    """
+    if model_settings.out_of_core:
+        name, build, stages = (
+            'build_model_out_of_core',
+            build_model_out_of_core,
+            build_stages_out_of_core(),
+        )
+    else:
+        name, build, stages = 'build_model', build_model, build_stages()
+    status = JobStatus(status_path)
+    status.start(version, stages)
+    try:
+        report = build(StageTimer(name, status.on_stage), version=version)
+    except BaseException:
+        status.fail(traceback.format_exc(limit=5))
+        raise
+    status.finish(report)
+    return report
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
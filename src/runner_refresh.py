@@ -0,0 +1,27 @@
+"""
+Main application script for refreshing the ML model.
+
+This script grows the current model with trees fitted on the most
+recently added rows and saves it as a new version. The new version
+is given on the command line, e.g. `python3 runner_refresh.py 0.1.1`.
+"""
+
+import sys
+
+from loguru import logger
+
+from model.model_builder import ModelBuilderService
+
+
+@logger.catch
+def main():
+    """Run function to launch the incremental refresh."""
+    new_version = sys.argv[1]
+    logger.info(f'Starting the refresh process to version {new_version} ...')
+    ml_svc = ModelBuilderService()
+    metrics = ml_svc.refresh_model(new_version)
+    logger.info(f'Refreshing Model completed, score is {metrics["score"]:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""
+Main application script for running the batch scoring job.
+
+This script scores every apartment of the database with the current
+model and stores the predictions in the precomputed predictions table,
+which the inference service looks up before calling the live model.
+"""
+
+from loguru import logger
+
+from model.pipeline.scoring import score_table
+
+
+@logger.catch
+def main():
+    """Run function to launch the batch scoring job."""
+    logger.info('Starting the batch scoring process ...')
+    scored_rows = score_table()
+    logger.info(f'Batch scoring completed, {scored_rows} rows written ...')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Main application script for running a background training job.
+
+This script builds a new model version in a process started by the
+inference service, with limited CPU time and memory and a lower priority,
+and writes its progress to a status file, e.g.
+`python3 runner_training_job.py 0.2.0 status.json --memory-mb 4096`.
+"""
+
+import argparse
+
+from loguru import logger
+
+from model.pipeline.training_job import limit_resources, run_training_job
+
+
+@logger.catch(reraise=True)
+def main():
+    """Run function to launch the training job."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('version')
+    parser.add_argument('status_path')
+    parser.add_argument('--cpu-seconds', type=int, default=None)
+    parser.add_argument('--memory-mb', type=int, default=None)
+    parser.add_argument('--nice', type=int, default=0)
+    args = parser.parse_args()
+
+    limit_resources(args.cpu_seconds, args.memory_mb, args.nice)
+    logger.info(f'Starting the training job of version {args.version} ...')
+    run_training_job(args.version, args.status_path)
+    logger.info('Training job completed ...')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Tests of the out-of-core pipeline.
+
+Run from the `src` directory: `python3 -m pytest tests`.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, insert
+
+from databases.db_model import Base, RentApartments
+from model.pipeline import out_of_core
+from model.pipeline.model import FEATURE_COLUMNS
+from model.pipeline.preparation import CAT_COLUMNS
+
+APARTMENT = {
+    'area': 50.0,
+    'constraction_year': 2000,
+    'rooms': 3,
+    'bedrooms': 2,
+    'bathrooms': 1,
+    'garden': 'Present (25 m²)',
+    'energy': 'A',
+    'facilities': '',
+    'zip': '1000',
+    'neighborhood': 'Centre',
+    'rent': 1000,
+}
+
+
+@pytest.fixture
+def apartments_engine(monkeypatch):
+    """Point the out-of-core pipeline to an in-memory apartments table."""
+    memory_engine = create_engine('sqlite://')
+    Base.metadata.create_all(memory_engine, tables=[RentApartments.__table__])
+    monkeypatch.setattr(out_of_core, 'engine', memory_engine)
+    return memory_engine
+
+
+def test_chunk_of_yes_keeps_its_flags(apartments_engine):
+    """A chunk holding only 'yes' values has all its flags set."""
+    flags = ['yes', 'yes', 'no', 'yes']
+    rows = [
+        {
+            **APARTMENT,
+            'address': f'{index} Main Street',
+            **{col: flag for col in CAT_COLUMNS},
+        }
+        for index, flag in enumerate(flags)
+    ]
+    with apartments_engine.begin() as connection:
+        connection.execute(insert(RentApartments), rows)
+
+    chunks = list(out_of_core.read_prepared_chunks(chunk_size=2))
+
+    assert [list(chunk.columns) for chunk in chunks] == [
+        [*FEATURE_COLUMNS, 'rent', 'address'],
+    ] * 2
+    encoded = pd.concat(chunks)
+    for col in CAT_COLUMNS:
+        assert encoded[f'{col}_yes'].tolist() == [1, 1, 0, 1]
+    assert encoded['garden'].tolist() == [25] * len(flags)
+
+
+def test_forest_has_the_requested_trees(apartments_engine, tmp_path):
+    """The trees left over by the division are spread over the chunks."""
+    rows = [
+        {
+            **APARTMENT,
+            'address': f'{index} Main Street',
+            'area': 30.0 + index,
+            'rent': 500 + 10 * index,
+            **{col: 'yes' if index % 2 else 'no' for col in CAT_COLUMNS},
+        }
+        for index in range(90)
+    ]
+    with apartments_engine.begin() as connection:
+        connection.execute(insert(RentApartments), rows)
+    chunk_paths = out_of_core.spool_chunks(str(tmp_path), chunk_size=30)
+
+    with out_of_core.ProcessPoolExecutor(1) as executor:
+        for n_estimators in (2, 10):
+            model = out_of_core.fit_forest(
+                chunk_paths,
+                {'n_estimators': n_estimators, 'max_depth': 3},
+                executor,
+            )
+            assert model.n_estimators == n_estimators
+            assert len(model.estimators_) == n_estimators
+
+
+def test_fold_without_rows_has_no_score(apartments_engine, tmp_path):
+    """A fold without rows, or with a constant target, scores NaN."""
+    rows = [
+        {
+            **APARTMENT,
+            'address': f'{index} Main Street',
+            'area': 30.0 + index,
+            **{col: 'no' for col in CAT_COLUMNS},
+        }
+        for index in range(20)
+    ]
+    with apartments_engine.begin() as connection:
+        connection.execute(insert(RentApartments), rows)
+    chunk_paths = out_of_core.spool_chunks(str(tmp_path), chunk_size=10)
+    with out_of_core.ProcessPoolExecutor(1) as executor:
+        model = out_of_core.fit_forest(
+            chunk_paths,
+            {'n_estimators': 2, 'max_depth': 3},
+            executor,
+        )
+
+    assert np.isnan(out_of_core.stream_r2(model, chunk_paths, fold=99))
+    assert np.isnan(out_of_core.stream_r2(model, chunk_paths, fold=0))
+
+
+def test_profile_covers_every_training_row():
+    """The moments are exact while the sample stays bounded."""
+    rng = np.random.default_rng(0)
+    training = out_of_core.TrainingProfile(sample_size=50)
+    chunks = [
+        (
+            rng.random((100, len(FEATURE_COLUMNS))).astype(np.float32),
+            rng.random(100),
+            np.where(rng.random(100) < 0.2, out_of_core.TEST_FOLD, 0),
+        )
+        for _ in range(3)
+    ]
+    for chunk in chunks:
+        training.add(*chunk)
+
+    X_train = np.concatenate([X[folds == 0] for X, _, folds in chunks])
+    profile = training.profile()
+    assert training.table_rows == 300
+    assert training.rows == len(X_train)
+    assert len(training.sample()) == 50
+    area = profile['area']
+    assert area['count'] == len(X_train)
+    assert area['mean'] == pytest.approx(X_train[:, 0].mean(), rel=1e-6)
+    assert area['max'] == pytest.approx(X_train[:, 0].max())
+    assert set(area['quantiles']) == {'0.05', '0.25', '0.5', '0.75', '0.95'}